@@ -1,10 +1,20 @@
+from adrf.decorators import api_view as async_api_view
+from django.db import transaction
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-@api_view(["GET"])
+from parts.models import PartColor
+from sets.models import Set
+from sets.serializers import SetPartLineSerializer
+from .models import OwnedPart
+
+MAX_BUILDABLE = 200
+
+@async_api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def me(request):
+async def me(request):
     user = request.user
     return Response({
         "id": user.id,
@@ -13,3 +23,95 @@ def me(request):
         "is_staff": user.is_staff,
         "is_superuser": user.is_superuser,
     })
+
+
+# Views go by request.user.id: with stateless JWT auth the user is a
+# ClaimsTokenUser, not a User row.
+
+def _owned(user):
+    return dict(OwnedPart.objects.filter(user_id=user.id).values_list("part_color_id", "quantity"))
+
+
+@api_view(["GET", "PUT", "PATCH"])
+@permission_classes([IsAuthenticated])
+def my_parts(request):
+    """
+    The user's collection as [{"part_color_id": 12, "quantity": 4}, ...].
+
+    PUT replaces the collection; PATCH only touches the listed part-colors
+    (quantity 0 removes one).
+    """
+    if request.method != "GET":
+        payload = request.data.get("parts") if isinstance(request.data, dict) else request.data
+        lines = SetPartLineSerializer(data=payload, many=True)
+        lines.is_valid(raise_exception=True)
+
+        wanted = {}
+        for line in lines.validated_data:
+            if line["part_color_id"] in wanted:
+                raise ValidationError({"detail": f"Duplicate part_color_id {line['part_color_id']}."})
+            wanted[line["part_color_id"]] = line["quantity"]
+
+        known = set(PartColor.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        unknown = sorted(set(wanted) - known)
+        if unknown:
+            raise ValidationError({"detail": f"Unknown part_color_id(s): {unknown}."})
+
+        with transaction.atomic():
+            owned = OwnedPart.objects.filter(user_id=request.user.id)
+            if request.method == "PUT":
+                owned.exclude(part_color_id__in=[pc for pc, q in wanted.items() if q > 0]).delete()
+            else:
+                owned.filter(part_color_id__in=[pc for pc, q in wanted.items() if q == 0]).delete()
+            OwnedPart.objects.bulk_create(
+                [
+                    OwnedPart(user_id=request.user.id, part_color_id=pc, quantity=q)
+                    for pc, q in wanted.items() if q > 0
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "part_color"],
+                update_fields=["quantity"],
+            )
+
+    return Response([
+        {"part_color_id": pc, "quantity": q}
+        for pc, q in sorted(_owned(request.user).items())
+    ])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def buildable_sets(request):
+    """
+    GET /api/me/buildable/?limit=20&min_percent=50
+
+    Every set ranked by how much of its inventory the user's collection
+    covers, with the pieces still missing.
+    """
+    try:
+        limit = max(1, min(int(request.query_params.get("limit") or 20), MAX_BUILDABLE))
+        min_percent = float(request.query_params.get("min_percent") or 0)
+    except ValueError:
+        raise ValidationError({"detail": "limit and min_percent must be numbers."})
+
+    from sets.matrix import get_matrix  # numpy; kept off the worker boot path
+
+    ranked = get_matrix().rank(_owned(request.user), limit=limit, min_percent=min_percent)
+
+    sets = Set.objects.in_bulk([r["set_id"] for r in ranked])
+    results = []
+    for r in ranked:
+        s = sets.get(r["set_id"])
+        if s is None:
+            continue
+        results.append({
+            "id": s.pk,
+            "number": s.number,
+            "set_name": s.set_name,
+            "image_url": s.image_url,
+            "percent_complete": r["percent"],
+            "pieces_owned": r["have"],
+            "pieces_total": r["total"],
+            "missing": r["missing"],
+        })
+    return Response({"results": results})
@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from .tokens import check_version
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication without loading the user row: request.user is a
+    ClaimsTokenUser, and the only lookup is the (cached) token version.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        check_version(validated_token)
+        return user
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_favorite_theme_user_favorite_themes'),
+        ('parts', '0005_part_part_name_idx_part_part_general_category_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnedPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('part_color', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owners', to='parts.partcolor')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owned_parts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'part_color')},
+            },
+        ),
+    ]
@@ -18,5 +18,20 @@ class User(AbstractUser):
         related_name="favorited_by_users",
     )
 
+    # Part of every issued JWT; bumping it revokes them (see accounts.tokens)
+    token_version = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.username
+
+
+class OwnedPart(models.Model):
+    """
+    How many of a PartColor a user has in their collection.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_parts")
+    part_color = models.ForeignKey("parts.PartColor", on_delete=models.CASCADE, related_name="owners")
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ("user", "part_color")
@@ -0,0 +1,32 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import CLAIMS, forget_version
+
+# Changing any of these revokes the user's tokens.
+REVOKING_FIELDS = set(CLAIMS) | {"password", "is_active"}
+
+
+@receiver(pre_save, sender=User)
+def note_claim_changes(sender, instance, update_fields=None, **kwargs):
+    instance._revoke_tokens = False
+    if instance.pk is None or (update_fields is not None and not REVOKING_FIELDS & set(update_fields)):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*REVOKING_FIELDS).first()
+    if old is not None:
+        instance._revoke_tokens = any(getattr(instance, field) != value for field, value in old.items())
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens(sender, instance, **kwargs):
+    if getattr(instance, "_revoke_tokens", False):
+        User.objects.filter(pk=instance.pk).update(token_version=F("token_version") + 1)
+        instance.refresh_from_db(fields=["token_version"])
+        forget_version(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_version(instance.pk)
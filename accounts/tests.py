@@ -1,3 +1,120 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from parts.models import Color, Part, PartColor
+from sets import matrix
+from sets.models import Set, SetPart, Theme
+from . import tokens
+from .authentication import StatelessJWTAuthentication
+from .models import OwnedPart, User
+
+
+class BuildableSetsTests(TestCase):
+    def setUp(self):
+        matrix.invalidate()
+        self.user = User.objects.create_user("builder", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        theme = Theme.objects.create(name="City")
+        red = Color.objects.create(lego_id=4, name="Red")
+        self.pcs = [
+            PartColor.objects.create(part=Part.objects.create(part_id=f"{3001 + i}", name=f"Brick {i}"), color=red)
+            for i in range(3)
+        ]
+        self.small = Set.objects.create(number="1", set_name="Small", theme=theme)
+        self.big = Set.objects.create(number="2", set_name="Big", theme=theme)
+        SetPart.objects.create(set=self.small, part_color=self.pcs[0], quantity=4)
+        SetPart.objects.create(set=self.big, part_color=self.pcs[0], quantity=4)
+        SetPart.objects.create(set=self.big, part_color=self.pcs[1], quantity=4)
+        SetPart.objects.create(set=self.big, part_color=self.pcs[2], quantity=2)
+
+    def test_collection_round_trip(self):
+        res = self.client.put(
+            "/api/me/parts/",
+            [{"part_color_id": self.pcs[0].pk, "quantity": 3}, {"part_color_id": self.pcs[1].pk, "quantity": 1}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        res = self.client.patch("/api/me/parts/", [{"part_color_id": self.pcs[1].pk, "quantity": 0}], format="json")
+        self.assertEqual(res.data, [{"part_color_id": self.pcs[0].pk, "quantity": 3}])
+
+    def test_ranking_and_missing_pieces(self):
+        OwnedPart.objects.create(user=self.user, part_color=self.pcs[0], quantity=10)
+        OwnedPart.objects.create(user=self.user, part_color=self.pcs[2], quantity=1)
+
+        results = self.client.get("/api/me/buildable/").data["results"]
+        self.assertEqual([r["number"] for r in results], ["1", "2"])
+        self.assertEqual(results[0]["percent_complete"], 100.0)
+        self.assertEqual(results[0]["missing"], [])
+        self.assertEqual((results[1]["pieces_owned"], results[1]["pieces_total"]), (5, 10))
+        self.assertEqual(
+            results[1]["missing"],
+            [{"part_color_id": self.pcs[1].pk, "quantity": 4}, {"part_color_id": self.pcs[2].pk, "quantity": 1}],
+        )
+
+    def test_matrix_follows_inventory_changes(self):
+        OwnedPart.objects.create(user=self.user, part_color=self.pcs[1], quantity=4)
+        self.client.get("/api/me/buildable/")
+
+        SetPart.objects.create(set=self.small, part_color=self.pcs[1], quantity=4)
+        results = self.client.get("/api/me/buildable/?min_percent=50").data["results"]
+        self.assertEqual([(r["number"], r["percent_complete"]) for r in results], [("1", 50.0)])
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", email="a@example.com", password="pw", is_staff=True)
+        tokens.forget_version(self.admin.pk)  # pks repeat across test cases
+        self.auth = StatelessJWTAuthentication()
+
+    def login(self):
+        res = APIClient().post("/api/token/", {"username": "admin", "password": "pw"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.auth.authenticate(request)[0]
+
+    def test_user_comes_from_the_claims(self):
+        access = self.login()["access"]
+        self.authenticate(access)  # warm the token-version cache
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+        self.assertEqual((user.id, user.username, user.email), (self.admin.pk, "admin", "a@example.com"))
+        request = APIRequestFactory().get("/")
+        request.user = user
+        self.assertTrue(IsAdminUser().has_permission(request, None))
+
+    def test_claim_changes_revoke_tokens(self):
+        tokens_before = self.login()
+        self.admin.is_staff = False
+        self.admin.save()
+
+        with self.assertRaises(InvalidToken):
+            self.authenticate(tokens_before["access"])
+        res = APIClient().post("/api/token/refresh/", {"refresh": tokens_before["refresh"]}, format="json")
+        self.assertEqual(res.status_code, 401)
+
+        # a fresh login carries the new claims
+        self.assertFalse(self.authenticate(self.login()["access"]).is_staff)
+
+        # saves that don't touch a claim leave tokens alone
+        access = self.login()["access"]
+        self.admin.first_name = "Ada"
+        self.admin.save()
+        self.assertEqual(self.authenticate(access).id, self.admin.pk)
+
+
+class StatefulJWTTests(TestCase):
+    def test_refresh_tokens_without_a_version_keep_working(self):
+        user = User.objects.create_user("ada", password="pw")
+        refresh = RefreshToken.for_user(user)  # as issued before token versions existed
+        self.assertNotIn(tokens.VERSION_CLAIM, refresh)
+        res = APIClient().post("/api/token/refresh/", {"refresh": str(refresh)}, format="json")
+        self.assertEqual(res.status_code, 200)
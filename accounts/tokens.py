@@ -0,0 +1,94 @@
+"""
+JWT claims and the token user for stateless authentication.
+
+Tokens issued by /api/token/ carry the user's username, email, is_staff,
+is_superuser and token version ("tv"), so StatelessJWTAuthentication
+(settings.JWT_STATELESS_AUTH) can build the request user from the token
+alone. Bumping User.token_version revokes every token issued before it;
+see accounts.signals for when that happens.
+"""
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .models import User
+
+CLAIMS = ("username", "email", "is_staff", "is_superuser")
+VERSION_CLAIM = "tv"
+
+MAX_CACHED_VERSIONS = 10000
+
+_lock = threading.Lock()
+_versions = {}  # user id -> (token_version or None if the user can't log in, fetched at)
+
+
+def current_version(user_id, fresh=False):
+    """
+    The user's token version, cached in-process for JWT_TOKEN_VERSION_TTL
+    seconds; None for unknown or inactive users.
+    """
+    now = time.monotonic()
+    if not fresh:
+        cached = _versions.get(user_id)
+        if cached is not None and now - cached[1] < settings.JWT_TOKEN_VERSION_TTL:
+            return cached[0]
+
+    version = (
+        User.objects.filter(pk=user_id, is_active=True).values_list("token_version", flat=True).first()
+    )
+    with _lock:
+        if len(_versions) >= MAX_CACHED_VERSIONS:
+            _versions.clear()
+        _versions[user_id] = (version, now)
+    return version
+
+
+def forget_version(user_id):
+    with _lock:
+        _versions.pop(user_id, None)
+
+
+def check_version(token, fresh=False):
+    try:
+        user_id = int(token[api_settings.USER_ID_CLAIM])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken("Token contained no recognizable user identification")
+    version = current_version(user_id, fresh=fresh)
+    if version is None or token.get(VERSION_CLAIM) != version:
+        raise InvalidToken("Token has been revoked.")
+
+
+class ClaimsTokenUser(TokenUser):
+    """A user built from token claims only; enough for IsAuthenticated / IsAdminUser and `me`."""
+
+    @property
+    def id(self):
+        return int(super().id)
+
+    @property
+    def email(self):
+        return self.token.get("email", "")
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Refreshing re-issues the claims, so in stateless mode check them against
+        # the database. Off, refresh tokens without a version keep working.
+        if settings.JWT_STATELESS_AUTH:
+            check_version(self.token_class(attrs["refresh"]), fresh=True)
+        return super().validate(attrs)
@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for the web service:
+
+    gunicorn -c config/gunicorn.conf.py
+
+SERVER_MODE picks the stack: "wsgi" (config.wsgi, threaded sync workers) or
+"asgi" (config.asgi under uvicorn workers, where the async views share one
+event loop per process). Everything can be overridden from the environment
+(WEB_CONCURRENCY, GUNICORN_THREADS, ...) or on the command line.
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+if SERVER_MODE == "asgi":
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "config.wsgi:application"
+    # Threaded workers: requests mostly wait on Postgres and R2, so a few
+    # threads per process overlap that I/O without multiplying memory.
+    worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 4)))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Recycle workers now and then (memory creep), staggered so they don't all
+# restart - and reconnect to the database - at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# Import Django once in the master and fork; workers start faster and share pages.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 20
+keepalive = 5
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None  # "" turns it off
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Never share a connection (or a pool) opened in the master across processes.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Give pooled connections back to Postgres instead of letting them time out.
+    from django.db import connections
+
+    for conn in connections.all(initialized_only=True):
+        if hasattr(conn, "close_pool"):
+            conn.close_pool()
+        else:
+            conn.close()
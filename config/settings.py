@@ -36,17 +36,64 @@ INSTALLED_APPS = [
     "corsheaders",
 ]
 
+# Opt-in: build request.user from the JWT's claims instead of loading the
+# user row on every request (accounts.authentication). A token is still
+# rejected once its user's token_version moves; versions are cached per
+# process for JWT_TOKEN_VERSION_TTL seconds. Token refresh only checks the
+# version in this mode, so refresh tokens issued without one keep working
+# until it is switched on.
+JWT_STATELESS_AUTH = os.environ.get("JWT_STATELESS_AUTH", "0") == "1"
+JWT_TOKEN_VERSION_TTL = int(os.environ.get("JWT_TOKEN_VERSION_TTL", "30"))
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.tokens.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.tokens.ClaimsTokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "accounts.tokens.ClaimsTokenUser",
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.StatelessJWTAuthentication"
+        if JWT_STATELESS_AUTH
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     ),
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.CatalogCursorPagination",
+    "DEFAULT_FILTER_BACKENDS": (
+        "core.filters.FieldFilterBackend",
+        "rest_framework.filters.SearchFilter",
+        "core.filters.TiebreakOrderingFilter",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+}
+
+# core.metrics: share of requests measured (0 turns it off; 1 measures every
+# request, e.g. while profiling), how many samples per route the percentiles
+# cover, and whether each sample is logged (off by default while DEBUG, where
+# runserver already logs every request).
+REQUEST_METRICS = {
+    "SAMPLE_RATE": float(os.environ.get("REQUEST_METRICS_SAMPLE_RATE", "0.05")),
+    "WINDOW": int(os.environ.get("REQUEST_METRICS_WINDOW", "1000")),
+    "LOG": os.environ.get("REQUEST_METRICS_LOG", "0" if DEBUG else "1") == "1",
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
 }
 
 
 MIDDLEWARE = [
+    "core.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
 
@@ -91,13 +138,43 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# DB_CONN_MODE picks how Postgres connections are reused:
+#   pooled     - a psycopg 3 pool per process (Django's "pool" option). Each
+#                gunicorn worker keeps DB_POOL_MIN..DB_POOL_MAX connections, so
+#                size DB_POOL_MAX to the worker's threads and keep
+#                workers * DB_POOL_MAX under the server's max_connections.
+#   persistent - one connection per thread, kept for DB_CONN_MAX_AGE seconds.
+#   none       - a new connection per request.
+# Either way connections are health-checked before reuse. SQLite ignores this.
+# Under ASGI (SERVER_MODE=asgi, see config/gunicorn.conf.py) sync code runs in
+# short-lived threads, so persistent connections would pile up: use a pool.
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+DB_CONN_MODE = os.environ.get("DB_CONN_MODE", "pooled" if SERVER_MODE == "asgi" else "persistent")
+if SERVER_MODE == "asgi" and DB_CONN_MODE == "persistent":
+    DB_CONN_MODE = "none"
+
 DATABASES = {
     "default": dj_database_url.config(
         default=os.environ.get("DATABASE_URL", "sqlite:///db.sqlite3"),
-        conn_max_age=600,
+        conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", "600")) if DB_CONN_MODE == "persistent" else 0,
+        conn_health_checks=DB_CONN_MODE == "persistent",
     )
 }
 
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and DB_CONN_MODE == "pooled":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX", "8")),
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        # recycle connections before the server or a proxy drops them
+        "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", "1800")),
+        # ping each connection as it is handed out
+        "check": ConnectionPool.check_connection,
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -135,6 +212,66 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Object storage for server-side jobs (core.storage): "r2", or "local" to use a
+# directory as an offline stand-in for the bucket.
+OBJECT_STORAGE = {
+    "BACKEND": os.environ.get("OBJECT_STORAGE_BACKEND", "r2"),
+    "LOCAL_ROOT": os.environ.get("OBJECT_STORAGE_LOCAL_ROOT", str(BASE_DIR / "media")),
+    "PUBLIC_BASE_URL": os.environ.get("R2_PUBLIC_BASE_URL", "http://localhost:8000/media"),
+}
+
+# Background threads generating image derivatives (core.images), or "jobs" in
+# IMAGE_PIPELINE_BACKEND to queue them for `manage.py run_worker` instead
+IMAGE_PIPELINE_WORKERS = int(os.environ.get("IMAGE_PIPELINE_WORKERS", "2"))
+IMAGE_PIPELINE_BACKEND = os.environ.get("IMAGE_PIPELINE_BACKEND", "thread")
+
+# Background jobs (core.jobs): jobs each run_worker runs at once, seconds between
+# polls when idle, attempts before a job stays failed, retry backoff (doubling
+# from BACKOFF_BASE up to BACKOFF_MAX seconds), and how long a running job's
+# lease lasts without a heartbeat before it counts as abandoned.
+JOBS = {
+    "WORKERS": int(os.environ.get("JOB_WORKERS", "2")),
+    "POLL_INTERVAL": float(os.environ.get("JOB_POLL_INTERVAL", "2")),
+    "MAX_ATTEMPTS": int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+    "BACKOFF_BASE": float(os.environ.get("JOB_BACKOFF_BASE", "10")),
+    "BACKOFF_MAX": float(os.environ.get("JOB_BACKOFF_MAX", "3600")),
+    "LEASE": float(os.environ.get("JOB_LEASE", "300")),
+}
+
+# Caches. "catalog" holds serialized catalog responses (core.response_cache),
+# keyed by catalog version so writes never serve stale entries. Pick the backend
+# with CATALOG_CACHE_BACKEND:
+#   locmem - per-process LRU, evicting the least recently used entries past
+#            CATALOG_CACHE_MAX_ENTRIES
+#   file   - shared by every process on the host, under CATALOG_CACHE_LOCATION
+#   redis  - shared by every host, at CATALOG_CACHE_LOCATION (needs `redis`)
+#   dummy  - disabled
+CATALOG_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "catalog",
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", "2000"))},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CATALOG_CACHE_LOCATION", str(BASE_DIR / ".cache" / "catalog")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", "2000"))},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("CATALOG_CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+    },
+    "dummy": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "catalog": {
+        **CATALOG_CACHE_BACKENDS[os.environ.get("CATALOG_CACHE_BACKEND", "locmem")],
+        "KEY_PREFIX": "catalog",
+        "TIMEOUT": int(os.environ.get("CATALOG_CACHE_TIMEOUT", "3600")),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
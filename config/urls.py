@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from parts.api import PartAdminViewSet, PartColorAdminViewSet, ColorAdminViewSet
-from sets.api import ThemeAdminViewSet, SetAdminViewSet
-from accounts.api import me
+from sets.api import ThemeAdminViewSet, SetAdminViewSet, PartSetsView, PartColorSetsView, buy_list
+from accounts.api import me, my_parts, buildable_sets
+from core.views_jobs import JobAdminViewSet
 
 router = DefaultRouter()
 router.register("admin/parts", PartAdminViewSet, basename="admin-parts")
@@ -12,11 +13,17 @@ router.register("admin/part-colors", PartColorAdminViewSet, basename="admin-part
 router.register("admin/themes", ThemeAdminViewSet, basename="admin-themes")
 router.register("admin/sets", SetAdminViewSet, basename="admin-sets")
 router.register("admin/colors", ColorAdminViewSet, basename="admin-colors")
+router.register("admin/jobs", JobAdminViewSet, basename="admin-jobs")
 urlpatterns = [
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
     path("api/me/", me),
+    path("api/me/parts/", my_parts),
+    path("api/me/buildable/", buildable_sets),
+    path("api/parts/<int:pk>/sets/", PartSetsView.as_view(), name="part-sets"),
+    path("api/part-colors/<int:pk>/sets/", PartColorSetsView.as_view(), name="part-color-sets"),
+    path("api/sets/buy-list/", buy_list, name="buy-list"),
     path("api/", include(router.urls)),
     path("api/", include("core.urls")),
 ]
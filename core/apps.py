@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import images, metrics, versions
+        from .search import attach_after_migrate, detach_for_migrate
+
+        pre_migrate.connect(detach_for_migrate, sender=self)
+        post_migrate.connect(attach_after_migrate, sender=self)
+        images.connect()
+        versions.connect()
+        metrics.connect()
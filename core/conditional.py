@@ -0,0 +1,102 @@
+"""
+Conditional GETs for the catalog endpoints.
+
+A response's validators are derived from the catalog version counters of
+every table it reads (see core.versions), so checking them costs one small
+query and no serialization:
+
+- ETag: hash of the request path, its query parameters, the Accept header
+  and those versions (with the time of the latest bump).
+- Last-Modified: when the newest of those tables last changed.
+
+A matching If-None-Match (or If-Modified-Since) gets a bodiless 304.
+Views with `cache_responses` also keep the serialized payload of each ETag
+in the catalog response cache (see core.response_cache).
+
+Works for sync DRF views (list/retrieve) and async adrf ones (alist/aretrieve).
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from . import response_cache, versions
+
+
+class ConditionalGetMixin:
+    # CatalogVersion names (model_name of each table the response reads)
+    version_names = ()
+    cache_responses = False
+
+    def catalog_validators(self, request):
+        current, updated_at = versions.snapshot(self.version_names)
+        key = "|".join([
+            request.path,
+            repr(sorted(request.query_params.lists())),
+            request.headers.get("Accept", ""),
+            repr(sorted(current.items())),
+            # versions restart if the database is rebuilt; the timestamp doesn't
+            updated_at.isoformat() if updated_at else "",
+        ])
+        etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        return etag, last_modified
+
+    def add_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def cache_key(self, request, etag):
+        # pagination links are absolute, so the host is part of the key
+        return request.get_host() + ":" + etag.strip('"')
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.catalog_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and self.cache_responses:
+            key = self.cache_key(request, etag)
+            entry = response_cache.lookup(key)
+            if entry is not None:
+                response = Response(entry[1], status=entry[0])
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response_cache.store(key, response.status_code, response.data)
+        elif response is None:
+            response = handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    async def aconditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(self.catalog_validators)(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and self.cache_responses:
+            key = self.cache_key(request, etag)
+            entry = await sync_to_async(response_cache.lookup)(key)
+            if entry is not None:
+                response = Response(entry[1], status=entry[0])
+            else:
+                response = await handler(request, *args, **kwargs)
+                if response.status_code == 200:
+                    await sync_to_async(response_cache.store)(key, response.status_code, response.data)
+        elif response is None:
+            response = await handler(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional(super().aretrieve, request, *args, **kwargs)
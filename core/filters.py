@@ -0,0 +1,48 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """
+    Filters declared on the view, one lookup per query parameter:
+
+        filter_fields = {"theme": "theme_id", "min_pieces": "total_pieces__gte"}
+
+    maps `?theme=3&min_pieces=500` onto `.filter(theme_id=3, total_pieces__gte=500)`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filter_fields = getattr(view, "filter_fields", None) or {}
+
+        lookups = {}
+        for param, lookup in filter_fields.items():
+            value = request.query_params.get(param)
+            if value is None or value == "":
+                continue
+            lookups[lookup] = value
+
+        if not lookups:
+            return queryset
+
+        try:
+            return queryset.filter(**lookups)
+        except (ValueError, DjangoValidationError) as exc:
+            raise ValidationError({"detail": f"Invalid filter value: {exc}"})
+
+
+class TiebreakOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that ends every ordering, the view's default or the one
+    picked with `?ordering=`, with "id", so rows tied on the chosen fields still
+    come back in one fixed order and each has a unique cursor position.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        ordering = list(ordering)
+        if not {"id", "-id", "pk", "-pk"} & set(ordering):
+            ordering.append("id")
+        return ordering
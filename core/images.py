@@ -0,0 +1,195 @@
+"""
+Image derivative pipeline.
+
+When a catalog row's image URL points at a new object in our bucket, a
+background worker downloads it once and writes fixed-size WebP (and AVIF,
+when Pillow supports it) copies under content-hashed keys:
+
+    derived/<folder>/<sha256 of source>-<size>.<format>
+
+The URLs are recorded in the row's `image_derivatives`:
+
+    {"source": "<original url>",
+     "thumb": {"width": 160, "height": 120, "webp": "...", "avif": "..."},
+     "card": {...}, "full": {...}}
+
+Identical sources hash to the same keys, so re-processing is cheap and
+derivatives never need cache-busting.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from . import versions
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# name -> longest edge in pixels (images are never upscaled)
+SIZES = {"thumb": 160, "card": 480, "full": 1600}
+
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+# model label -> (R2 folder, image fields in order of preference)
+SOURCES = {
+    "parts.Part": ("parts", ["image_url_1"]),
+    "parts.PartColor": ("part-colors", ["image_url_1", "image_url_2"]),
+    "sets.Set": ("sets", ["image_url"]),
+    "sets.Theme": ("themes", ["image_url"]),
+}
+
+
+def formats():
+    from PIL import features
+
+    return ["webp"] + (["avif"] if features.check("avif") else [])
+
+
+def source_url(obj):
+    _, fields = SOURCES[obj._meta.label]
+    for field in fields:
+        url = getattr(obj, field)
+        if url:
+            return url
+    return None
+
+
+def current_derivatives(obj):
+    """`obj`'s derivatives, or {} while they are missing or belong to a replaced image."""
+    derived = obj.image_derivatives or {}
+    if not derived.get("source") or derived["source"] != source_url(obj):
+        return {}
+    return derived
+
+
+def derivative(obj, size="thumb", fmt="webp"):
+    """URL of one derivative of `obj`'s current image, or None if not (yet) generated."""
+    return (current_derivatives(obj).get(size) or {}).get(fmt)
+
+
+def row_derivative(label, row, size="thumb", fmt="webp"):
+    """derivative() for a `.values()` row of model `label` with its image fields and image_derivatives."""
+    _, fields = SOURCES[label]
+    source = next((row[field] for field in fields if row[field]), None)
+    derived = row["image_derivatives"] or {}
+    if not derived.get("source") or derived["source"] != source:
+        return None
+    return (derived.get(size) or {}).get(fmt)
+
+
+def render(data):
+    """Yield (size name, format, width, height, encoded bytes) for every derivative."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ("RGBA", "LA") or "transparency" in original.info
+        base = original.convert("RGBA" if has_alpha else "RGB")
+
+    for name, edge in SIZES.items():
+        img = base.copy()
+        img.thumbnail((edge, edge), Image.LANCZOS)
+        for fmt in formats():
+            out = io.BytesIO()
+            img.save(out, format=fmt.upper(), quality=80)
+            yield name, fmt, img.width, img.height, out.getvalue()
+
+
+def build_derivatives(url, folder, storage=None):
+    """Generate (or reuse) every derivative of the object behind `url`."""
+    storage = storage or get_storage()
+    key = storage.key_for_url(url)
+    if key is None:
+        return None
+
+    data = storage.read(key)
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    derived = {"source": url}
+    for name, fmt, width, height, encoded in render(data):
+        out_key = f"derived/{folder}/{digest}-{name}.{fmt}"
+        if not storage.exists(out_key):
+            storage.write(out_key, encoded, CONTENT_TYPES[fmt])
+        entry = derived.setdefault(name, {"width": width, "height": height})
+        entry[fmt] = storage.url(out_key)
+    return derived
+
+
+def process(label, pk, storage=None):
+    """Bring one row's derivatives up to date with its current image."""
+    model = apps.get_model(label)
+    obj = model.objects.filter(pk=pk).first()
+    if obj is None:
+        return
+    url = source_url(obj)
+    if not url:
+        derived = {}
+    elif (obj.image_derivatives or {}).get("source") == url:
+        return
+    else:
+        folder, _ = SOURCES[label]
+        derived = build_derivatives(url, folder, storage=storage)
+        if derived is None:
+            return
+
+    # Only record them if the image wasn't replaced while we were working;
+    # update() also keeps this from re-triggering post_save.
+    fields = {field: getattr(obj, field) for field in SOURCES[label][1]}
+    if model.objects.filter(pk=pk, **fields).update(image_derivatives=derived, updated_at=timezone.now()):
+        versions.bump_models(model)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                thread_name_prefix="image-derivatives",
+            )
+        return _executor
+
+
+def _run(label, pk):
+    try:
+        process(label, pk)
+    except Exception:
+        logger.exception("image derivatives failed for %s %s", label, pk)
+    finally:
+        connections.close_all()  # this worker thread's connections only
+
+
+def enqueue(label, pk):
+    """Process `label` row `pk` in the worker pool once the current transaction commits."""
+    if settings.IMAGE_PIPELINE_BACKEND == "jobs":
+        from . import jobs
+
+        jobs.enqueue("process_image", {"label": label, "pk": pk})
+        return
+    transaction.on_commit(lambda: executor().submit(_run, label, pk))
+
+
+def image_changed(sender, instance, **kwargs):
+    url = source_url(instance)
+    if url == (instance.image_derivatives or {}).get("source"):
+        return
+    if url and get_storage().key_for_url(url) is None:
+        return  # not one of our uploads
+    enqueue(instance._meta.label, instance.pk)
+
+
+def connect():
+    for label in SOURCES:
+        post_save.connect(image_changed, sender=label, dispatch_uid=f"image-derivatives-{label}")
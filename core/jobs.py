@@ -0,0 +1,246 @@
+"""
+Database-backed background jobs.
+
+Anything too slow for the request cycle (catalog-wide recomputations,
+imports, image processing) is queued as a core.Job row and run by
+`manage.py run_worker`, so no broker is needed beside the database.
+
+- enqueue() inserts a row; it becomes visible to workers when the
+  surrounding transaction commits.
+- Workers claim ready rows with SELECT ... FOR UPDATE SKIP LOCKED, so any
+  number of them can poll the same table without handing a job out twice.
+  SQLite has no row locks, but serializes writes: there each candidate is
+  claimed with a conditional UPDATE that only one worker can win.
+- A failed job is re-queued with exponential backoff (plus jitter) until
+  it has used max_attempts; then it stays "failed" with its traceback.
+- Workers refresh `locked_at` on the jobs they hold. A running job whose
+  lease ran out belongs to a worker that died, and is re-queued (or failed
+  once out of attempts).
+
+On SQLite a write can still fail with "database table is locked" while
+another thread holds the write lock; the worker retries its bookkeeping on
+the next poll, and a job's outcome is retried before giving up on it.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# job name -> handler, called with the job's payload as keyword arguments
+TASKS = {
+    "process_image": "core.images.process",                               # label, pk
+    "recompute_set_aggregates": "sets.rollups.refresh_set_aggregates",    # set_ids, batch_size
+    "command": "core.jobs.run_command",                                   # command, args, options
+}
+
+# management commands the "command" job may run
+COMMANDS = {
+    "generate_catalog", "import_catalog", "match_colors", "process_images",
+    "r2_gc", "rebuild_search_index", "recompute_set_aggregates",
+}
+
+ERROR_LIMIT = 10000  # characters of traceback kept on the row
+
+# tries at recording a job's outcome when the database is busy, doubling from RETRY_DELAY seconds
+OUTCOME_TRIES = 6
+RETRY_DELAY = 0.05
+
+
+def enqueue(name, payload=None, *, run_at=None, max_attempts=None):
+    """Queue job `name`; it runs once the current transaction (if any) commits."""
+    if name not in TASKS:
+        raise ValueError(f"Unknown job {name!r}; expected one of {sorted(TASKS)}.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS["MAX_ATTEMPTS"],
+    )
+
+
+def run_command(command, args=(), options=None):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    if command not in COMMANDS:
+        raise ValueError(f"Command {command!r} can't be queued.")
+    out = StringIO()
+    call_command(command, *args, stdout=out, stderr=out, **(options or {}))
+    return out.getvalue()[-ERROR_LIMIT:]
+
+
+def backoff(attempt):
+    """Seconds before retry number `attempt` (1 = first retry): doubling, capped, half jittered."""
+    delay = min(settings.JOBS["BACKOFF_MAX"], settings.JOBS["BACKOFF_BASE"] * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(worker, limit=1):
+    """Mark up to `limit` ready jobs as running for `worker` and return them, oldest first."""
+    if limit < 1:
+        return []
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by("run_at", "pk")
+    claimed = {
+        "status": Job.RUNNING, "locked_by": worker, "locked_at": now, "started_at": now,
+        "attempts": F("attempts") + 1, "updated_at": now,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        ids = []
+        for pk in ready.values_list("pk", flat=True)[:limit * 2]:
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**claimed):
+                ids.append(pk)
+                if len(ids) == limit:
+                    break
+    return list(Job.objects.filter(pk__in=ids).order_by("run_at", "pk"))
+
+
+def _jsonable(value):
+    try:
+        return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def _while_busy(func):
+    """func(), retried while the database is busy; after OUTCOME_TRIES the job's lease is left to expire."""
+    for attempt in range(OUTCOME_TRIES):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == OUTCOME_TRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+def _record(job, worker, **fields):
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker)
+    _while_busy(lambda: mine.update(locked_by="", locked_at=None, updated_at=timezone.now(), **fields))
+
+
+def execute(job_id, worker):
+    """Run claimed job `job_id` and record its outcome. Returns the job's new status."""
+    job = _while_busy(lambda: Job.objects.get(pk=job_id))
+    try:
+        result = import_string(TASKS[job.name])(**job.payload)
+    except Exception:
+        error = traceback.format_exc()[-ERROR_LIMIT:]
+        logger.warning("job %s #%s failed (attempt %s/%s)", job.name, job.pk, job.attempts, job.max_attempts)
+        now = timezone.now()
+        if job.attempts < job.max_attempts and job.name in TASKS:
+            status, done = Job.QUEUED, {"run_at": now + timedelta(seconds=backoff(job.attempts))}
+        else:
+            status, done = Job.FAILED, {"finished_at": now}
+        _record(job, worker, status=status, error=error, **done)
+        return status
+    _record(job, worker, status=Job.SUCCEEDED, result=_jsonable(result), error="", finished_at=timezone.now())
+    return Job.SUCCEEDED
+
+
+def heartbeat(worker):
+    """Extend the lease on every job `worker` is running."""
+    now = timezone.now()
+    return Job.objects.filter(status=Job.RUNNING, locked_by=worker).update(locked_at=now, updated_at=now)
+
+
+def requeue_stale(lease=None):
+    """Re-queue (or fail, when out of attempts) running jobs whose lease expired."""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=lease or settings.JOBS["LEASE"]))
+    released = {"locked_by": "", "locked_at": None, "error": "worker lost while running the job", "updated_at": now}
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(status=Job.FAILED, finished_at=now, **released)
+    return stale.update(status=Job.QUEUED, run_at=now, **released) + failed
+
+
+def _run_in_pool(job_id, worker):
+    try:
+        return execute(job_id, worker)
+    finally:
+        connections.close_all()  # this pool thread's (or process's) connections only
+
+
+class Worker:
+    """
+    Polls for ready jobs and runs up to `concurrency` of them at a time in a
+    thread pool or, for CPU-bound work, a process pool.
+    """
+
+    def __init__(self, concurrency=None, pool="thread", poll_interval=None, lease=None, name=None):
+        self.concurrency = max(1, concurrency or settings.JOBS["WORKERS"])
+        self.pool = pool
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOBS["POLL_INTERVAL"]
+        self.lease = lease or settings.JOBS["LEASE"]
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.counts = {Job.SUCCEEDED: 0, Job.QUEUED: 0, Job.FAILED: 0}
+
+    def executor(self):
+        if self.pool == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,  # before unpickling any job, which imports models
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job-worker")
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self, burst=False):
+        """Work until stop() (finishing the jobs in flight), or with `burst` until nothing is ready."""
+        in_flight = set()
+        last_beat = 0
+        with self.executor() as pool:
+            while not self.stopping.is_set():
+                try:
+                    if time.monotonic() - last_beat > self.lease / 3:
+                        heartbeat(self.name)
+                        requeue_stale(self.lease)
+                        last_beat = time.monotonic()
+                    claimed = claim(self.name, self.concurrency - len(in_flight))
+                except OperationalError as exc:
+                    logger.warning("job worker %s: %s; retrying on the next poll", self.name, exc)
+                    claimed = None
+                for job in claimed or []:
+                    in_flight.add(pool.submit(_run_in_pool, job.pk, self.name))
+                if not in_flight:
+                    if burst and claimed is not None:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                self.collect(done)
+            self.collect(wait(in_flight).done)
+        return self.counts
+
+    def collect(self, futures):
+        for future in futures:
+            try:
+                self.counts[future.result()] += 1
+            except Exception:
+                # the job's own errors are recorded by execute(); this is the pool itself
+                logger.exception("job worker %s lost a job", self.name)
@@ -0,0 +1,226 @@
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core import response_cache
+from core.synthetic import SyntheticCatalog
+from parts.models import PartColor
+from sets.models import Set
+
+from .bench_presign import DUMMY_ENV
+
+BENCH_USER = "bench-admin"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the key endpoints (sets list/detail, part-colors list, presign, me) against "
+        "the current database, plus import_catalog on a synthetic dump (rolled back). Records "
+        "latency, query counts and peak Python memory as JSON. Run generate_catalog first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warm-cache", action="store_true", help="Let the response cache serve repeats.")
+        parser.add_argument("--import-sets", type=int, default=300, help="Sets in the importer's synthetic dump (0 skips it).")
+        parser.add_argument("--output", help="Write the JSON results here instead of stdout.")
+        parser.add_argument("--compare", help="Earlier results file to print a comparison against.")
+
+    def handle(self, *args, **options):
+        for name, value in DUMMY_ENV.items():
+            os.environ.setdefault(name, value)
+        self.iterations = max(1, options["iterations"])
+        self.warm_cache = options["warm_cache"]
+
+        biggest = Set.objects.annotate(lines=Count("setpart")).order_by("-lines").first()
+        if biggest is None:
+            raise CommandError("No sets to benchmark; run `manage.py generate_catalog` first.")
+
+        User = get_user_model()
+        admin = User.objects.filter(username=BENCH_USER).first() or User.objects.create_user(
+            BENCH_USER, is_staff=True, is_superuser=True
+        )
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(admin)
+
+        presign = {"folder": "uploads", "filename": "bench.png", "content_type": "image/png"}
+        results = {
+            "sets_list": self.endpoint("get", "/api/admin/sets/?page_size=50"),
+            "set_detail": self.endpoint("get", f"/api/admin/sets/{biggest.pk}/"),
+            "part_colors_list": self.endpoint("get", "/api/admin/part-colors/?page_size=200"),
+            "presign": self.endpoint("post", "/api/r2/presign-upload/", presign),
+            "me": self.endpoint("get", "/api/me/"),
+        }
+        if options["import_sets"] > 0:
+            results["import_catalog"] = self.importer(options["import_sets"])
+
+        report = {"meta": self.meta(biggest), "results": results}
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+            self.stdout.write(f"bench: wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            self.compare(json.loads(Path(options["compare"]).read_text()), report)
+
+    # --- measurements -----------------------------------------------------
+
+    def measure(self, call, iterations):
+        """
+        Time `call` `iterations` times (queries are those of the last run), then
+        run it once more under tracemalloc, which slows it down too much to time,
+        for its peak Python memory.
+        """
+        call()  # warm-up: imports, connection, lazily built clients
+        samples = []
+        for _ in range(iterations):
+            if not self.warm_cache:
+                response_cache.cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                call()
+                samples.append((time.perf_counter() - started) * 1000)
+            query_count = len(queries)
+
+        if not self.warm_cache:
+            response_cache.cache().clear()
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        samples.sort()
+        return {
+            "iterations": iterations,
+            "mean_ms": round(statistics.mean(samples), 3),
+            "p50_ms": round(samples[len(samples) // 2], 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "queries": query_count,
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def endpoint(self, method, url, data=None):
+        def call():
+            response = getattr(self.client, method)(url, data, format="json") if data else getattr(self.client, method)(url)
+            if response.status_code >= 400:
+                raise CommandError(f"{method.upper()} {url} -> {response.status_code}")
+
+        return self.measure(call, self.iterations)
+
+    def importer(self, n_sets):
+        catalog = SyntheticCatalog(
+            seed=7, themes=20, colors=40, parts=max(50, n_sets * 3), sets=n_sets, max_lines=200, prefix="bench"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            rows = write_dump(catalog, Path(directory))
+
+            def call():
+                try:
+                    with transaction.atomic():
+                        call_command("import_catalog", directory, "--restart", stdout=io.StringIO())
+                        raise Rollback
+                except Rollback:
+                    pass
+
+            result = self.measure(call, max(1, self.iterations // 10))
+        result["rows"] = rows
+        result["rows_per_second"] = round(rows / (result["mean_ms"] / 1000), 1)
+        return result
+
+    # --- reporting --------------------------------------------------------
+
+    def meta(self, biggest):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "catalog": {
+                "sets": Set.objects.count(),
+                "part_colors": PartColor.objects.count(),
+                "biggest_set_lines": biggest.lines,
+            },
+            "warm_cache": self.warm_cache,
+        }
+
+    def compare(self, before, after):
+        self.stdout.write(f"bench: {before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+        for case, now in after["results"].items():
+            then = before["results"].get(case)
+            if then is None:
+                continue
+            change = (now["p50_ms"] - then["p50_ms"]) / then["p50_ms"] * 100 if then["p50_ms"] else 0.0
+            self.stdout.write(
+                f"{case:>17}: p50 {then['p50_ms']:9.2f} -> {now['p50_ms']:9.2f} ms ({change:+6.1f}%)  "
+                f"queries {then['queries']} -> {now['queries']}  "
+                f"peak {then['peak_kib']:.0f} -> {now['peak_kib']:.0f} KiB"
+            )
+
+
+def write_dump(catalog, directory):
+    """Write `catalog` as a Rebrickable-style CSV dump; returns the number of inventory rows."""
+    def write(name, header, rows):
+        with open(directory / f"{name}.csv", "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    parts = catalog.parts()
+    colors = catalog.colors()
+    categories = sorted({category for _, _, category in parts})
+    part_colors = catalog.part_colors()
+    sets = catalog.sets(part_colors)
+
+    write("themes", ["id", "name", "parent_id"], [(i, name, "") for i, name in enumerate(catalog.themes())])
+    write("colors", ["id", "name", "rgb", "is_trans"], [
+        (lego_id, name, hex_.lstrip("#"), "t" if trans else "f") for lego_id, name, hex_, trans in colors
+    ])
+    write("part_categories", ["id", "name"], list(enumerate(categories)))
+    write("parts", ["part_num", "name", "part_cat_id"], [
+        (part_id, name, categories.index(category)) for part_id, name, category in parts
+    ])
+    write("sets", ["set_num", "name", "year", "theme_id", "num_parts", "img_url"], [
+        (number, name, 2024, theme, sum(q for _, q in inventory), "") for number, name, theme, inventory in sets
+    ])
+    write("inventories", ["id", "version", "set_num"], [(i, 1, number) for i, (number, *_) in enumerate(sets)])
+    inventory_rows = [
+        (i, parts[part_colors[pc][0]][0], colors[part_colors[pc][1]][0], quantity, "f", "")
+        for i, (_, _, _, inventory) in enumerate(sets)
+        for pc, quantity in inventory
+    ]
+    write("inventory_parts", ["inventory_id", "part_num", "color_id", "quantity", "is_spare", "img_url"], inventory_rows)
+    return len(inventory_rows)
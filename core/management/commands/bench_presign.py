@@ -0,0 +1,50 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import r2
+
+DUMMY_ENV = {
+    "R2_ACCOUNT_ID": "bench",
+    "R2_ACCESS_KEY_ID": "bench",
+    "R2_SECRET_ACCESS_KEY": "bench",
+    "R2_BUCKET_NAME": "bench",
+    "R2_PUBLIC_BASE_URL": "https://assets.example.com",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark presigned-upload latency: a fresh boto3 client per call (old "
+        "behaviour) vs the shared process-wide client. Signing is local; no network."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        for name, value in DUMMY_ENV.items():
+            os.environ.setdefault(name, value)
+        n = max(1, options["iterations"])
+
+        def time_calls(fn):
+            samples = []
+            for i in range(n):
+                started = time.perf_counter()
+                fn(f"uploads/bench-{i}.png")
+                samples.append((time.perf_counter() - started) * 1000)
+            return samples
+
+        fresh = time_calls(lambda key: r2.presign_put(key, "image/png", client=r2.build_r2_client()))
+        r2.reset_r2_client()
+        shared = time_calls(lambda key: r2.presign_put(key, "image/png"))
+
+        for label, samples in (("fresh client", fresh), ("shared client", shared)):
+            samples.sort()
+            self.stdout.write(
+                f"{label:>14}: mean {statistics.mean(samples):7.3f} ms  "
+                f"p50 {samples[len(samples) // 2]:7.3f} ms  "
+                f"p95 {samples[int(len(samples) * 0.95) - 1]:7.3f} ms"
+            )
@@ -0,0 +1,51 @@
+import gzip
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream catalog entities (themes, colors, parts, part-colors, sets, set-parts) to "
+        "NDJSON or CSV files, one per entity, in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("entities", nargs="*", help=f"Default: all of {list(export.ENTITIES)}.")
+        parser.add_argument("--format", choices=list(export.FORMATS), default="ndjson")
+        parser.add_argument("--output-dir", help="Write <entity>.<format>[.gz] here; '-' writes to stdout.")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        entities = options["entities"] or list(export.ENTITIES)
+        unknown = sorted(set(entities) - set(export.ENTITIES))
+        if unknown:
+            raise CommandError(f"Unknown entities {unknown}; expected some of {list(export.ENTITIES)}.")
+        fmt = options["format"]
+        chunk_size = max(1, options["chunk_size"])
+        output_dir = options["output_dir"] or "."
+
+        if output_dir == "-":
+            for entity in entities:
+                for chunk in export.stream(entity, fmt, compress=options["gzip"], chunk_size=chunk_size):
+                    sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        for entity in entities:
+            started = time.monotonic()
+            path = directory / f"{entity}.{fmt}{'.gz' if options['gzip'] else ''}"
+            with (gzip.open if options["gzip"] else open)(path, "wb") as fh:
+                for chunk in export.stream(entity, fmt, chunk_size=chunk_size):
+                    fh.write(chunk)
+            self.stdout.write(
+                f"export_catalog: {entity} -> {path} "
+                f"({path.stat().st_size} bytes in {time.monotonic() - started:.1f}s)"
+            )
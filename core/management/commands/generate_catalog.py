@@ -0,0 +1,115 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from core import versions
+from core.synthetic import COLOR_ID_BASE, SyntheticCatalog
+from parts.models import Color, Part, PartColor
+from sets.models import Set, SetPart, Theme
+from sets.rollups import delete_set_parts, refresh_part_usage, refresh_set_aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a deterministic synthetic catalog (themes, colors, parts, part-colors, sets and "
+        "inventories with realistic skew) for load and performance testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--themes", type=int, default=40)
+        parser.add_argument("--colors", type=int, default=60)
+        parser.add_argument("--parts", type=int, default=3000)
+        parser.add_argument("--sets", type=int, default=1000)
+        parser.add_argument("--max-lines", type=int, default=400, help="Line items in the biggest set.")
+        parser.add_argument("--prefix", default="syn", help="Prefix of every generated name and number.")
+        parser.add_argument("--replace", action="store_true", help="Delete a catalog generated with this prefix first.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        catalog = SyntheticCatalog(
+            seed=options["seed"],
+            themes=max(1, options["themes"]),
+            colors=max(1, options["colors"]),
+            parts=max(1, options["parts"]),
+            sets=max(0, options["sets"]),
+            max_lines=max(1, options["max_lines"]),
+            prefix=options["prefix"],
+        )
+        batch_size = max(1, options["batch_size"])
+        prefix = options["prefix"]
+
+        existing = Part.objects.filter(part_id__startswith=f"{prefix}-")
+        if existing.exists():
+            if not options["replace"]:
+                raise CommandError(f"A catalog with prefix {prefix!r} exists; pass --replace to regenerate it.")
+            self.stdout.write(f"generate_catalog: deleting the existing {prefix!r} catalog")
+            delete_set_parts(SetPart.objects.filter(set__number__startswith=f"{prefix}-"))
+            Set.objects.filter(number__startswith=f"{prefix}-").delete()
+            existing.delete()
+            Theme.objects.filter(name__startswith=f"{prefix} Theme ").delete()
+            Color.objects.filter(lego_id__gte=COLOR_ID_BASE, name__startswith=f"{prefix} Color ").delete()
+
+        started = time.monotonic()
+        with transaction.atomic():
+            theme_ids = self.create(Theme, [Theme(name=name) for name in catalog.themes()], batch_size)
+            color_ids = self.create(Color, [
+                Color(lego_id=lego_id, name=name, hex=hex_, is_transparent=trans)
+                for lego_id, name, hex_, trans in catalog.colors()
+            ], batch_size)
+            part_ids = self.create(Part, [
+                Part(part_id=part_id, name=name, general_category=category)
+                for part_id, name, category in catalog.parts()
+            ], batch_size)
+
+            part_colors = catalog.part_colors()
+            part_color_ids = self.create(PartColor, [
+                PartColor(part_id=part_ids[p], color_id=color_ids[c]) for p, c in part_colors
+            ], batch_size)
+
+            sets = catalog.sets(part_colors)
+            set_ids = self.create(Set, [
+                Set(number=number, set_name=name, theme_id=theme_ids[theme])
+                for number, name, theme, _ in sets
+            ], batch_size)
+
+            lines = 0
+            batch = []
+            for set_id, (_, _, _, inventory) in zip(set_ids, sets):
+                for pc, quantity in inventory:
+                    batch.append(SetPart(set_id=set_id, part_color_id=part_color_ids[pc], quantity=quantity))
+                if len(batch) >= batch_size:
+                    SetPart.objects.bulk_create(batch)
+                    lines += len(batch)
+                    batch = []
+            SetPart.objects.bulk_create(batch)
+            lines += len(batch)
+
+            totals = dict(
+                SetPart.objects.filter(set_id__in=set_ids).values("set_id")
+                .annotate(total=Sum("quantity")).values_list("set_id", "total")
+            )
+            generated = list(Set.objects.filter(pk__in=set_ids).only("id", "piece_count"))
+            for set_obj in generated:
+                set_obj.piece_count = totals.get(set_obj.pk, 0)
+            Set.objects.bulk_update(generated, ["piece_count"], batch_size=batch_size)
+
+            versions.bump_models(Theme, Color, Part, PartColor, Set, SetPart)
+            refresh_part_usage(part_ids)
+            refresh_set_aggregates(set_ids, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"generate_catalog: {len(theme_ids)} themes, {len(color_ids)} colors, {len(part_ids)} parts, "
+            f"{len(part_color_ids)} part-colors, {len(set_ids)} sets, {lines} set lines "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def create(self, model, objs, batch_size):
+        """bulk_create `objs` and return their pks in order (re-read where the backend can't return them)."""
+        for start in range(0, len(objs), batch_size):
+            model.objects.bulk_create(objs[start:start + batch_size])
+        if all(obj.pk is not None for obj in objs):
+            return [obj.pk for obj in objs]
+        raise CommandError(f"{model.__name__}: the database did not return the new primary keys")
@@ -0,0 +1,359 @@
+import csv
+import gzip
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import versions
+from parts.models import Color, Part, PartColor
+from sets.models import Set, SetPart, Theme
+from sets.rollups import refresh_part_usage, refresh_set_aggregates
+
+# Imported in this order; each step only needs the lookup maps of earlier ones.
+STEPS = ["themes", "colors", "part_categories", "parts", "sets", "inventories", "inventory_parts"]
+
+# Tables each step writes with bulk upserts, whose catalog versions are bumped after it.
+STEP_MODELS = {
+    "themes": [Theme],
+    "colors": [Color],
+    "parts": [Part],
+    "sets": [Set],
+    "inventory_parts": [PartColor, SetPart],
+}
+
+# Big files are checkpointed per committed batch so an interrupted run can resume.
+# The small reference files are always re-read in full (their maps are needed anyway).
+RESUMABLE = {"parts", "sets", "inventory_parts"}
+
+
+def open_csv(path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def truthy(value):
+    return str(value).strip().lower() in {"t", "true", "1", "yes"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import a Rebrickable-style CSV dump (themes, colors, part_categories, parts, "
+        "sets, inventories, inventory_parts; .csv or .csv.gz) with batched upserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory containing the CSV / CSV.gz files.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file (default: <directory>/.import_catalog.json).",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint.")
+        parser.add_argument("--include-spares", action="store_true", help="Count spare parts in set inventories.")
+
+    def handle(self, *args, **options):
+        self.source = Path(options["directory"])
+        if not self.source.is_dir():
+            raise CommandError(f"{self.source} is not a directory")
+
+        self.batch_size = max(1, options["batch_size"])
+        self.include_spares = options["include_spares"]
+        self.checkpoint_path = Path(options["checkpoint"] or self.source / ".import_catalog.json")
+        self.checkpoint = {}
+        if self.checkpoint_path.exists() and not options["restart"]:
+            self.checkpoint = json.loads(self.checkpoint_path.read_text())
+            self.stdout.write(f"import_catalog: resuming from {self.checkpoint_path}")
+        # rows written since then belong to this import (including the run being resumed)
+        self.started_at = datetime.fromisoformat(
+            self.checkpoint.setdefault("started_at", timezone.now().isoformat())
+        )
+
+        self.load_maps()
+
+        for step in STEPS:
+            path = self.find(step)
+            if path is None:
+                self.stdout.write(f"import_catalog: {step}: no file; skipping.")
+                continue
+            getattr(self, f"import_{step}")(path)
+            versions.bump_models(*STEP_MODELS.get(step, []))
+
+        self.checkpoint_path.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS("import_catalog: done"))
+
+    # --- plumbing ---------------------------------------------------------
+
+    def find(self, name):
+        for candidate in (f"{name}.csv", f"{name}.csv.gz"):
+            path = self.source / candidate
+            if path.exists():
+                return path
+        return None
+
+    def load_maps(self):
+        """Natural key -> pk maps for everything already in the database."""
+        self.theme_by_rb_id = {}  # Rebrickable theme id -> Theme pk
+        self.theme_map = dict(Theme.objects.values_list("name", "id"))
+        self.color_map = dict(Color.objects.filter(lego_id__isnull=False).values_list("lego_id", "id"))
+        self.category_names = {}
+        self.part_map = dict(Part.objects.values_list("part_id", "id"))
+        self.set_map = dict(Set.objects.values_list("number", "id"))
+        self.inventory_sets = {}  # inventory id -> set number
+        self.part_color_map = {
+            (part_id, color_id): pk
+            for pk, part_id, color_id in PartColor.objects.filter(variant="", color__isnull=False)
+            .values_list("id", "part_id", "color_id")
+            .iterator(chunk_size=10000)
+        }
+
+    def save_checkpoint(self, name, rows):
+        self.checkpoint[name] = rows
+        self.checkpoint_path.write_text(json.dumps(self.checkpoint))
+
+    def batches(self, name, path):
+        """
+        Stream `path` in batches of dicts. For resumable files, rows already
+        committed by a previous run are skipped.
+        """
+        skip = self.checkpoint.get(name, 0) if name in RESUMABLE else 0
+        with open_csv(path) as fh:
+            batch = []
+            for i, row in enumerate(csv.DictReader(fh), start=1):
+                if i <= skip:
+                    continue
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    yield batch, i
+                    batch = []
+            if batch:
+                yield batch, i
+
+    def run(self, name, path, write_batch):
+        """Apply `write_batch` to every batch in its own transaction and report throughput."""
+        started = time.monotonic()
+        total = 0
+        for rows, offset in self.batches(name, path):
+            with transaction.atomic():
+                write_batch(rows)
+            if name in RESUMABLE:
+                self.save_checkpoint(name, offset)
+            total += len(rows)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"import_catalog: {name}: {total} rows ({total / elapsed if elapsed else 0:.0f} rows/s)",
+                ending="\r",
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"import_catalog: {name}: {total} rows in {elapsed:.1f}s "
+            f"({total / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    # --- steps ------------------------------------------------------------
+
+    def import_themes(self, path):
+        def write(rows):
+            names = {row["name"].strip()[:50] for row in rows}
+            new = [Theme(name=name) for name in names if name not in self.theme_map]
+            Theme.objects.bulk_create(new, ignore_conflicts=True)
+            if new:
+                self.theme_map.update(
+                    Theme.objects.filter(name__in=[t.name for t in new]).values_list("name", "id")
+                )
+            # Rebrickable theme names repeat under different parents; they share one Theme here.
+            for row in rows:
+                self.theme_by_rb_id[row["id"]] = self.theme_map.get(row["name"].strip()[:50])
+
+        self.run("themes", path, write)
+
+    def import_colors(self, path):
+        def write(rows):
+            colors = {}
+            for row in rows:
+                lego_id = int(row["id"])
+                if lego_id < 0:  # Rebrickable's "[Unknown]" / "[No Color]"
+                    continue
+                rgb = (row.get("rgb") or "").strip()
+                colors[lego_id] = Color(
+                    lego_id=lego_id,
+                    name=row["name"].strip()[:50],
+                    hex=f"#{rgb}"[:7] if rgb else "",
+                    is_transparent=truthy(row.get("is_trans", "")),
+                )
+
+            # Adopt hand-entered colors that match by name but have no lego_id yet,
+            # otherwise the upsert would trip over Color.name's unique constraint.
+            unclaimed = Color.objects.filter(
+                lego_id__isnull=True, name__in=[c.name for c in colors.values()]
+            )
+            by_name = {c.name: c for c in colors.values()}
+            claimed = []
+            for existing in unclaimed:
+                existing.lego_id = by_name[existing.name].lego_id
+                existing.updated_at = timezone.now()
+                claimed.append(existing)
+            Color.objects.bulk_update(claimed, ["lego_id", "updated_at"])
+
+            Color.objects.bulk_create(
+                colors.values(),
+                update_conflicts=True,
+                unique_fields=["lego_id"],
+                update_fields=["name", "hex", "is_transparent", "updated_at"],
+            )
+            self.color_map.update(
+                Color.objects.filter(lego_id__in=list(colors)).values_list("lego_id", "id")
+            )
+
+        self.run("colors", path, write)
+
+    def import_part_categories(self, path):
+        def write(rows):
+            for row in rows:
+                self.category_names[row["id"]] = row["name"].strip()[:80]
+
+        self.run("part_categories", path, write)
+
+    def import_parts(self, path):
+        def write(rows):
+            parts = {}
+            for row in rows:
+                part_id = row["part_num"].strip()[:50]
+                parts[part_id] = Part(
+                    part_id=part_id,
+                    name=row["name"].strip()[:120],
+                    general_category=self.category_names.get(row.get("part_cat_id"), ""),
+                )
+            Part.objects.bulk_create(
+                parts.values(),
+                update_conflicts=True,
+                unique_fields=["part_id"],
+                update_fields=["name", "general_category", "updated_at"],
+            )
+            self.part_map.update(Part.objects.filter(part_id__in=list(parts)).values_list("part_id", "id"))
+
+        self.run("parts", path, write)
+
+    def import_sets(self, path):
+        skipped = 0
+
+        def write(rows):
+            nonlocal skipped
+            sets = {}
+            for row in rows:
+                theme_id = self.theme_by_rb_id.get(row.get("theme_id"))
+                if theme_id is None:
+                    skipped += 1
+                    continue
+                number = row["set_num"].strip()[:50]
+                image_url = (row.get("img_url") or "").strip()
+                sets[number] = Set(
+                    number=number,
+                    set_name=row["name"].strip()[:120],
+                    theme_id=theme_id,
+                    piece_count=max(0, int(row.get("num_parts") or 0)),
+                    image_url=image_url if len(image_url) <= 200 else "",
+                )
+            Set.objects.bulk_create(
+                sets.values(),
+                update_conflicts=True,
+                unique_fields=["number"],
+                update_fields=["set_name", "theme", "piece_count", "image_url", "updated_at"],
+            )
+            self.set_map.update(Set.objects.filter(number__in=list(sets)).values_list("number", "id"))
+
+        if not self.theme_by_rb_id:
+            raise CommandError("sets need themes.csv (Rebrickable theme ids) to resolve themes.")
+        self.run("sets", path, write)
+        if skipped:
+            self.stdout.write(f"import_catalog: sets: skipped {skipped} rows with an unknown theme")
+
+    def import_inventories(self, path):
+        # Sets can have several inventory versions; keep the lowest one.
+        lowest = {}
+
+        def write(rows):
+            for row in rows:
+                set_num = row["set_num"].strip()
+                version = int(row.get("version") or 1)
+                if set_num not in lowest or version < lowest[set_num][0]:
+                    lowest[set_num] = (version, row["id"])
+
+        self.run("inventories", path, write)
+        self.inventory_sets = {inventory_id: set_num for set_num, (_, inventory_id) in lowest.items()}
+
+    def import_inventory_parts(self, path):
+        skipped = 0
+
+        def write(rows):
+            nonlocal skipped
+            wanted = []
+            for row in rows:
+                if not self.include_spares and truthy(row.get("is_spare", "")):
+                    continue
+                set_id = self.set_map.get(self.inventory_sets.get(row["inventory_id"]))
+                part_id = self.part_map.get(row["part_num"].strip())
+                color_id = self.color_map.get(int(row["color_id"])) if row["color_id"].lstrip("-").isdigit() else None
+                if set_id is None or part_id is None or color_id is None:
+                    skipped += 1
+                    continue
+                wanted.append((set_id, part_id, color_id, int(row.get("quantity") or 1), row))
+
+            missing = {}
+            for _, part_id, color_id, _, row in wanted:
+                key = (part_id, color_id)
+                if key not in self.part_color_map and key not in missing:
+                    image_url = (row.get("img_url") or "").strip()
+                    missing[key] = PartColor(
+                        part_id=part_id,
+                        color_id=color_id,
+                        variant="",
+                        image_url_1=image_url if 0 < len(image_url) <= 200 else None,
+                    )
+            if missing:
+                # Only new rows get an image; existing part-colors keep whatever the admin set.
+                PartColor.objects.bulk_create(missing.values(), ignore_conflicts=True)
+                for pk, part_id, color_id in PartColor.objects.filter(
+                    variant="",
+                    part_id__in={k[0] for k in missing},
+                    color_id__in={k[1] for k in missing},
+                ).values_list("id", "part_id", "color_id"):
+                    self.part_color_map[(part_id, color_id)] = pk
+
+            # Rows for the same set/part-color are summed (Rebrickable repeats them for
+            # spares, which are skipped unless --include-spares). A line this import
+            # already wrote in an earlier batch is added to; older ones are replaced.
+            quantities = {}
+            for set_id, part_id, color_id, quantity, _ in wanted:
+                key = (set_id, self.part_color_map[(part_id, color_id)])
+                quantities[key] = quantities.get(key, 0) + quantity
+            if quantities:
+                for set_id, part_color_id, quantity in SetPart.objects.filter(
+                    set_id__in={s for s, _ in quantities},
+                    part_color_id__in={pc for _, pc in quantities},
+                    updated_at__gte=self.started_at,
+                ).values_list("set_id", "part_color_id", "quantity"):
+                    if (key := (set_id, part_color_id)) in quantities:
+                        quantities[key] += quantity
+            SetPart.objects.bulk_create(
+                [SetPart(set_id=s, part_color_id=pc, quantity=q) for (s, pc), q in quantities.items()],
+                update_conflicts=True,
+                unique_fields=["set", "part_color"],
+                update_fields=["quantity", "updated_at"],
+            )
+            # In the batch's transaction, so a resumed import never leaves them stale
+            refresh_set_aggregates({s for s, _ in quantities})
+
+        if not self.inventory_sets:
+            raise CommandError("inventory_parts need inventories.csv to resolve sets.")
+        self.run("inventory_parts", path, write)
+        refresh_part_usage()
+        if skipped:
+            self.stdout.write(
+                f"import_catalog: inventory_parts: skipped {skipped} rows with an unknown set, part or color"
+            )
@@ -0,0 +1,158 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = ["wsgi", "asgi"]
+MODES = ["pooled", "persistent", "none"]
+DEFAULT_PATHS = ["/api/search/?q=brick", "/api/search/?q=3001"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the API under gunicorn once per SERVER_MODE (wsgi, asgi) and DB_CONN_MODE "
+        "(pooled, persistent, none) and compare throughput and latency. Use --url to hit an "
+        "already running server instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", action="append", choices=SERVERS, help="Repeatable; default: both.")
+        parser.add_argument("--mode", action="append", choices=MODES, help="Repeatable; default: all modes.")
+        parser.add_argument("--url", help="Base URL of a running server (skips starting gunicorn).")
+        parser.add_argument("--path", action="append", help=f"Repeatable; default: {DEFAULT_PATHS}.")
+        parser.add_argument("--token", help="Bearer token sent with every request.")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        self.paths = options["path"] or DEFAULT_PATHS
+        self.headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+        self.concurrency = max(1, options["concurrency"])
+        self.duration = max(1.0, options["duration"])
+
+        results = []
+        if options["url"]:
+            results.append(self.measure("external", options["url"]))
+        else:
+            for server in options["server"] or SERVERS:
+                for mode in options["mode"] or MODES:
+                    if server == "asgi" and mode == "persistent":
+                        continue  # not supported under ASGI (see settings)
+                    with self.server(server, mode) as url:
+                        results.append(self.measure(f"{server}/{mode}", url))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            self.stdout.write(
+                f"{r['mode']:>16}: {r['requests_per_second']:8.1f} req/s  "
+                f"p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  "
+                f"errors {r['errors']}"
+            )
+
+    @contextmanager
+    def server(self, server, mode):
+        port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "-c", str(settings.BASE_DIR / "config" / "gunicorn.conf.py"),
+                "--bind", f"127.0.0.1:{port}",
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "SERVER_MODE": server, "DB_CONN_MODE": mode, "GUNICORN_ACCESS_LOG": ""},
+        )
+        try:
+            url = f"http://127.0.0.1:{port}"
+            self.wait_until_up(url, process)
+            yield url
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def wait_until_up(self, url, process, timeout=30):
+        parts = urlsplit(url)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("gunicorn exited during startup")
+            try:
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+                conn.request("GET", self.paths[0], headers=self.headers)
+                conn.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"{url} did not come up within {timeout}s")
+
+    def measure(self, mode, url):
+        parts = urlsplit(url)
+        deadline = time.monotonic() + self.duration
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def client(offset):
+            nonlocal errors
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            mine, failed, i = [], 0, offset
+            while time.monotonic() < deadline:
+                path = self.paths[i % len(self.paths)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=self.headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status >= 400:
+                        failed += 1
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                    continue
+                mine.append((time.perf_counter() - started) * 1000)
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+                errors += failed
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(self.concurrency)]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            "mode": mode,
+            "requests": len(latencies),
+            "errors": errors,
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+        }
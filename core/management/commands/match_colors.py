@@ -0,0 +1,91 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import versions
+from parts import colormatch
+from parts.models import PartColor
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolve hex codes to their nearest catalog Color (CIEDE2000), or with --backfill set "
+        "PartColor.color from color_hex on every part-color that has none, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hex", nargs="*", help="Hex codes to resolve ('-' reads them from stdin, one per line).")
+        parser.add_argument("--backfill", action="store_true", help="Fill in PartColor.color from color_hex.")
+        parser.add_argument("--max-delta-e", type=float, help="Leave codes further than this from every color unmatched.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="With --backfill: report without writing.")
+
+    def handle(self, *args, **options):
+        index = colormatch.get_index()
+        if not index.colors:
+            raise CommandError("No catalog colors with a hex value to match against.")
+        if options["backfill"]:
+            self.backfill(index, options)
+            return
+        codes = options["hex"]
+        if codes == ["-"]:
+            codes = [line.strip() for line in sys.stdin if line.strip()]
+        if not codes:
+            raise CommandError("Give hex codes to resolve, or --backfill.")
+        for result in index.match(codes, options["max_delta_e"]):
+            color = result["color"]
+            if color is None:
+                self.stdout.write(f"{result['hex']}\t-")
+            else:
+                self.stdout.write(
+                    f"{result['hex']}\t{color['lego_id']}\t{color['name']}\t{color['hex']}\t{result['delta_e']}"
+                )
+
+    def backfill(self, index, options):
+        batch_size = max(1, options["batch_size"])
+        started = time.monotonic()
+        filled = unmatched = conflicts = 0
+        last_pk = 0
+        pending = PartColor.objects.filter(color__isnull=True).exclude(color_hex="").order_by("pk")
+        while True:
+            rows = list(pending.filter(pk__gt=last_pk).only("id", "part_id", "variant", "color_hex")[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            found = index.match([row.color_hex for row in rows], options["max_delta_e"])
+
+            # (part, color, variant) is unique, so skip rows whose match would
+            # duplicate an existing part-color (or one filled earlier in the batch)
+            taken = set(
+                PartColor.objects.filter(part_id__in={row.part_id for row in rows}, color__isnull=False)
+                .values_list("part_id", "color_id", "variant")
+            )
+            now = timezone.now()
+            changed = []
+            for row, result in zip(rows, found):
+                if result["color"] is None:
+                    unmatched += 1
+                    continue
+                key = (row.part_id, result["color"]["id"], row.variant)
+                if key in taken:
+                    conflicts += 1
+                    continue
+                taken.add(key)
+                row.color_id = result["color"]["id"]
+                row.updated_at = now
+                changed.append(row)
+
+            if changed and not options["dry_run"]:
+                with transaction.atomic():
+                    PartColor.objects.bulk_update(changed, ["color", "updated_at"])
+                versions.bump_models(PartColor)
+            filled += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"match_colors: {'would fill' if options['dry_run'] else 'filled'} {filled} part-colors; "
+            f"{unmatched} unmatched, {conflicts} skipped as duplicates "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
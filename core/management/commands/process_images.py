@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = "Generate missing or stale image derivatives for parts, part-colors, sets and themes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.IMAGE_PIPELINE_WORKERS)
+        parser.add_argument("--force", action="store_true", help="Rebuild even up-to-date derivatives.")
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label, (_, fields) in images.SOURCES.items():
+            model = apps.get_model(label)
+            for obj in model.objects.only("pk", "image_derivatives", *fields).iterator(chunk_size=2000):
+                url = images.source_url(obj)
+                if options["force"] or url != (obj.image_derivatives or {}).get("source"):
+                    if options["force"]:
+                        model.objects.filter(pk=obj.pk).update(image_derivatives={})
+                    jobs.append((label, obj.pk))
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            futures = [pool.submit(images.process, label, pk) for label, pk in jobs]
+            for (label, pk), future in zip(jobs, futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"process_images: {label} {pk}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"process_images: {len(jobs) - failed} processed, {failed} failed"))
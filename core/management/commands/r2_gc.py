@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import orphans
+from core.storage import get_storage
+from core.views_r2 import ALLOWED_FOLDERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete bucket objects no catalog row references any more (replaced or deleted images "
+        "and their derivatives). Lists each folder in parallel and deletes in batches of 1000."
+    )
+
+    def add_arguments(self, parser):
+        prefixes = sorted(ALLOWED_FOLDERS) + [orphans.DERIVED_PREFIX]
+        parser.add_argument("--folder", action="append", choices=prefixes, help="Repeatable; default: all.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted.")
+        parser.add_argument(
+            "--min-age-hours", type=float, default=24.0,
+            help="Keep objects written more recently than this (uploads not yet saved to a row).",
+        )
+        parser.add_argument("--workers", type=int, help="Listing threads (default: one per folder).")
+
+    def handle(self, *args, **options):
+        prefixes = options["folder"] or sorted(ALLOWED_FOLDERS) + [orphans.DERIVED_PREFIX]
+        cutoff = timezone.now() - timedelta(hours=options["min_age_hours"])
+        started = time.monotonic()
+
+        report = None
+        if options["verbosity"] >= 2:
+            lock = threading.Lock()
+
+            def report(keys):
+                with lock:
+                    for key in keys:
+                        self.stdout.write(f"r2_gc: {'would delete' if options['dry_run'] else 'delete'} {key}")
+
+        try:
+            results = orphans.collect(
+                get_storage(), prefixes, cutoff, dry_run=options["dry_run"], workers=options["workers"], report=report,
+            )
+        except orphans.UnsafeSweep as exc:
+            raise CommandError(f"r2_gc: refusing to delete: {exc}")
+        verb = "would delete" if options["dry_run"] else "deleted"
+        for r in results:
+            self.stdout.write(
+                f"r2_gc: {r['prefix']}: {r['listed']} listed, {r['referenced']} referenced, "
+                f"{r['recent']} recent, {verb} {r['deleted']} ({r['bytes']} bytes), {len(r['errors'])} errors"
+            )
+            for key, message in r["errors"][:10]:
+                self.stderr.write(f"r2_gc: failed to delete {key}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"r2_gc: {verb} {sum(r['deleted'] for r in results)} objects "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
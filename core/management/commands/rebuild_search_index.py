@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.search import install_index
+
+
+class Command(BaseCommand):
+    help = "(Re)create the catalog search table and triggers and re-index every row."
+
+    def handle(self, *args, **options):
+        install_index()
+        self.stdout.write(self.style.SUCCESS("rebuild_search_index: done"))
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (core.Job) until stopped. Any number of workers can share the "
+        "queue; SIGTERM/SIGINT lets the jobs in flight finish before exiting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.JOBS["WORKERS"], help="Jobs run at once.",
+        )
+        parser.add_argument(
+            "--pool", choices=["thread", "process"], default="thread",
+            help="Run jobs on threads, or on processes for CPU-bound work.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=settings.JOBS["POLL_INTERVAL"])
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is ready.")
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(
+            concurrency=options["concurrency"], pool=options["pool"], poll_interval=options["poll_interval"],
+        )
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: worker.stop())
+
+        self.stdout.write(
+            f"run_worker: {worker.name}, {worker.concurrency} at a time on a {options['pool']} pool"
+            f"{', until the queue is empty' if options['burst'] else ''}"
+        )
+        started = time.monotonic()
+        counts = worker.run(burst=options["burst"])
+        self.stdout.write(self.style.SUCCESS(
+            f"run_worker: {counts['succeeded']} succeeded, {counts['queued']} to retry, "
+            f"{counts['failed']} failed in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,191 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware samples requests (settings.REQUEST_METRICS) and, for
+each sampled one, records:
+
+- queries / db_ms:   every SQL statement run for it, on any thread (async
+                     views run their ORM calls in worker threads), via an
+                     execute wrapper installed on each connection
+- serialize_ms:      time spent rendering the response body (core.renderers)
+- total_ms, bytes
+
+They go into a JSON log line on the "core.metrics" logger and a rolling
+window per route from which /api/admin/metrics/ reports p50/p95/p99. Staff
+users (and everyone while DEBUG) also get them as a `Server-Timing` header;
+query counts and timings are not for anonymous clients. Unsampled requests cost one
+random() call; the execute wrapper does nothing outside a sampled request.
+"""
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("total_ms", "db_ms", "queries", "serialize_ms", "bytes")
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "db_ms", "serialize_ms")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+
+
+def current():
+    """The metrics of the sampled request being handled, or None."""
+    return _current.get()
+
+
+def record_queries(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_ms += (time.perf_counter() - started) * 1000
+        metrics.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def connect():
+    connection_created.connect(install_query_recorder, dispatch_uid="request-metrics")
+
+
+# --- rolling per-route windows ----------------------------------------------
+
+_lock = threading.Lock()
+_windows = {}  # route -> deque of FIELDS tuples
+
+
+def observe(route, sample):
+    window = settings.REQUEST_METRICS["WINDOW"]
+    with _lock:
+        samples = _windows.get(route)
+        if samples is None:
+            samples = _windows[route] = deque(maxlen=window)
+        samples.append(sample)
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report():
+    """{route: {"count": n, field: {"p50", "p95", "p99"}}} over each route's window."""
+    with _lock:
+        windows = {route: list(samples) for route, samples in _windows.items()}
+    result = {}
+    for route, samples in sorted(windows.items()):
+        entry = {"count": len(samples)}
+        for i, field in enumerate(FIELDS):
+            ordered = sorted(sample[i] for sample in samples)
+            entry[field] = {
+                "p50": percentile(ordered, 0.50),
+                "p95": percentile(ordered, 0.95),
+                "p99": percentile(ordered, 0.99),
+            }
+        result[route] = entry
+    return result
+
+
+def reset():
+    with _lock:
+        _windows.clear()
+
+
+# --- middleware --------------------------------------------------------------
+
+def route_of(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return f"{request.method} <unresolved>"
+    return f"{request.method} {match.view_name or match.route}"
+
+
+def finish(request, response, metrics, started):
+    total_ms = (time.perf_counter() - started) * 1000
+    size = len(response.content) if not response.streaming else 0
+    if settings.DEBUG or getattr(getattr(request, "user", None), "is_staff", False):
+        response["Server-Timing"] = (
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries", '
+            f"serialize;dur={metrics.serialize_ms:.1f}, "
+            f"total;dur={total_ms:.1f}"
+        )
+    route = route_of(request)
+    sample = (
+        round(total_ms, 2),
+        round(metrics.db_ms, 2),
+        metrics.queries,
+        round(metrics.serialize_ms, 2),
+        size,
+    )
+    observe(route, sample)
+    if settings.REQUEST_METRICS["LOG"]:
+        logger.info(json.dumps({
+            "route": route,
+            "path": request.path,
+            "status": response.status_code,
+            **dict(zip(FIELDS, sample)),
+        }))
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = settings.REQUEST_METRICS["SAMPLE_RATE"]
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        finish(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        finish(request, response, metrics, started)
+        return response
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from core.search import detach_sqlite_triggers, install_index
+    install_index(schema_editor.connection)
+    # Later migrations in the same run may rebuild the catalog tables on SQLite;
+    # core's post_migrate handler attaches the triggers once they are done.
+    detach_sqlite_triggers(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from core.search import uninstall_index
+    uninstall_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0005_part_part_name_idx_part_part_general_category_idx_and_more'),
+        ('sets', '0002_set_set_name_idx_set_set_piece_count_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
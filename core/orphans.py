@@ -0,0 +1,139 @@
+"""
+Garbage collection of orphaned objects in the asset bucket.
+
+Every upload gets a fresh key and nothing deletes the old object when an
+image is replaced or its row removed. A sweep:
+
+1. collects every key still referenced, from the image URL fields and the
+   derivative URLs of all image-bearing models, with one streamed UNION query;
+2. lists each prefix (the upload folders plus "derived") on its own thread;
+3. deletes what is neither referenced nor recently written, in batches of
+   up to 1000 keys per DeleteObjects call.
+
+Recent objects are kept because a presigned upload lands in the bucket
+before the row pointing at it is saved.
+
+A sweep that can't map the catalog's URLs onto keys would take every key
+for an orphan, so collect() refuses to delete when the R2 backend has no
+real public base URL, or when rows hold image URLs yet none of them maps to
+a key.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.apps import apps
+from django.db.models import F, Q, URLField, Value
+
+from .images import CONTENT_TYPES, SOURCES
+from .storage import R2Storage
+
+DELETE_BATCH = 1000
+DERIVED_PREFIX = "derived"
+
+
+def derivative_urls(derived):
+    for entry in (derived or {}).values():
+        if isinstance(entry, dict):
+            for fmt, url in entry.items():
+                if fmt in CONTENT_TYPES:
+                    yield url
+
+
+def referenced_keys(storage, chunk_size=5000):
+    """Keys of every object an image field or derivative points at."""
+    width = max(len(fields) for _, fields in SOURCES.values())
+    queries = []
+    for label, (_, fields) in SOURCES.items():
+        urls = [F(field) for field in fields] + [Value(None, output_field=URLField())] * (width - len(fields))
+        columns = {f"url_{i}": url for i, url in enumerate(urls)}
+        queries.append(
+            apps.get_model(label).objects.order_by()
+            .annotate(**columns, derived=F("image_derivatives"))
+            .values_list(*columns, "derived")
+        )
+    keys = set()
+    for *urls, derived in queries[0].union(*queries[1:], all=True).iterator(chunk_size=chunk_size):
+        for url in (*urls, *derivative_urls(derived)):
+            key = storage.key_for_url(url)
+            if key:
+                keys.add(key)
+    return keys
+
+
+class UnsafeSweep(Exception):
+    pass
+
+
+def has_image_urls():
+    """Whether any catalog row has an image URL set."""
+    for label, (_, fields) in SOURCES.items():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__isnull": False}) & ~Q(**{field: ""})
+        if apps.get_model(label).objects.filter(condition).exists():
+            return True
+    return False
+
+
+def check_mapping(storage, referenced):
+    """Raise UnsafeSweep when `referenced` can't be trusted to spare the live objects."""
+    host = urlsplit(storage.public_base_url).hostname
+    if isinstance(storage, R2Storage) and host in (None, "localhost", "127.0.0.1", "::1"):
+        raise UnsafeSweep(
+            f"the R2 backend's public base URL is {storage.public_base_url or 'not set'!r}, so no catalog "
+            "URL maps to a bucket key; set R2_PUBLIC_BASE_URL."
+        )
+    if not referenced and has_image_urls():
+        raise UnsafeSweep(
+            f"catalog rows have image URLs but none is under {storage.public_base_url!r}; "
+            "check R2_PUBLIC_BASE_URL."
+        )
+
+
+def sweep(storage, prefix, referenced, cutoff, dry_run=False, report=None):
+    """
+    Delete the unreferenced objects under `prefix` last modified before
+    `cutoff`. `report(keys)` sees every batch (also on dry runs).
+    """
+    stats = {"prefix": prefix, "listed": 0, "referenced": 0, "recent": 0, "deleted": 0, "bytes": 0, "errors": []}
+    batch = []
+
+    def flush(keys):
+        if report is not None:
+            report(keys)
+        if not dry_run:
+            errors = storage.delete_objects(keys)
+            stats["errors"] += errors
+            stats["deleted"] += len(keys) - len(errors)
+        else:
+            stats["deleted"] += len(keys)
+
+    for key, modified, size in storage.list_objects(prefix.rstrip("/") + "/"):
+        stats["listed"] += 1
+        if key in referenced:
+            stats["referenced"] += 1
+        elif modified >= cutoff:
+            stats["recent"] += 1
+        else:
+            batch.append(key)
+            stats["bytes"] += size
+            if len(batch) >= DELETE_BATCH:
+                flush(batch)
+                batch = []
+    if batch:
+        flush(batch)
+    return stats
+
+
+def collect(storage, prefixes, cutoff, dry_run=False, workers=None, report=None):
+    """
+    Sweep `prefixes` in parallel; returns their stats in `prefixes` order.
+    Raises UnsafeSweep (before deleting anything) when the URL-to-key mapping
+    looks wrong; dry runs only report.
+    """
+    referenced = referenced_keys(storage)
+    if not dry_run:
+        check_mapping(storage, referenced)
+    with ThreadPoolExecutor(max_workers=workers or len(prefixes) or 1) as pool:
+        futures = [pool.submit(sweep, storage, prefix, referenced, cutoff, dry_run, report) for prefix in prefixes]
+        return [future.result() for future in futures]
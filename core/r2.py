@@ -1,16 +1,131 @@
+"""
+Process-wide R2 (S3 API) client.
+
+Building a boto3 client loads and parses the service model, which costs tens
+of milliseconds and a few MB each time, so one client is built lazily and
+shared by every thread in the process (boto3 clients are thread-safe). It is
+rebuilt only when the credentials in the environment change. boto3 itself
+(a few hundred ms to import) is only loaded then, not when a worker boots.
+
+R2_MAX_POOL_CONNECTIONS sizes the client's HTTP connection pool (default 10).
+"""
 import os
-import boto3
-from botocore.config import Config
+import threading
 
-def r2_client():
-    account_id = os.environ["R2_ACCOUNT_ID"]
-    endpoint_url = f"https://{account_id}.r2.cloudflarestorage.com"
+PRESIGN_EXPIRES = 60 * 5  # 5 minutes
+
+MIB = 1024 * 1024
+MAX_PARTS = 10000  # S3/R2 limit on parts per multipart upload
+
+_lock = threading.Lock()
+_cached = None  # (settings, client), swapped as one object so readers never see a mix
+
+
+def _settings():
+    return (
+        os.environ["R2_ACCOUNT_ID"],
+        os.environ["R2_ACCESS_KEY_ID"],
+        os.environ["R2_SECRET_ACCESS_KEY"],
+        int(os.environ.get("R2_MAX_POOL_CONNECTIONS", "10")),
+    )
 
+
+def build_r2_client():
+    """A brand-new client; prefer r2_client() outside of benchmarks."""
+    import boto3
+    from botocore.config import Config
+
+    account_id, access_key_id, secret_access_key, pool_size = _settings()
     return boto3.client(
         "s3",
-        endpoint_url=endpoint_url,
-        aws_access_key_id=os.environ["R2_ACCESS_KEY_ID"],
-        aws_secret_access_key=os.environ["R2_SECRET_ACCESS_KEY"],
+        endpoint_url=f"https://{account_id}.r2.cloudflarestorage.com",
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
         region_name="auto",
-        config=Config(signature_version="s3v4"),
+        config=Config(signature_version="s3v4", max_pool_connections=pool_size),
     )
+
+
+def r2_client():
+    global _cached
+    key = _settings()
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _lock:
+        if _cached is None or _cached[0] != key:
+            _cached = (key, build_r2_client())
+        return _cached[1]
+
+
+def reset_r2_client():
+    global _cached
+    with _lock:
+        _cached = None
+
+
+def presign_put(key, content_type, expires_in=PRESIGN_EXPIRES, client=None):
+    """Presigned PUT URL for `key` in R2_BUCKET_NAME (signing is local; no network)."""
+    return (client or r2_client()).generate_presigned_url(
+        ClientMethod="put_object",
+        Params={
+            "Bucket": os.environ["R2_BUCKET_NAME"],
+            "Key": key,
+            "ContentType": content_type,
+        },
+        ExpiresIn=expires_in,
+    )
+
+
+def public_url(key):
+    return f"{os.environ['R2_PUBLIC_BASE_URL'].rstrip('/')}/{key}"
+
+
+def multipart_part_size(size, part_size):
+    """`part_size`, grown in whole MiB when `size` would otherwise need more than MAX_PARTS parts."""
+    needed = -(-size // MAX_PARTS)
+    if needed <= part_size:
+        return part_size
+    return -(-needed // MIB) * MIB
+
+
+def presign_multipart(key, content_type, size, part_size, expires_in=60 * 60):
+    """
+    Start a multipart upload for an object of `size` bytes and presign one PUT
+    per chunk of at least `part_size` (see multipart_part_size()). The client
+    PUTs each part, collects the ETags and then calls complete_multipart().
+    Returns (upload_id, part_size, part_urls).
+    """
+    client = r2_client()
+    bucket = os.environ["R2_BUCKET_NAME"]
+    part_size = multipart_part_size(size, part_size)
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+    part_count = max(1, -(-size // part_size))
+    part_urls = [
+        client.generate_presigned_url(
+            ClientMethod="upload_part",
+            Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": number},
+            ExpiresIn=expires_in,
+        )
+        for number in range(1, part_count + 1)
+    ]
+    return upload_id, part_size, part_urls
+
+
+def complete_multipart(key, upload_id, parts):
+    """`parts` is [{"part_number": 1, "etag": "..."}, ...]."""
+    r2_client().complete_multipart_upload(
+        Bucket=os.environ["R2_BUCKET_NAME"],
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={
+            "Parts": [
+                {"PartNumber": int(p["part_number"]), "ETag": p["etag"]}
+                for p in sorted(parts, key=lambda p: int(p["part_number"]))
+            ]
+        },
+    )
+
+
+def abort_multipart(key, upload_id):
+    r2_client().abort_multipart_upload(Bucket=os.environ["R2_BUCKET_NAME"], Key=key, UploadId=upload_id)
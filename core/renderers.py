@@ -0,0 +1,19 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that adds its time to the request's serialization metrics (core.metrics)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        recorded = metrics.current()
+        if recorded is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            recorded.serialize_ms += (time.perf_counter() - started) * 1000
@@ -0,0 +1,90 @@
+"""
+Compact list rows and client-side field selection for the catalog endpoints.
+
+List actions of views with CompactListMixin answer with one small row per
+object (ids, names, image URLs, thumbnail, aggregates) built straight from `.values()`:
+no model instances and no serializer fields. Detail actions, writes and
+expanded lists go through the full serializer.
+
+Two query parameters shape either representation:
+
+    ?fields=id,number,thumb_url   only these keys
+    ?expand=parts_detail          add full-representation fields to list rows
+
+Only top-level keys are selected; nested objects come back whole.
+"""
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+def query_list(request, name):
+    """The comma-separated values of query parameter `name`, as a set."""
+    if request is None:
+        return set()
+    return {item.strip() for item in request.query_params.get(name, "").split(",") if item.strip()}
+
+
+class SelectableFieldsMixin:
+    """Serializer mixin: keep only the fields named in the context's "fields"."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = self.context.get("fields")
+        if wanted:
+            for name in set(self.fields) - set(wanted):
+                self.fields.pop(name)
+
+
+class FieldSelectionMixin:
+    """View mixin: pass ?fields= (plus ?expand= on lists) to the serializer context."""
+    # keys of a compact list row; expanded lists render these plus ?expand=
+    compact_fields = ()
+
+    def selected_fields(self):
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        fields = query_list(request, "fields")
+        expand = query_list(request, "expand")
+        if self.action == "list" and expand and self.compact_fields:
+            fields = (fields or set(self.compact_fields)) | expand
+        return fields or None
+
+    def wants(self, name):
+        """Whether the serializer will render field `name` for this request."""
+        fields = self.selected_fields()
+        return fields is None or name in fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.selected_fields()
+        if fields:
+            context["fields"] = fields
+        return context
+
+
+class CompactListMixin(FieldSelectionMixin):
+    """
+    View mixin: unexpanded lists are built from `.values(*compact_values)`,
+    shaped by `compact_row`. Every `ordering_fields` entry must be among
+    compact_values, and so must "id" (the ordering tiebreaker), since cursor
+    pagination reads them off the rows.
+    """
+    compact_values = ()
+
+    def compact_row(self, row):
+        return row
+
+    def list(self, request, *args, **kwargs):
+        if query_list(request, "expand"):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*self.compact_values)
+        page = self.paginate_queryset(queryset)
+        rows = [self.compact_row(row) for row in (page if page is not None else queryset)]
+        fields = query_list(request, "fields")
+        if fields:
+            rows = [{key: value for key, value in row.items() if key in fields} for row in rows]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
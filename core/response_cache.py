@@ -0,0 +1,55 @@
+"""
+Server-side cache of serialized catalog responses.
+
+Entries live in the "catalog" cache (settings.CACHES) under a key derived
+from the response's ETag (see core.conditional), which already covers the
+path, query, Accept header and the versions of every table the response
+reads. A write anywhere (viewsets, admin, importer) moves a version, so old
+entries are simply never looked up again and age out of the backend.
+
+Hit/miss counters are kept per process.
+"""
+import threading
+
+from django.core.cache import caches
+
+CACHE_ALIAS = "catalog"
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def cache():
+    return caches[CACHE_ALIAS]
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def lookup(key):
+    """The cached (status, data) for `key`, or None."""
+    entry = cache().get(key)
+    _count("misses" if entry is None else "hits")
+    return entry
+
+
+def store(key, status, data):
+    cache().set(key, (status, data))
+    _count("stores")
+
+
+def stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else None
+    counters["backend"] = type(cache()).__name__
+    return counters
+
+
+def reset_stats():
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,295 @@
+"""
+Catalog-wide search index.
+
+Every searchable row (parts, part-colors, colors, sets, themes) gets one
+document in `core_catalogsearch`, keyed by `obj_id * 8 + kind`. The table is
+kept in sync by database triggers, so bulk writes and raw SQL stay indexed
+too.
+
+- Postgres: plain table with a pg_trgm GIN index, ranked by word_similarity.
+- SQLite: FTS5 table with the trigram tokenizer, ranked by bm25.
+
+Both are typo tolerant because the query is matched trigram by trigram.
+
+SQLite rebuilds a table for most ALTER TABLEs, which drops (or breaks) the
+triggers on it, so there the triggers are removed before `migrate` and put
+back, with a full re-index, after it (see CoreConfig.ready).
+"""
+import re
+
+from django.db import connection, connections
+
+TABLE = "core_catalogsearch"
+KIND_STRIDE = 8
+
+PART = 1
+PART_COLOR = 2
+COLOR = 3
+SET = 4
+THEME = 5
+
+KIND_NAMES = {
+    PART: "parts",
+    PART_COLOR: "part_colors",
+    COLOR: "colors",
+    SET: "sets",
+    THEME: "themes",
+}
+
+# kind -> (FROM clause, id column, document body)
+DOCUMENTS = {
+    PART: (
+        "parts_part p",
+        "p.id",
+        "p.part_id || ' ' || p.name",
+    ),
+    PART_COLOR: (
+        "parts_partcolor pc"
+        " JOIN parts_part p ON p.id = pc.part_id"
+        " LEFT JOIN parts_color c ON c.id = pc.color_id",
+        "pc.id",
+        "pc.part_number || ' ' || p.part_id || ' ' || p.name || ' '"
+        " || COALESCE(c.name, '') || ' ' || pc.variant",
+    ),
+    COLOR: (
+        "parts_color c",
+        "c.id",
+        "COALESCE(c.name, '')",
+    ),
+    SET: (
+        "sets_set s",
+        "s.id",
+        "s.number || ' ' || s.set_name",
+    ),
+    THEME: (
+        "sets_theme t",
+        "t.id",
+        "t.name",
+    ),
+}
+
+# table -> (own kind, [(dependent kind, WHERE on NEW.id)]) refreshed by its trigger
+TRIGGERS = {
+    "parts_part": (PART, [(PART_COLOR, "pc.part_id = NEW.id")]),
+    "parts_partcolor": (PART_COLOR, []),
+    "parts_color": (COLOR, [(PART_COLOR, "pc.color_id = NEW.id")]),
+    "sets_set": (SET, []),
+    "sets_theme": (THEME, []),
+}
+
+
+def _doc_select(kind, where):
+    source, id_col, body = DOCUMENTS[kind]
+    return (
+        f"SELECT {id_col} * {KIND_STRIDE} + {kind}, {kind}, {id_col}, {body} "
+        f"FROM {source} WHERE {where}"
+    )
+
+
+def _doc_ids(kind, where):
+    source, id_col, _ = DOCUMENTS[kind]
+    return f"SELECT {id_col} * {KIND_STRIDE} + {kind} FROM {source} WHERE {where}"
+
+
+def _own_where(kind):
+    return f"{DOCUMENTS[kind][1]} = NEW.id"
+
+
+# --- SQLite (FTS5) ---------------------------------------------------------
+
+def _sqlite_install_sql():
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+        f"USING fts5(body, kind UNINDEXED, obj_id UNINDEXED, tokenize='trigram')",
+    ]
+    insert = f"INSERT INTO {TABLE}(rowid, kind, obj_id, body) "
+
+    for table, (kind, dependents) in TRIGGERS.items():
+        refresh = [
+            f"DELETE FROM {TABLE} WHERE rowid = NEW.id * {KIND_STRIDE} + {kind};",
+            insert + _doc_select(kind, _own_where(kind)) + ";",
+        ]
+        cascade = []
+        for dep_kind, where in dependents:
+            cascade += [
+                f"DELETE FROM {TABLE} WHERE rowid IN ({_doc_ids(dep_kind, where)});",
+                insert + _doc_select(dep_kind, where) + ";",
+            ]
+
+        statements += [
+            f"DROP TRIGGER IF EXISTS {TABLE}_{table}_ai",
+            f"DROP TRIGGER IF EXISTS {TABLE}_{table}_au",
+            f"DROP TRIGGER IF EXISTS {TABLE}_{table}_ad",
+            f"CREATE TRIGGER {TABLE}_{table}_ai AFTER INSERT ON {table} BEGIN "
+            + " ".join(refresh) + " END",
+            f"CREATE TRIGGER {TABLE}_{table}_au AFTER UPDATE ON {table} BEGIN "
+            + " ".join(refresh + cascade) + " END",
+            f"CREATE TRIGGER {TABLE}_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {TABLE} WHERE rowid = OLD.id * {KIND_STRIDE} + {kind}; END",
+        ]
+    return statements
+
+
+def _sqlite_drop_triggers_sql():
+    return [
+        f"DROP TRIGGER IF EXISTS {TABLE}_{table}_{suffix}"
+        for table in TRIGGERS
+        for suffix in ("ai", "au", "ad")
+    ]
+
+
+def _sqlite_uninstall_sql():
+    return _sqlite_drop_triggers_sql() + [f"DROP TABLE IF EXISTS {TABLE}"]
+
+
+# --- Postgres (pg_trgm) ----------------------------------------------------
+
+def _postgres_install_sql():
+    statements = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        " id bigint PRIMARY KEY,"
+        " kind smallint NOT NULL,"
+        " obj_id bigint NOT NULL,"
+        " body text NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_body_trgm ON {TABLE} USING gin (body gin_trgm_ops)",
+    ]
+    upsert = f"INSERT INTO {TABLE}(id, kind, obj_id, body) "
+    on_conflict = " ON CONFLICT (id) DO UPDATE SET body = EXCLUDED.body;"
+
+    for table, (kind, dependents) in TRIGGERS.items():
+        cascade = "".join(
+            upsert + _doc_select(dep_kind, where) + on_conflict
+            for dep_kind, where in dependents
+        )
+        statements += [
+            f"CREATE OR REPLACE FUNCTION {TABLE}_{table}() RETURNS trigger AS $$ "
+            "BEGIN "
+            "IF TG_OP = 'DELETE' THEN "
+            f"DELETE FROM {TABLE} WHERE id = OLD.id * {KIND_STRIDE} + {kind}; "
+            "RETURN OLD; "
+            "END IF; "
+            + upsert + _doc_select(kind, _own_where(kind)) + on_conflict
+            + (f" IF TG_OP = 'UPDATE' THEN {cascade} END IF; " if cascade else " ")
+            + "RETURN NEW; "
+            "END $$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS {TABLE}_{table} ON {table}",
+            f"CREATE TRIGGER {TABLE}_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {TABLE}_{table}()",
+        ]
+    return statements
+
+
+def _postgres_uninstall_sql():
+    statements = []
+    for table in TRIGGERS:
+        statements += [
+            f"DROP TRIGGER IF EXISTS {TABLE}_{table} ON {table}",
+            f"DROP FUNCTION IF EXISTS {TABLE}_{table}()",
+        ]
+    statements.append(f"DROP TABLE IF EXISTS {TABLE}")
+    return statements
+
+
+# --- public API --------------------------------------------------------------
+
+def install_index(conn=connection):
+    """Create the search table and its triggers, then fill it."""
+    statements = _postgres_install_sql() if conn.vendor == "postgresql" else _sqlite_install_sql()
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    rebuild_index(conn)
+
+
+def uninstall_index(conn=connection):
+    statements = _postgres_uninstall_sql() if conn.vendor == "postgresql" else _sqlite_uninstall_sql()
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_index(conn=connection):
+    """Regenerate every document from scratch (triggers keep it current afterwards)."""
+    id_col = "id" if conn.vendor == "postgresql" else "rowid"
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind in DOCUMENTS:
+            cursor.execute(
+                f"INSERT INTO {TABLE}({id_col}, kind, obj_id, body) " + _doc_select(kind, "1 = 1")
+            )
+
+
+def _trigrams(query):
+    grams = []
+    for token in re.findall(r"\w+", query.lower()):
+        for i in range(len(token) - 2):
+            gram = token[i:i + 3]
+            if gram not in grams:
+                grams.append(gram)
+    return grams
+
+
+def search_ids(query, limit=10, conn=connection):
+    """
+    Return {kind: [(obj_id, score), ...]} with at most `limit` hits per kind,
+    best first.
+    """
+    query = (query or "").strip()
+    if not query:
+        return {}
+
+    if conn.vendor == "postgresql":
+        sql = (
+            "SELECT kind, obj_id, score FROM ("
+            " SELECT kind, obj_id, word_similarity(%s, body) AS score,"
+            "  ROW_NUMBER() OVER (PARTITION BY kind ORDER BY word_similarity(%s, body) DESC, id) AS rn"
+            f" FROM {TABLE} WHERE %s <%% body"
+            ") ranked WHERE rn <= %s ORDER BY kind, score DESC"
+        )
+        params = [query, query, query, limit]
+    else:
+        grams = _trigrams(query)
+        if not grams:
+            return {}
+        match = " OR ".join('"{}"'.format(g.replace('"', '""')) for g in grams)
+        sql = (
+            "SELECT kind, obj_id, score FROM ("
+            " SELECT kind, obj_id, score,"
+            "  ROW_NUMBER() OVER (PARTITION BY kind ORDER BY score DESC, obj_id) AS rn"
+            " FROM ("
+            f"  SELECT kind, obj_id, -bm25({TABLE}) AS score FROM {TABLE} WHERE {TABLE} MATCH %s"
+            " )"
+            ") WHERE rn <= %s ORDER BY kind, score DESC"
+        )
+        params = [match, limit]
+
+    hits = {}
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        for kind, obj_id, score in cursor.fetchall():
+            hits.setdefault(int(kind), []).append((int(obj_id), float(score)))
+    return hits
+
+
+def detach_sqlite_triggers(conn=connection):
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        for sql in _sqlite_drop_triggers_sql():
+            cursor.execute(sql)
+
+
+def detach_for_migrate(sender, using, **kwargs):
+    """pre_migrate: drop the SQLite triggers so table rebuilds don't trip over them."""
+    detach_sqlite_triggers(connections[using])
+
+
+def attach_after_migrate(sender, using, **kwargs):
+    """post_migrate: re-create the SQLite index once every catalog table exists."""
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return
+    tables = set(conn.introspection.table_names())
+    if TABLE in tables and all(table in tables for table in TRIGGERS):
+        install_index(conn)
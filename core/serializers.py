@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from . import jobs
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    name = serializers.ChoiceField(choices=sorted(jobs.TASKS))
+    max_attempts = serializers.IntegerField(min_value=1, max_value=100, required=False)
+
+    class Meta:
+        model = Job
+        fields = [
+            "id", "name", "payload", "status", "run_at", "attempts", "max_attempts", "locked_by",
+            "result", "error", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = [
+            "status", "attempts", "locked_by", "result", "error", "created_at", "started_at", "finished_at",
+        ]
+
+    def validate_payload(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of keyword arguments.")
+        return value
+
+    def create(self, validated_data):
+        return jobs.enqueue(
+            validated_data["name"], validated_data.get("payload"),
+            run_at=validated_data.get("run_at"), max_attempts=validated_data.get("max_attempts"),
+        )
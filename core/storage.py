@@ -0,0 +1,125 @@
+"""
+Object storage used by server-side jobs (image derivatives, GC, ...).
+
+- R2Storage talks to the bucket through the shared client in core.r2.
+- LocalStorage is a filesystem stand-in with the same interface, so the
+  pipelines can run (and be tested) offline.
+
+settings.OBJECT_STORAGE picks one: {"BACKEND": "r2" | "local", "LOCAL_ROOT": ..., "PUBLIC_BASE_URL": ...}.
+"""
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+
+class BaseStorage:
+    def __init__(self, public_base_url):
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def url(self, key):
+        return f"{self.public_base_url}/{key}"
+
+    def key_for_url(self, url):
+        """The object key behind one of our public URLs, or None for foreign URLs."""
+        prefix = self.public_base_url + "/"
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+
+class LocalStorage(BaseStorage):
+    def __init__(self, root, public_base_url):
+        super().__init__(public_base_url)
+        self.root = Path(root)
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Key escapes storage root: {key}")
+        return path
+
+    def read(self, key):
+        return self._path(key).read_bytes()
+
+    def write(self, key, data, content_type):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def exists(self, key):
+        return self._path(key).exists()
+
+    def list_objects(self, prefix):
+        """Yield (key, last modified, size) of every object under `prefix`, in key order."""
+        base = self._path(prefix.rstrip("/")) if prefix.strip("/") else self.root.resolve()
+        if not base.is_dir():
+            return
+        for path in sorted(p for p in base.rglob("*") if p.is_file()):
+            stat = path.stat()
+            key = path.relative_to(self.root.resolve()).as_posix()
+            yield key, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc), stat.st_size
+
+    def delete_objects(self, keys):
+        """Delete `keys`; returns [(key, error message)] for those that failed."""
+        errors = []
+        for key in keys:
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except OSError as exc:
+                errors.append((key, str(exc)))
+        return errors
+
+
+class R2Storage(BaseStorage):
+    def _client(self):
+        from .r2 import r2_client
+        return r2_client()
+
+    @property
+    def bucket(self):
+        return os.environ["R2_BUCKET_NAME"]
+
+    def read(self, key):
+        return self._client().get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def write(self, key, data, content_type):
+        self._client().put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self._client().head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return False
+        return True
+
+    def list_objects(self, prefix):
+        """Yield (key, last modified, size) of every object under `prefix`, in key order."""
+        pages = self._client().get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["LastModified"], obj["Size"]
+
+    def delete_objects(self, keys):
+        """Delete up to 1000 `keys` in one request; returns [(key, error message)] for those that failed."""
+        response = self._client().delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        return [(error["Key"], error.get("Message", error.get("Code", ""))) for error in response.get("Errors", [])]
+
+
+def get_storage():
+    config = settings.OBJECT_STORAGE
+    base_url = config.get("PUBLIC_BASE_URL") or os.environ.get("R2_PUBLIC_BASE_URL", "")
+    if config.get("BACKEND") == "local":
+        return LocalStorage(config["LOCAL_ROOT"], base_url)
+    return R2Storage(base_url)
@@ -0,0 +1,103 @@
+"""
+Deterministic synthetic catalog for load and performance testing.
+
+The same seed and sizes always give the same catalog. The shape follows
+the real one:
+
+- popularity is Zipf-like, so a few bricks (and colors) appear in most sets
+  while the long tail shows up once or twice;
+- set sizes are Pareto distributed: mostly small sets and a handful of huge
+  ones;
+- popular parts come in many colors, rare ones in one or two.
+
+Rows are plain tuples so they can go to the database (generate_catalog) or
+to a Rebrickable-style CSV dump (bench, for the importer).
+"""
+import itertools
+import random
+
+# Generated colors get lego ids from here up, clear of LEGO's own.
+COLOR_ID_BASE = 9_000_000
+
+CATEGORIES = ["Bricks", "Plates", "Tiles", "Slopes", "Technic", "Minifig", "Decorated", "Wheels"]
+
+
+class SyntheticCatalog:
+    def __init__(self, *, seed=42, themes=40, colors=60, parts=3000, sets=1000, max_lines=400, prefix="syn"):
+        self.seed = seed
+        self.n_themes = themes
+        self.n_colors = colors
+        self.n_parts = parts
+        self.n_sets = sets
+        self.max_lines = max_lines
+        self.prefix = prefix
+
+    def rng(self, stream):
+        # One generator per table, so changing one size doesn't reshuffle the others.
+        return random.Random(f"{self.seed}:{stream}")
+
+    @staticmethod
+    def zipf(n, s=1.1):
+        return list(itertools.accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+
+    def themes(self):
+        """[name]"""
+        return [f"{self.prefix} Theme {i}" for i in range(self.n_themes)]
+
+    def colors(self):
+        """[(lego_id, name, hex, is_transparent)]"""
+        rng = self.rng("colors")
+        return [
+            (COLOR_ID_BASE + i, f"{self.prefix} Color {i}", f"#{rng.randrange(1 << 24):06X}", rng.random() < 0.1)
+            for i in range(self.n_colors)
+        ]
+
+    def parts(self):
+        """[(part_id, name, category)], most popular first."""
+        rng = self.rng("parts")
+        return [
+            (f"{self.prefix}-{i}", f"{rng.choice(CATEGORIES)[:-1]} {rng.randint(1, 8)} x {rng.randint(1, 16)}",
+             rng.choice(CATEGORIES))
+            for i in range(self.n_parts)
+        ]
+
+    def part_colors(self):
+        """[(part index, color index)]; popular parts get more colors."""
+        rng = self.rng("part_colors")
+        color_weights = self.zipf(self.n_colors)
+        rows = []
+        for part in range(self.n_parts):
+            popular = part < max(1, self.n_parts // 20)
+            wanted = min(self.n_colors, int(rng.paretovariate(1.2)) + (8 if popular else 0))
+            picked = set()
+            while len(picked) < wanted:
+                picked.add(rng.choices(range(self.n_colors), cum_weights=color_weights)[0])
+            rows += [(part, color) for color in sorted(picked)]
+        return rows
+
+    def sets(self, part_colors=None):
+        """
+        [(number, name, theme index, [(part-color index, quantity)])], where
+        part-color indexes point into part_colors().
+        """
+        part_colors = part_colors if part_colors is not None else self.part_colors()
+        part_weights = [1.0 / (rank + 1) ** 1.1 for rank in range(self.n_parts)]
+        color_weights = [1.0 / (rank + 1) ** 1.1 for rank in range(self.n_colors)]
+        cum_weights = list(itertools.accumulate(part_weights[p] * color_weights[c] for p, c in part_colors))
+        indexes = range(len(part_colors))
+
+        rng = self.rng("sets")
+        rows = []
+        for i in range(self.n_sets):
+            lines = min(self.max_lines, max(1, len(part_colors) // 2), max(1, int(rng.paretovariate(1.1) * 6)))
+            inventory = {}
+            while len(inventory) < lines:
+                for pc in rng.choices(indexes, cum_weights=cum_weights, k=lines - len(inventory)):
+                    inventory.setdefault(pc, min(99, int(rng.paretovariate(1.5))))
+            rows.append((
+                f"{self.prefix}-{10000 + i}",
+                f"{self.prefix} Set {i}",
+                rng.randrange(self.n_themes),
+                sorted(inventory.items()),
+            ))
+        return rows
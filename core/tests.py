@@ -1,3 +1,724 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+from pathlib import Path
 
-# Create your tests here.
+from botocore.stub import Stubber
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from parts.models import Color, Part, PartColor
+from parts.serializers import PartSerializer
+from sets.models import Set, SetPart, Theme
+from PIL import Image
+
+from . import images, jobs, metrics, orphans, r2
+from . import storage as storage_module
+from .management.commands.release import REPAIRS as RELEASE_REPAIRS
+from .models import Job
+
+R2_ENV = {
+    "R2_ACCOUNT_ID": "test",
+    "R2_ACCESS_KEY_ID": "key",
+    "R2_SECRET_ACCESS_KEY": "secret",
+    "R2_BUCKET_NAME": "bucket",
+    "R2_PUBLIC_BASE_URL": "https://assets.example.com/",
+}
+
+
+class CatalogSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.red = Color.objects.create(lego_id=4, name="Red")
+        self.brick = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+        Part.objects.create(part_id="3023", name="Plate 1 x 2")
+        self.red_brick = PartColor.objects.create(part=self.brick, color=self.red, part_number="300121")
+        theme = Theme.objects.create(name="Castle")
+        Set.objects.create(number="10305", set_name="Lion Knights' Castle", theme=theme)
+
+    def search(self, q):
+        res = self.client.get("/api/search/", {"q": q})
+        self.assertEqual(res.status_code, 200)
+        return res.data["results"]
+
+    def test_results_are_grouped_and_ranked(self):
+        results = self.search("brick red")
+        self.assertEqual(results["parts"][0]["part_id"], "3001")
+        self.assertEqual(results["part_colors"][0]["id"], self.red_brick.id)
+        self.assertEqual(results["colors"][0]["name"], "Red")
+        self.assertEqual(results["sets"], [])
+
+        results = self.search("castle")
+        self.assertEqual(results["themes"][0]["name"], "Castle")
+        self.assertEqual(results["sets"][0]["number"], "10305")
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search("brik")["parts"][0]["part_id"], "3001")
+        self.assertEqual(self.search("castel")["themes"][0]["name"], "Castle")
+
+    def test_index_follows_writes(self):
+        self.brick.name = "Tile 2 x 4"
+        self.brick.save()
+        results = self.search("tile")
+        self.assertEqual(results["parts"][0]["part_id"], "3001")
+        # part-color documents embed the part name and are refreshed too
+        self.assertEqual(results["part_colors"][0]["id"], self.red_brick.id)
+
+        self.red_brick.delete()
+        self.assertEqual(self.search("tile")["part_colors"], [])
+
+    async def test_served_natively_under_asgi(self):
+        client = AsyncClient()
+        res = await client.get("/api/search/", {"q": "brick"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["results"]["parts"][0]["part_id"], "3001")
+
+        # async catalog reads keep their conditional-GET validators
+        res = await client.get(f"/api/parts/{self.brick.pk}/sets/")
+        self.assertEqual(res.status_code, 200)
+        res = await client.get(f"/api/parts/{self.brick.pk}/sets/", headers={"if-none-match": res["ETag"]})
+        self.assertEqual(res.status_code, 304)
+
+    def test_empty_query(self):
+        self.assertTrue(all(group == [] for group in self.search("").values()))
+
+
+class ImportCatalogTests(TestCase):
+    FILES = {
+        "themes.csv": "id,name,parent_id\n1,Castle,\n2,City,\n",
+        "colors.csv": "id,name,rgb,is_trans\n-1,[Unknown],0033B2,f\n4,Red,C91A09,f\n47,Trans-Clear,FCFCFC,t\n",
+        "part_categories.csv": "id,name\n11,Bricks\n",
+        "parts.csv": "part_num,name,part_cat_id\n3001,Brick 2 x 4,11\n3003,Brick 2 x 2,11\n",
+        "sets.csv": "set_num,name,year,theme_id,num_parts,img_url\n10305-1,Lion Knights' Castle,2022,1,4514,\n60000-1,Fire Motorcycle,2013,2,40,\n",
+        "inventories.csv": "id,version,set_num\n1,1,10305-1\n2,2,10305-1\n3,1,60000-1\n",
+        "inventory_parts.csv": (
+            "inventory_id,part_num,color_id,quantity,is_spare\n"
+            "1,3001,4,10,f\n"
+            "1,3001,4,1,t\n"
+            "1,3003,47,6,f\n"
+            "2,3003,4,99,f\n"
+            "3,3001,4,2,f\n"
+            "3,9999,4,1,f\n"
+        ),
+    }
+
+    def write_dump(self, directory):
+        for name, body in self.FILES.items():
+            if name == "inventory_parts.csv":
+                with gzip.open(directory / (name + ".gz"), "wt") as fh:
+                    fh.write(body)
+            else:
+                (directory / name).write_text(body)
+
+    def test_import_is_idempotent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.write_dump(Path(tmp))
+            for _ in range(2):
+                call_command("import_catalog", tmp, "--batch-size", "2", stdout=io.StringIO())
+
+        self.assertEqual(Color.objects.count(), 2)
+        self.assertTrue(Color.objects.get(lego_id=47).is_transparent)
+        self.assertEqual(Part.objects.get(part_id="3001").general_category, "Bricks")
+        castle = Set.objects.get(number="10305-1")
+        self.assertEqual((castle.theme.name, castle.piece_count), ("Castle", 4514))
+        self.assertEqual(PartColor.objects.count(), 2)
+        self.assertEqual(
+            sorted(SetPart.objects.filter(set=castle).values_list("part_color__part__part_id", "quantity")),
+            [("3001", 10), ("3003", 6)],
+        )
+        self.assertEqual(SetPart.objects.count(), 3)
+
+    def test_repeated_lines_add_up_across_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.write_dump(Path(tmp))
+            for _ in range(2):
+                call_command("import_catalog", tmp, "--batch-size", "1", "--include-spares", stdout=io.StringIO())
+
+        castle = Set.objects.get(number="10305-1")
+        self.assertEqual(SetPart.objects.get(set=castle, part_color__part__part_id="3001").quantity, 11)
+        castle.refresh_from_db()
+        self.assertEqual(castle.total_pieces, 17)
+
+
+@mock.patch.dict("os.environ", R2_ENV)
+class R2ClientTests(TestCase):
+    def setUp(self):
+        r2.reset_r2_client()
+
+    def test_client_is_shared_until_credentials_change(self):
+        first = r2.r2_client()
+        self.assertIs(r2.r2_client(), first)
+        with mock.patch.dict("os.environ", {"R2_ACCESS_KEY_ID": "rotated"}):
+            self.assertIsNot(r2.r2_client(), first)
+
+    def test_presign_upload(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+        res = client.post(
+            "/api/r2/presign-upload/",
+            {"folder": "parts", "filename": "a.PNG", "content_type": "image/png"},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertRegex(res.data["key"], r"^parts/[0-9a-f]{32}\.png$")
+        self.assertEqual(res.data["public_url"], f"https://assets.example.com/{res.data['key']}")
+        self.assertIn("X-Amz-Signature", res.data["upload_url"])
+
+    def test_batch_presign(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+        with mock.patch.object(r2.r2_client(), "create_multipart_upload", return_value={"UploadId": "up-1"}) as create:
+            res = client.post(
+                "/api/r2/presign-upload/batch/",
+                {"files": [
+                    {"folder": "parts", "filename": "a.png", "content_type": "image/png"},
+                    {"folder": "sets", "filename": "big.tiff", "content_type": "image/tiff", "size": 100 * 1024 * 1024},
+                ]},
+                format="json",
+            )
+        self.assertEqual(res.status_code, 200)
+        small, big = res.data["uploads"]
+        self.assertIn("upload_url", small)
+        self.assertEqual(big["upload_id"], "up-1")
+        self.assertEqual(len(big["part_urls"]), 7)
+        create.assert_called_once()
+
+        with mock.patch.object(r2.r2_client(), "complete_multipart_upload") as complete:
+            res = client.post(
+                "/api/r2/multipart/complete/",
+                {"key": big["key"], "upload_id": "up-1", "parts": [{"part_number": 2, "etag": "b"}, {"part_number": 1, "etag": "a"}]},
+                format="json",
+            )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            complete.call_args.kwargs["MultipartUpload"]["Parts"],
+            [{"PartNumber": 1, "ETag": "a"}, {"PartNumber": 2, "ETag": "b"}],
+        )
+
+    def test_multipart_stays_within_the_part_limit(self):
+        self.assertEqual(r2.multipart_part_size(100 * 1024 * 1024, 16 * 1024 * 1024), 16 * 1024 * 1024)
+        huge = 500 * 1024 ** 3
+        part_size = r2.multipart_part_size(huge, 16 * 1024 * 1024)
+        self.assertEqual(part_size % r2.MIB, 0)
+        self.assertLessEqual(-(-huge // part_size), r2.MAX_PARTS)
+
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+        res = client.post(
+            "/api/r2/presign-upload/batch/",
+            {"files": [{"folder": "sets", "filename": "x.tiff", "content_type": "image/tiff", "size": 6 * 1024 ** 3}]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("size must be between", res.data["errors"][0])
+
+    def test_batch_presign_aborts_started_uploads_on_error(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+        big = {"folder": "sets", "filename": "big.tiff", "content_type": "image/tiff", "size": 100 * 1024 * 1024}
+        r2_client = r2.r2_client()
+        with mock.patch.object(
+            r2_client, "create_multipart_upload", side_effect=[{"UploadId": "up-1"}, RuntimeError("R2 down")],
+        ), mock.patch.object(r2_client, "abort_multipart_upload") as abort:
+            with self.assertRaises(RuntimeError):
+                client.post("/api/r2/presign-upload/batch/", {"files": [big, big]}, format="json")
+        abort.assert_called_once()
+        self.assertEqual(abort.call_args.kwargs["UploadId"], "up-1")
+
+    def test_batch_presign_rejects_any_invalid_entry(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+        res = client.post(
+            "/api/r2/presign-upload/batch/",
+            {"files": [
+                {"folder": "parts", "filename": "a.png", "content_type": "image/png"},
+                {"folder": "secrets", "filename": "b.png", "content_type": "image/png"},
+                {"folder": "parts", "filename": "c.pdf", "content_type": "application/pdf"},
+            ]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(sorted(res.data["errors"]), [1, 2])
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        storage = override_settings(OBJECT_STORAGE={
+            "BACKEND": "local",
+            "LOCAL_ROOT": tmp.name,
+            "PUBLIC_BASE_URL": "https://assets.example.com",
+        })
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        buf = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(buf, format="PNG")
+        (self.root / "parts").mkdir()
+        (self.root / "parts" / "brick.png").write_bytes(buf.getvalue())
+
+    def test_saving_a_new_image_queues_processing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Part.objects.create(part_id="3001", name="Brick", image_url_1="https://assets.example.com/parts/brick.png")
+            Part.objects.create(part_id="3002", name="Brick", image_url_1="https://elsewhere.example.com/brick.png")
+        self.assertEqual(len(callbacks), 1)
+
+    def test_process_writes_hashed_derivatives(self):
+        url = "https://assets.example.com/parts/brick.png"
+        with self.captureOnCommitCallbacks():
+            part = Part.objects.create(part_id="3001", name="Brick", image_url_1=url)
+        images.process("parts.Part", part.pk)
+        part.refresh_from_db()
+
+        derived = part.image_derivatives
+        self.assertEqual(derived["source"], url)
+        self.assertEqual((derived["thumb"]["width"], derived["thumb"]["height"]), (160, 80))
+        self.assertEqual(derived["full"]["width"], 1600)
+        key = derived["thumb"]["webp"].removeprefix("https://assets.example.com/")
+        self.assertRegex(key, r"^derived/parts/[0-9a-f]{32}-thumb\.webp$")
+        with Image.open(self.root / key) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("WEBP", (160, 80)))
+
+        self.assertEqual(PartSerializer(part).data["thumb_url"], derived["thumb"]["webp"])
+
+        # replacing the image makes the old derivatives stale until reprocessed
+        part.image_url_1 = "https://assets.example.com/parts/other.png"
+        self.assertEqual(PartSerializer(part).data["thumb_url"], part.image_url_1)
+
+
+@override_settings(REQUEST_METRICS={"SAMPLE_RATE": 1.0, "WINDOW": 10, "LOG": False})
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        for i in range(3):
+            Part.objects.create(part_id=f"{3001 + i}", name="Brick")
+
+    def test_queries_are_counted_and_reported_per_route(self):
+        res = self.client.get("/api/admin/parts/")
+        timing = res["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+')
+
+        # async views run their queries in other threads; those count too
+        res = self.client.get("/api/search/", {"q": "brick"})
+        self.assertNotIn('desc="0 queries"', res["Server-Timing"])
+
+        routes = self.client.get("/api/admin/metrics/").data["routes"]
+        self.assertEqual(routes["GET admin-parts-list"]["count"], 1)
+        self.assertGreater(routes["GET admin-parts-list"]["queries"]["p50"], 0)
+        self.assertGreater(routes["GET admin-parts-list"]["bytes"]["p99"], 0)
+
+    def test_only_staff_see_server_timing(self):
+        res = APIClient().get("/api/search/", {"q": "brick"})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("Server-Timing", res)
+        self.assertEqual(metrics.report()["GET catalog-search"]["count"], 1)
+
+        with override_settings(DEBUG=True):
+            self.assertIn("Server-Timing", APIClient().get("/api/search/", {"q": "brick"}))
+
+    @override_settings(REQUEST_METRICS={"SAMPLE_RATE": 0.0, "WINDOW": 10, "LOG": False})
+    def test_unsampled_requests_are_left_alone(self):
+        res = self.client.get("/api/admin/parts/")
+        self.assertNotIn("Server-Timing", res)
+        self.assertEqual(metrics.report(), {})
+
+
+class GenerateCatalogTests(TestCase):
+    def inventory(self):
+        return list(
+            SetPart.objects.order_by("set__number", "part_color__part__part_id", "part_color__color__lego_id")
+            .values_list("set__number", "part_color__part__part_id", "part_color__color__lego_id", "quantity")
+        )
+
+    def test_same_seed_same_catalog(self):
+        args = ["--parts", "60", "--colors", "8", "--sets", "30", "--max-lines", "20", "--themes", "3"]
+        call_command("generate_catalog", *args, stdout=io.StringIO())
+        first = self.inventory()
+        self.assertEqual(Set.objects.count(), 30)
+        self.assertTrue(first)
+
+        with self.assertRaises(CommandError):
+            call_command("generate_catalog", *args, stdout=io.StringIO())
+        call_command("generate_catalog", *args, "--replace", stdout=io.StringIO())
+        self.assertEqual(self.inventory(), first)
+
+        # popular bricks are used everywhere; piece counts and rollups are filled in
+        top = Part.objects.order_by("-set_count").first()
+        self.assertEqual(top.part_id, "syn-0")
+        s = Set.objects.order_by("-piece_count").first()
+        self.assertEqual(s.piece_count, sum(q for number, _, _, q in first if number == s.number))
+
+
+class CatalogExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(self.admin)
+        red = Color.objects.create(lego_id=4, name="Red")
+        theme = Theme.objects.create(name="City")
+        self.set = Set.objects.create(number="60000", set_name="Fire, Motorcycle", theme=theme)
+        for i in range(3):
+            pc = PartColor.objects.create(part=Part.objects.create(part_id=f"{3001 + i}", name=f"Brick {i}"), color=red)
+            SetPart.objects.create(set=self.set, part_color=pc, quantity=i + 1)
+
+    def test_streams_ndjson_and_csv(self):
+        res = self.client.get("/api/admin/export/set-parts/")
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual([(r["set_number"], r["part_num"], r["quantity"]) for r in rows],
+                         [("60000", "3001", 1), ("60000", "3002", 2), ("60000", "3003", 3)])
+
+        res = self.client.get("/api/admin/export/sets/", {"fmt": "csv"})
+        table = list(csv.reader(io.StringIO(b"".join(res.streaming_content).decode())))
+        self.assertEqual(table[0][:3], ["id", "number", "set_name"])
+        self.assertEqual(table[1][1:3], ["60000", "Fire, Motorcycle"])
+        self.assertEqual(table[1][6], "6")  # total_pieces
+
+    def test_gzip_and_errors(self):
+        res = self.client.get("/api/admin/export/parts/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(res.streaming_content)).splitlines()
+        self.assertEqual([json.loads(line)["part_id"] for line in lines], ["3001", "3002", "3003"])
+
+        self.assertEqual(self.client.get("/api/admin/export/users/").status_code, 404)
+        self.assertEqual(self.client.get("/api/admin/export/parts/", {"fmt": "xml"}).status_code, 400)
+        self.assertEqual(APIClient().get("/api/admin/export/parts/").status_code, 401)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        client = AsyncClient()
+        res = await client.get(
+            "/api/admin/export/set-parts/", {"fmt": "csv"},
+            headers={"authorization": f"Bearer {AccessToken.for_user(self.admin)}"},
+        )
+        self.assertTrue(res.is_async)
+        body = b"".join([chunk async for chunk in res.streaming_content])
+        self.assertEqual(len(body.splitlines()), 4)
+
+    def test_command_writes_one_file_per_entity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_catalog", "colors", "set-parts", "--gzip", "--format", "csv",
+                         "--output-dir", directory, "--chunk-size", "1", stdout=io.StringIO())
+            with gzip.open(Path(directory) / "set-parts.csv.gz", "rt") as fh:
+                self.assertEqual(len(list(csv.reader(fh))), 4)
+            self.assertEqual(sorted(p.name for p in Path(directory).iterdir()), ["colors.csv.gz", "set-parts.csv.gz"])
+
+
+class OrphanCollectionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        storage = override_settings(OBJECT_STORAGE={
+            "BACKEND": "local",
+            "LOCAL_ROOT": tmp.name,
+            "PUBLIC_BASE_URL": "https://assets.example.com",
+        })
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        theme = Theme.objects.create(name="City", image_url="https://assets.example.com/themes/city.png")
+        Set.objects.create(number="60000", set_name="Fire", theme=theme, image_url="https://elsewhere.example.com/x.png")
+        part = Part.objects.create(part_id="3001", name="Brick")
+        PartColor.objects.create(
+            part=part,
+            image_url_2="https://assets.example.com/part-colors/kept.png",
+            image_derivatives={"source": "...", "thumb": {"width": 1, "webp": "https://assets.example.com/derived/part-colors/a-thumb.webp"}},
+        )
+        old = time.time() - 3 * 86400
+        for key in [
+            "themes/city.png", "themes/old-1.png", "themes/old-2.png", "themes/old-3.png",
+            "part-colors/kept.png", "derived/part-colors/a-thumb.webp", "derived/part-colors/b-thumb.webp",
+            "parts/fresh.png",
+        ]:
+            path = self.root / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x")
+            if key != "parts/fresh.png":
+                os.utime(path, (old, old))
+
+    def files(self):
+        return sorted(p.relative_to(self.root).as_posix() for p in self.root.rglob("*") if p.is_file())
+
+    def test_referenced_keys_come_from_urls_and_derivatives(self):
+        self.assertEqual(
+            orphans.referenced_keys(storage_module.get_storage()),
+            {"themes/city.png", "part-colors/kept.png", "derived/part-colors/a-thumb.webp"},
+        )
+
+    def test_dry_run_then_batched_delete(self):
+        before = self.files()
+        out = io.StringIO()
+        call_command("r2_gc", "--dry-run", "-v", "2", stdout=out)
+        self.assertEqual(self.files(), before)
+        self.assertIn("would delete themes/old-2.png", out.getvalue())
+
+        with mock.patch.object(orphans, "DELETE_BATCH", 2), \
+                mock.patch.object(storage_module.LocalStorage, "delete_objects", autospec=True,
+                                  side_effect=storage_module.LocalStorage.delete_objects) as delete:
+            call_command("r2_gc", stdout=io.StringIO())
+        self.assertEqual(sorted(len(call.args[1]) for call in delete.call_args_list), [1, 1, 2])
+        self.assertEqual(self.files(), [
+            "derived/part-colors/a-thumb.webp", "part-colors/kept.png", "parts/fresh.png", "themes/city.png",
+        ])
+
+        call_command("r2_gc", "--min-age-hours", "0", "--folder", "parts", stdout=io.StringIO())
+        self.assertNotIn("parts/fresh.png", self.files())
+
+    def test_r2_without_a_public_base_url_refuses_to_delete(self):
+        for base_url in ("http://localhost:8000/media", ""):
+            config = {"BACKEND": "r2", "LOCAL_ROOT": "", "PUBLIC_BASE_URL": base_url}
+            with override_settings(OBJECT_STORAGE=config), mock.patch.dict("os.environ", {"R2_PUBLIC_BASE_URL": ""}), \
+                    mock.patch.object(storage_module.R2Storage, "list_objects") as listing, \
+                    mock.patch.object(storage_module.R2Storage, "delete_objects") as delete:
+                with self.assertRaisesMessage(CommandError, "refusing to delete"):
+                    call_command("r2_gc", stdout=io.StringIO())
+            listing.assert_not_called()
+            delete.assert_not_called()
+
+    def test_urls_mapping_to_no_key_refuse_to_delete(self):
+        before = self.files()
+        config = {**settings.OBJECT_STORAGE, "PUBLIC_BASE_URL": "https://cdn.example.net"}
+        with override_settings(OBJECT_STORAGE=config):
+            call_command("r2_gc", "--dry-run", stdout=io.StringIO())
+            with self.assertRaisesMessage(CommandError, "none is under 'https://cdn.example.net'"):
+                call_command("r2_gc", stdout=io.StringIO())
+        self.assertEqual(self.files(), before)
+
+        # with no image URLs at all there is nothing to map, and the sweep goes ahead
+        Theme.objects.update(image_url="")
+        Set.objects.update(image_url="")
+        PartColor.objects.update(image_url_2=None)
+        with override_settings(OBJECT_STORAGE=config):
+            call_command("r2_gc", stdout=io.StringIO())
+        self.assertEqual(self.files(), ["parts/fresh.png"])
+
+    @mock.patch.dict("os.environ", R2_ENV)
+    def test_r2_storage_pages_and_batches(self):
+        r2.reset_r2_client()
+        self.addCleanup(r2.reset_r2_client)
+        storage = storage_module.R2Storage("https://assets.example.com")
+        stamp = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        with Stubber(r2.r2_client()) as stub:
+            stub.add_response("list_objects_v2", {
+                "Contents": [{"Key": "parts/a.png", "LastModified": stamp, "Size": 3}],
+                "IsTruncated": True, "NextContinuationToken": "t",
+            }, {"Bucket": "bucket", "Prefix": "parts/"})
+            stub.add_response("list_objects_v2", {
+                "Contents": [{"Key": "parts/b.png", "LastModified": stamp, "Size": 4}], "IsTruncated": False,
+            }, {"Bucket": "bucket", "Prefix": "parts/", "ContinuationToken": "t"})
+            stub.add_response("delete_objects", {"Errors": [{"Key": "parts/b.png", "Message": "denied"}]}, {
+                "Bucket": "bucket",
+                "Delete": {"Objects": [{"Key": "parts/a.png"}, {"Key": "parts/b.png"}], "Quiet": True},
+            })
+            listed = list(storage.list_objects("parts/"))
+            self.assertEqual([key for key, _, _ in listed], ["parts/a.png", "parts/b.png"])
+            self.assertEqual(storage.delete_objects(["parts/a.png", "parts/b.png"]), [("parts/b.png", "denied")])
+
+
+
+def failing_job(**kwargs):
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        theme = Theme.objects.create(name="City")
+        self.set = Set.objects.create(number="60000", set_name="Fire", theme=theme)
+        brick = PartColor.objects.create(part=Part.objects.create(part_id="3001", name="Brick"), part_number="300121")
+        SetPart.objects.bulk_create([SetPart(set=self.set, part_color=brick, quantity=6)])  # no signals: stale
+
+    def test_enqueue_rejects_unknown_jobs(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("nope")
+
+    def test_claim_hands_each_ready_job_to_one_worker(self):
+        queued = [jobs.enqueue("recompute_set_aggregates") for _ in range(3)]
+        jobs.enqueue("recompute_set_aggregates", run_at=timezone.now() + datetime.timedelta(hours=1))
+
+        first = jobs.claim("a", limit=2)
+        second = jobs.claim("b", limit=5)
+        self.assertEqual([j.pk for j in first], [j.pk for j in queued[:2]])
+        self.assertEqual([j.pk for j in second], [queued[2].pk])
+        self.assertEqual(jobs.claim("c", limit=5), [])
+        self.assertEqual({(j.status, j.locked_by, j.attempts) for j in second}, {(Job.RUNNING, "b", 1)})
+
+    def test_execute_records_the_result(self):
+        job = jobs.enqueue("recompute_set_aggregates", {"set_ids": [self.set.pk]})
+        jobs.claim("a")
+        self.assertEqual(jobs.execute(job.pk, "a"), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.error), (Job.SUCCEEDED, "", ""))
+        self.assertIsNotNone(job.finished_at)
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.total_pieces, 6)
+
+    @override_settings(JOBS={**settings.JOBS, "BACKOFF_BASE": 10, "BACKOFF_MAX": 15})
+    def test_failures_back_off_then_fail(self):
+        with mock.patch.dict(jobs.TASKS, {"boom": "core.tests.failing_job"}), self.assertLogs("core.jobs"):
+            job = jobs.enqueue("boom", max_attempts=2)
+            started = timezone.now()
+            jobs.claim("a")
+            self.assertEqual(jobs.execute(job.pk, "a"), Job.QUEUED)
+            job.refresh_from_db()
+            self.assertIn("RuntimeError: boom", job.error)
+            self.assertGreaterEqual(job.run_at, started + datetime.timedelta(seconds=5))
+            self.assertEqual(jobs.claim("a"), [])  # still backing off
+
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            jobs.claim("a")
+            self.assertEqual(jobs.execute(job.pk, "a"), Job.FAILED)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertLessEqual(jobs.backoff(10), 15)
+
+    def test_expired_leases_are_requeued(self):
+        alive, lost, spent = (jobs.enqueue("recompute_set_aggregates", max_attempts=n) for n in (3, 3, 1))
+        jobs.claim("a", limit=3)
+        Job.objects.filter(pk__in=[lost.pk, spent.pk]).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(lease=60), 2)
+        statuses = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(
+            [statuses[alive.pk], statuses[lost.pk], statuses[spent.pk]], [Job.RUNNING, Job.QUEUED, Job.FAILED],
+        )
+
+    def test_admin_endpoint(self):
+        client = APIClient()
+        self.assertEqual(client.get("/api/admin/jobs/").status_code, 401)
+        client.force_authenticate(get_user_model().objects.create_user("admin", password="x", is_staff=True))
+
+        created = client.post(
+            "/api/admin/jobs/", {"name": "recompute_set_aggregates", "payload": {"set_ids": [self.set.pk]}},
+            format="json",
+        )
+        self.assertEqual(created.status_code, 201, created.data)
+        self.assertEqual(created.data["status"], Job.QUEUED)
+        self.assertEqual(client.post("/api/admin/jobs/", {"name": "nope"}, format="json").status_code, 400)
+
+        failed = jobs.enqueue("recompute_set_aggregates")
+        Job.objects.filter(pk=failed.pk).update(status=Job.FAILED, attempts=3)
+        listed = client.get("/api/admin/jobs/", {"status": "failed"})
+        self.assertEqual([row["id"] for row in listed.data["results"]], [failed.pk])
+
+        stats = client.get("/api/admin/jobs/stats/").data
+        self.assertEqual(stats["counts"], {"queued": 1, "running": 0, "succeeded": 0, "failed": 1})
+
+        retried = client.post(f"/api/admin/jobs/{failed.pk}/retry/")
+        self.assertEqual(retried.status_code, 202)
+        self.assertEqual((retried.data["status"], retried.data["attempts"]), (Job.QUEUED, 0))
+        self.assertEqual(client.post(f"/api/admin/jobs/{failed.pk}/retry/").status_code, 400)
+
+
+class JobWorkerTests(TransactionTestCase):
+    # SQLite's shared in-memory test database locks whole tables, so pool
+    # threads there run one at a time; Postgres runs them concurrently.
+    CONCURRENCY = "1" if connection.vendor == "sqlite" else "3"
+
+    def test_burst_worker_drains_the_queue_on_threads(self):
+        for _ in range(5):
+            jobs.enqueue("recompute_set_aggregates")
+        with mock.patch.dict(jobs.TASKS, {"boom": "core.tests.failing_job"}), self.assertLogs("core.jobs"):
+            jobs.enqueue("boom", max_attempts=1)
+            out = io.StringIO()
+            call_command(
+                "run_worker", "--burst", "--concurrency", self.CONCURRENCY, "--poll-interval", "0.05", stdout=out,
+            )
+        self.assertIn("5 succeeded, 0 to retry, 1 failed", out.getvalue())
+        self.assertEqual(
+            dict(Job.objects.values_list("status").annotate(n=Count("pk"))), {Job.SUCCEEDED: 5, Job.FAILED: 1},
+        )
+
+    def test_busy_database_is_retried_on_the_next_poll(self):
+        job = jobs.enqueue("recompute_set_aggregates")
+        real_claim, busy = jobs.claim, iter([OperationalError("database table is locked: core_job")])
+
+        def claim(*args, **kwargs):
+            error = next(busy, None)
+            if error is not None:
+                raise error
+            return real_claim(*args, **kwargs)
+
+        with mock.patch.object(jobs, "claim", claim), self.assertLogs("core.jobs", "WARNING") as logs:
+            counts = jobs.Worker(concurrency=1, poll_interval=0.01).run(burst=True)
+        self.assertIn("retrying on the next poll", logs.output[0])
+        self.assertEqual(counts[Job.SUCCEEDED], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertGreaterEqual(job.updated_at, job.finished_at)
+
+
+class ReleaseTests(TestCase):
+    def test_repairs_migrates_and_bootstraps_in_one_go(self):
+        app, name, _ = RELEASE_REPAIRS[0]
+        MigrationRecorder.Migration.objects.filter(app=app, name=name).delete()
+        env = {
+            "DJANGO_SUPERUSER_USERNAME": "root",
+            "DJANGO_SUPERUSER_EMAIL": "root@example.com",
+            "DJANGO_SUPERUSER_PASSWORD": "x",
+        }
+        out = io.StringIO()
+        with mock.patch.dict("os.environ", env):
+            call_command("release", "--skip-collectstatic", "-v", "0", stdout=out)
+        self.assertIn(f"faking {app}.{name}", out.getvalue())
+        self.assertTrue(MigrationRecorder.Migration.objects.filter(app=app, name=name).exists())
+        self.assertTrue(get_user_model().objects.filter(username="root", is_superuser=True).exists())
+
+
+BOOT_SCRIPT = """
+import os, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+import config.urls
+print(round((time.perf_counter() - started) * 1000))
+"""
+
+
+class ColdStartTests(SimpleTestCase):
+    # What a gunicorn worker pays before its first request: settings, apps and
+    # the URLconf. About 0.6 s here (0.93 s while boto3 and numpy were imported
+    # eagerly); the budgets leave room for slower machines.
+    IMPORT_BUDGET_MS = 1500
+    BOOT_BUDGET_MS = 2500
+    LAZY = ("boto3", "botocore", "numpy")
+
+    def test_worker_boot_stays_within_budget(self):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"},
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+        imports = re.findall(r"^import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$", proc.stderr, re.MULTILINE)
+        modules = {name.split(".")[0] for _, _, name in imports}
+        self.assertFalse(modules & set(self.LAZY), "imported on boot; import them where they are used")
+
+        import_ms = sum(int(cumulative) for cumulative, indent, _ in imports if not indent) / 1000
+        boot_ms = int(proc.stdout.split()[-1])
+        self.assertLess(import_ms, self.IMPORT_BUDGET_MS)
+        self.assertLess(boot_ms, self.BOOT_BUDGET_MS)
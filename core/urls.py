@@ -1,7 +1,17 @@
 # core/urls.py
 from django.urls import path
-from .views_r2 import r2_presign_upload
+from .views_cache import catalog_cache_stats
+from .views_export import catalog_export
+from .views_metrics import request_metrics
+from .views_r2 import r2_multipart_complete, r2_presign_upload, r2_presign_upload_batch
+from .views_search import catalog_search
 
 urlpatterns = [
     path("r2/presign-upload/", r2_presign_upload, name="r2-presign-upload"),
+    path("r2/presign-upload/batch/", r2_presign_upload_batch, name="r2-presign-upload-batch"),
+    path("r2/multipart/complete/", r2_multipart_complete, name="r2-multipart-complete"),
+    path("search/", catalog_search, name="catalog-search"),
+    path("admin/cache-stats/", catalog_cache_stats, name="catalog-cache-stats"),
+    path("admin/metrics/", request_metrics, name="request-metrics"),
+    path("admin/export/<slug:entity>/", catalog_export, name="catalog-export"),
 ]
@@ -0,0 +1,51 @@
+"""
+Per-table change counters for the catalog.
+
+Every write to a tracked model bumps its CatalogVersion row: single-row
+saves/deletes through signals (see connect()), bulk writes by calling
+bump() explicitly. Caches and HTTP validators compare these counters
+instead of looking at the data itself.
+"""
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+TRACKED = ["parts.Part", "parts.PartColor", "parts.Color", "sets.Set", "sets.SetPart", "sets.Theme"]
+
+
+def bump(*names):
+    """Increment the version of each named catalog table."""
+    now = timezone.now()
+    for name in names:
+        if not CatalogVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=now):
+            CatalogVersion.objects.bulk_create([CatalogVersion(name=name)], ignore_conflicts=True)
+            CatalogVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=now)
+
+
+def bump_models(*models):
+    bump(*(model._meta.model_name for model in models))
+
+
+def get(name):
+    return CatalogVersion.objects.filter(name=name).values_list("version", flat=True).first() or 0
+
+
+def snapshot(names):
+    """({name: version}, latest updated_at or None) for `names`, in one query."""
+    rows = CatalogVersion.objects.filter(name__in=names).values_list("name", "version", "updated_at")
+    found = {name: (version, updated_at) for name, version, updated_at in rows}
+    current = {name: found.get(name, (0, None))[0] for name in names}
+    stamps = [updated_at for _, updated_at in found.values() if updated_at is not None]
+    return current, max(stamps) if stamps else None
+
+
+def model_changed(sender, **kwargs):
+    bump(sender._meta.model_name)
+
+
+def connect():
+    for label in TRACKED:
+        post_save.connect(model_changed, sender=label, dispatch_uid=f"catalog-version-{label}")
+        post_delete.connect(model_changed, sender=label, dispatch_uid=f"catalog-version-{label}")
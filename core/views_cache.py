@@ -0,0 +1,18 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import response_cache
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def catalog_cache_stats(request):
+    """
+    GET    /api/admin/cache-stats/  -> this process's response-cache hit/miss counters
+    DELETE /api/admin/cache-stats/  -> empty the catalog cache and reset the counters
+    """
+    if request.method == "DELETE":
+        response_cache.cache().clear()
+        response_cache.reset_stats()
+    return Response(response_cache.stats())
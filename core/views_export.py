@@ -0,0 +1,50 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+
+from . import export
+
+
+def _async_chunks(chunks):
+    # Under ASGI a sync iterator would be drained into memory before sending.
+    # Pull it on the request's thread instead, which also keeps the
+    # server-side cursor on the connection that opened it.
+    next_chunk = sync_to_async(lambda: next(chunks, None), thread_sensitive=True)
+
+    async def iterate():
+        while (chunk := await next_chunk()) is not None:
+            yield chunk
+
+    return iterate()
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def catalog_export(request, entity):
+    """
+    GET /api/admin/export/<entity>/?fmt=ndjson|csv
+
+    Streams every row of themes, colors, parts, part-colors, sets or
+    set-parts (set inventories); gzip-compressed when the client accepts it.
+    """
+    if entity not in export.ENTITIES:
+        raise NotFound(f"Unknown entity; expected one of {sorted(export.ENTITIES)}.")
+    fmt = request.query_params.get("fmt", "ndjson")
+    if fmt not in export.FORMATS:
+        raise ValidationError({"fmt": f"Expected one of {sorted(export.FORMATS)}."})
+
+    compress = "gzip" in request.headers.get("Accept-Encoding", "")
+    chunks = export.stream(entity, fmt, compress=compress)
+    if isinstance(request._request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=f"{export.FORMATS[fmt]}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{entity}.{fmt}"'
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
@@ -0,0 +1,50 @@
+from django.db.models import Count, Min
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobAdminViewSet(
+    mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet,
+):
+    """
+    GET  /api/admin/jobs/?status=failed&name=command  -> jobs, newest first
+    POST /api/admin/jobs/ {"name", "payload", "run_at"?, "max_attempts"?}  -> queue one
+    GET  /api/admin/jobs/stats/  -> {"counts": {status: n}, "oldest_ready": ts, "lag_seconds": s}
+    POST /api/admin/jobs/<id>/retry/  -> re-queue a failed job with fresh attempts
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAdminUser]
+    filter_fields = {"status": "status", "name": "name"}
+    ordering_fields = ["id"]
+    ordering = "-id"
+
+    @action(detail=False)
+    def stats(self, request):
+        counts = dict.fromkeys(Job.STATUSES, 0)
+        counts.update(Job.objects.order_by().values_list("status").annotate(n=Count("pk")))
+        now = timezone.now()
+        oldest = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).aggregate(at=Min("run_at"))["at"]
+        return Response({
+            "counts": counts,
+            "oldest_ready": oldest,
+            "lag_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0,
+        })
+
+    @action(detail=True, methods=["post"])
+    def retry(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.FAILED:
+            raise ValidationError({"status": "Only failed jobs can be retried."})
+        Job.objects.filter(pk=job.pk, status=Job.FAILED).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0, finished_at=None, updated_at=timezone.now(),
+        )
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import metrics
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    """
+    GET    /api/admin/metrics/  -> {"sample_rate": 1.0, "routes": {"GET admin-parts-list": {"count": 812,
+                                    "total_ms": {"p50", "p95", "p99"}, "db_ms": {...}, "queries": {...},
+                                    "serialize_ms": {...}, "bytes": {...}}}}
+    DELETE /api/admin/metrics/  -> reset the windows
+
+    Figures are for this process only, over the last REQUEST_METRICS["WINDOW"]
+    sampled requests of each route.
+    """
+    if request.method == "DELETE":
+        metrics.reset()
+    return Response({
+        "sample_rate": settings.REQUEST_METRICS["SAMPLE_RATE"],
+        "routes": metrics.report(),
+    })
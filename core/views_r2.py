@@ -1,18 +1,55 @@
-import os
+import logging
 import uuid
-from rest_framework.decorators import api_view, permission_classes
+from adrf.decorators import api_view
+from asgiref.sync import sync_to_async
+from rest_framework.decorators import permission_classes
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 
-from .r2 import r2_client
+from .r2 import abort_multipart, complete_multipart, presign_multipart, presign_put, public_url
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_FOLDERS = {"themes", "sets", "part-colors", "parts", "uploads"}
 ALLOWED_CONTENT_PREFIXES = ("image/",)
 
+MAX_BATCH = 100
+MULTIPART_THRESHOLD = 64 * 1024 * 1024  # files at least this big are uploaded in parts
+MULTIPART_PART_SIZE = 16 * 1024 * 1024  # R2/S3 require >= 5 MiB for all but the last part; grown past 10000 parts
+MAX_UPLOAD_SIZE = 5 * 1024 ** 3  # largest file presigned (images; S3 itself stops at 5 TiB)
+
+
+def _off_loop(func):
+    """Run a (blocking) R2 call in the thread pool. They touch no DB, so any thread will do."""
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def _new_upload_key(data):
+    """
+    Validate one `{folder, filename, content_type}` entry.
+    Returns (key, content_type, None) or (None, None, error detail).
+    """
+    folder = (data.get("folder") or "uploads").strip().strip("/")
+    filename = (data.get("filename") or "file").strip()
+    content_type = (data.get("content_type") or "application/octet-stream").strip()
+
+    if folder not in ALLOWED_FOLDERS:
+        return None, None, "Invalid folder."
+
+    if not content_type.startswith(ALLOWED_CONTENT_PREFIXES):
+        return None, None, "Only image uploads are allowed."
+
+    ext = ""
+    if "." in filename:
+        ext = "." + filename.split(".")[-1].lower()
+
+    return f"{folder}/{uuid.uuid4().hex}{ext}", content_type, None
+
+
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
-def r2_presign_upload(request):
+async def r2_presign_upload(request):
     """
     Request body:
     {
@@ -28,36 +65,118 @@ def r2_presign_upload(request):
       "key": "part-colors/<uuid>.png"
     }
     """
-    folder = (request.data.get("folder") or "uploads").strip().strip("/")
-    filename = (request.data.get("filename") or "file").strip()
-    content_type = (request.data.get("content_type") or "application/octet-stream").strip()
+    key, content_type, error = _new_upload_key(request.data)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
 
-    if folder not in ALLOWED_FOLDERS:
-        return Response({"detail": "Invalid folder."}, status=status.HTTP_400_BAD_REQUEST)
+    upload_url = await _off_loop(presign_put)(key, content_type)
 
-    if not content_type.startswith(ALLOWED_CONTENT_PREFIXES):
-        return Response({"detail": "Only image uploads are allowed."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"upload_url": upload_url, "public_url": public_url(key), "key": key})
 
-    ext = ""
-    if "." in filename:
-        ext = "." + filename.split(".")[-1].lower()
 
-    key = f"{folder}/{uuid.uuid4().hex}{ext}"
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+async def r2_presign_upload_batch(request):
+    """
+    Request body:
+    {
+      "files": [
+        {"folder": "part-colors", "filename": "a.png", "content_type": "image/png"},
+        {"folder": "parts", "filename": "huge.tiff", "content_type": "image/tiff", "size": 209715200}
+      ]
+    }
+
+    Response (same order as the request):
+    {
+      "uploads": [
+        {"key": "...", "public_url": "...", "upload_url": "...presigned PUT..."},
+        {"key": "...", "public_url": "...", "upload_id": "...", "part_size": 16777216,
+         "part_urls": ["...presigned PUT for part 1...", ...]}
+      ]
+    }
+
+    Entries with `size` >= MULTIPART_THRESHOLD (up to MAX_UPLOAD_SIZE) get a
+    multipart upload; PUT each part, then POST the ETags to
+    /api/r2/multipart/complete/. Nothing is presigned unless every entry is
+    valid, and if presigning fails midway the uploads already started are
+    aborted.
+    """
+    files = request.data.get("files") if isinstance(request.data, dict) else request.data
+    if not isinstance(files, list) or not files:
+        return Response({"detail": "files must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(files) > MAX_BATCH:
+        return Response({"detail": f"At most {MAX_BATCH} files per batch."}, status=status.HTTP_400_BAD_REQUEST)
 
-    s3 = r2_client()
-    bucket = os.environ["R2_BUCKET_NAME"]
+    prepared = []
+    errors = {}
+    for i, entry in enumerate(files):
+        if not isinstance(entry, dict):
+            errors[i] = "Each file must be an object."
+            continue
+        key, content_type, error = _new_upload_key(entry)
+        try:
+            size = int(entry.get("size") or 0)
+        except (TypeError, ValueError):
+            error = error or "size must be an integer."
+        else:
+            if not 0 <= size <= MAX_UPLOAD_SIZE:
+                error = error or f"size must be between 0 and {MAX_UPLOAD_SIZE} bytes."
+        if error:
+            errors[i] = error
+            continue
+        prepared.append((key, content_type, size))
+    if errors:
+        return Response({"detail": "Invalid files.", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"uploads": await _off_loop(_presign_all)(prepared)})
+
+
+def _presign_all(prepared):
+    uploads = []
+    try:
+        for key, content_type, size in prepared:
+            upload = {"key": key, "public_url": public_url(key)}
+            if size >= MULTIPART_THRESHOLD:
+                upload_id, part_size, part_urls = presign_multipart(key, content_type, size, MULTIPART_PART_SIZE)
+                upload.update(upload_id=upload_id, part_size=part_size, part_urls=part_urls)
+            else:
+                upload["upload_url"] = presign_put(key, content_type)
+            uploads.append(upload)
+    except Exception:
+        # don't leave started multipart uploads (and their storage) behind
+        for upload in uploads:
+            if "upload_id" in upload:
+                try:
+                    abort_multipart(upload["key"], upload["upload_id"])
+                except Exception:
+                    logger.exception("could not abort multipart upload %s", upload["key"])
+        raise
+    return uploads
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+async def r2_multipart_complete(request):
+    """
+    Request body:
+    {"key": "...", "upload_id": "...", "parts": [{"part_number": 1, "etag": "..."}, ...]}
+
+    Send "abort": true instead of parts to cancel the upload.
+    """
+    key = (request.data.get("key") or "").strip()
+    upload_id = (request.data.get("upload_id") or "").strip()
+    if not key or not upload_id or key.split("/", 1)[0] not in ALLOWED_FOLDERS:
+        return Response({"detail": "key and upload_id are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-    upload_url = s3.generate_presigned_url(
-        ClientMethod="put_object",
-        Params={
-            "Bucket": bucket,
-            "Key": key,
-            "ContentType": content_type,
-        },
-        ExpiresIn=60 * 5,  # 5 minutes
-    )
+    if request.data.get("abort"):
+        await _off_loop(abort_multipart)(key, upload_id)
+        return Response({"key": key, "aborted": True})
 
-    public_base = os.environ["R2_PUBLIC_BASE_URL"].rstrip("/")
-    public_url = f"{public_base}/{key}"
+    parts = request.data.get("parts")
+    if not isinstance(parts, list) or not parts or not all(
+        isinstance(p, dict) and str(p.get("part_number", "")).isdigit() and p.get("etag") for p in parts
+    ):
+        return Response({"detail": "parts must list {part_number, etag}."}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({"upload_url": upload_url, "public_url": public_url, "key": key})
+    await _off_loop(complete_multipart)(key, upload_id, parts)
+    return Response({"key": key, "public_url": public_url(key)})
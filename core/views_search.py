@@ -0,0 +1,86 @@
+from adrf.decorators import api_view
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from parts.models import Color, Part, PartColor
+from sets.models import Set, Theme
+
+from . import search
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# kind -> (queryset, values() fields, renamed lookups) used to hydrate hits in one query per kind
+HYDRATE = {
+    search.PART: (
+        Part.objects.all(),
+        ["id", "part_id", "name", "image_url_1"],
+        {},
+    ),
+    search.PART_COLOR: (
+        PartColor.objects.all(),
+        ["id", "part_number", "variant", "image_url_1", "image_url_2"],
+        {
+            "part_pk": F("part_id"),
+            "part_code": F("part__part_id"),
+            "part_name": F("part__name"),
+            "color_pk": F("color_id"),
+            "color_name": F("color__name"),
+        },
+    ),
+    search.COLOR: (
+        Color.objects.all(),
+        ["id", "lego_id", "name", "hex"],
+        {},
+    ),
+    search.SET: (
+        Set.objects.all(),
+        ["id", "number", "set_name", "image_url"],
+        {"theme_pk": F("theme_id")},
+    ),
+    search.THEME: (
+        Theme.objects.all(),
+        ["id", "name", "image_url"],
+        {},
+    ),
+}
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+async def catalog_search(request):
+    """
+    GET /api/search/?q=2x4 brick red&limit=10
+
+    Response (best match first within each group):
+    {
+      "query": "2x4 brick red",
+      "results": {"parts": [...], "part_colors": [...], "colors": [...], "sets": [...], "themes": [...]}
+    }
+    """
+    query = (request.query_params.get("q") or "").strip()
+    try:
+        limit = int(request.query_params.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    hits = await sync_to_async(search.search_ids)(query, limit=limit)
+
+    results = {name: [] for name in search.KIND_NAMES.values()}
+    for kind, ranked in hits.items():
+        queryset, fields, renamed = HYDRATE[kind]
+        rows = {
+            row["id"]: row
+            async for row in queryset.filter(pk__in=[obj_id for obj_id, _ in ranked]).values(*fields, **renamed)
+        }
+        group = results[search.KIND_NAMES[kind]]
+        for obj_id, score in ranked:
+            row = rows.get(obj_id)
+            if row is not None:
+                group.append({**row, "score": round(score, 4)})
+
+    return Response({"query": query, "results": results})
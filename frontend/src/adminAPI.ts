@@ -1,9 +1,11 @@
 import api from "./api";
+import { listAll } from "./api/catalog";
 
 export async function createTheme(data: { name: string; image_url?: string }) {
   return (await api.post("/api/admin/themes/", data)).data;
 }
 
+// All themes, across every cursor page.
 export async function listThemes() {
-  return (await api.get("/api/admin/themes/")).data;
+  return listAll("/api/admin/themes/");
 }
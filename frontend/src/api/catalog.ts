@@ -1,17 +1,43 @@
 import api from "./client";
 import { ENDPOINTS, type CatalogTabKey } from "./endpoints";
 
-export async function listTab(tab: CatalogTabKey) {
+export type ListParams = {
+  search?: string;
+  ordering?: string;
+  page_size?: number;
+  [filter: string]: string | number | undefined;
+};
+
+export async function listTab(tab: CatalogTabKey, params: ListParams = {}) {
   const url =
     tab === "parts" ? ENDPOINTS.parts :
     tab === "partColors" ? ENDPOINTS.partColors :
     tab === "sets" ? ENDPOINTS.sets :
     ENDPOINTS.themes;
 
-  const res = await api.get(url);
+  const res = await api.get(url, { params });
+  return res.data;
+}
+
+// Follow a `next` cursor link returned by a paginated list endpoint.
+export async function listNext(nextUrl: string) {
+  const res = await api.get(nextUrl);
   return res.data;
 }
 
+// Every row of a list endpoint, walking its cursor pages at the largest page
+// size the API allows. For lookups (dropdowns) that need the whole table.
+export async function listAll<T = any>(url: string, params: ListParams = {}): Promise<T[]> {
+  let data = (await api.get(url, { params: { page_size: 500, ...params } })).data;
+  if (Array.isArray(data)) return data;
+  const rows: T[] = [...(data.results ?? [])];
+  while (data.next) {
+    data = await listNext(data.next);
+    rows.push(...(data.results ?? []));
+  }
+  return rows;
+}
+
 export async function createTab(tab: CatalogTabKey, payload: any) {
   const url =
     tab === "parts" ? ENDPOINTS.parts :
@@ -4,6 +4,8 @@ export const ENDPOINTS = {
   themes: "/admin/themes/",
   sets: "/admin/sets/",
   presignUpload: "/r2/presign-upload/",
+  presignUploadBatch: "/r2/presign-upload/batch/",
+  multipartComplete: "/r2/multipart/complete/",
 } as const;
 
 export type CatalogTabKey = "parts" | "partColors" | "sets" | "themes";
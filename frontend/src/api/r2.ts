@@ -1,15 +1,27 @@
 import api from "./client";
 import { ENDPOINTS } from "./endpoints";
 
-export async function presignR2Upload(args: {
-  folder: string;
-  filename: string;
-  content_type: string;
+export type BatchUpload = {
+  key: string;
+  public_url: string;
+  upload_url?: string;
+  upload_id?: string;
+  part_size?: number;
+  part_urls?: string[];
+};
+
+export async function presignR2UploadBatch(
+  files: Array<{ folder: string; filename: string; content_type: string; size?: number }>
+) {
+  const res = await api.post(ENDPOINTS.presignUploadBatch, { files });
+  return res.data.uploads as BatchUpload[];
+}
+
+export async function completeR2Multipart(args: {
+  key: string;
+  upload_id: string;
+  parts: Array<{ part_number: number; etag: string }>;
 }) {
-  const res = await api.post(ENDPOINTS.presignUpload, args);
-  return res.data as {
-    upload_url: string;
-    public_url: string;
-    headers?: Record<string, string>;
-  };
+  const res = await api.post(ENDPOINTS.multipartComplete, args);
+  return res.data as { key: string; public_url: string };
 }
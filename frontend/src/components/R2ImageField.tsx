@@ -1,5 +1,5 @@
 import { useState } from "react";
-import { presignR2Upload } from "../api/r2";
+import { uploadImageToR2 } from "../lib/r2Upload";
 
 export default function R2ImageField({
   label,
@@ -19,27 +19,7 @@ export default function R2ImageField({
     setErr(null);
     setUploading(true);
     try {
-      const presign = await presignR2Upload({
-        folder,
-        filename: file.name,
-        content_type: file.type || "application/octet-stream",
-      });
-
-      const putRes = await fetch(presign.upload_url, {
-        method: "PUT",
-        headers: {
-          "Content-Type": file.type || "application/octet-stream",
-          ...(presign.headers || {}),
-        },
-        body: file,
-      });
-
-      if (!putRes.ok) {
-        const text = await putRes.text();
-        throw new Error(`R2 upload failed: ${putRes.status} ${text}`);
-      }
-
-      onChange(presign.public_url);
+      onChange(await uploadImageToR2(file, folder));
     } catch (e: any) {
       setErr(e?.message || "Upload failed");
     } finally {
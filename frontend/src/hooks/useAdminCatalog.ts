@@ -1,9 +1,12 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useState } from "react";
 import type { CatalogTabKey } from "../api/endpoints";
-import { listTab } from "../api/catalog";
+import { listNext, listTab } from "../api/catalog";
 
+// Search, filtering and ordering happen server-side; rows are fetched one
+// cursor page at a time.
 export function useAdminCatalog(tab: CatalogTabKey, search: string) {
   const [rows, setRows] = useState<any[]>([]);
+  const [next, setNext] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
@@ -11,8 +14,24 @@ export function useAdminCatalog(tab: CatalogTabKey, search: string) {
     setLoading(true);
     setError(null);
     try {
-      const data = await listTab(tab);
+      const q = search.trim();
+      const data = await listTab(tab, q ? { search: q } : {});
       setRows(Array.isArray(data) ? data : data.results ?? []);
+      setNext(Array.isArray(data) ? null : data.next ?? null);
+    } catch (e: any) {
+      setError(e?.message || "Failed to load");
+    } finally {
+      setLoading(false);
+    }
+  }
+
+  async function loadMore() {
+    if (!next) return;
+    setLoading(true);
+    try {
+      const data = await listNext(next);
+      setRows((prev) => [...prev, ...(data.results ?? [])]);
+      setNext(data.next ?? null);
     } catch (e: any) {
       setError(e?.message || "Failed to load");
     } finally {
@@ -21,16 +40,10 @@ export function useAdminCatalog(tab: CatalogTabKey, search: string) {
   }
 
   useEffect(() => {
-    refresh();
+    const t = setTimeout(refresh, 250);
+    return () => clearTimeout(t);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [tab]);
-
-  const filtered = useMemo(() => {
-    const q = search.trim().toLowerCase();
-    if (!q) return rows;
-
-    return rows.filter((r) => JSON.stringify(r).toLowerCase().includes(q));
-  }, [rows, search]);
+  }, [tab, search]);
 
-  return { rows, filtered, loading, error, refresh, setRows };
+  return { rows, filtered: rows, loading, error, refresh, setRows, hasMore: next !== null, loadMore };
 }
@@ -1,37 +1,70 @@
 // src/lib/r2Upload.ts
 import api from "../api";
+import { completeR2Multipart, presignR2UploadBatch, type BatchUpload } from "../api/r2";
+import { ENDPOINTS } from "../api/endpoints";
 
-type PresignResponse = {
-  upload_url: string;
-  public_url: string;
-};
-
-
+// Upload one file straight to R2 and return the permanent public URL to store
+// in Django. Goes through the batch presign so big files are sent in parts.
 export async function uploadImageToR2(file: File, folder: string) {
-  // 1) ask backend for presigned PUT url
-  const presign = await api.post<PresignResponse>("/r2/presign-upload/", {
-    folder,
-    filename: file.name,
-    content_type: file.type || "application/octet-stream",
-  });
-
-  const { upload_url, public_url } = presign.data;
+  const [publicUrl] = await uploadImagesToR2([file], folder);
+  return publicUrl;
+}
 
-  // 2) upload file directly to R2 via PUT
-  const putRes = await fetch(upload_url, {
+async function putToR2(url: string, body: Blob, contentType?: string) {
+  // no Authorization header: the presigned URL carries the signature
+  const res = await fetch(url, {
     method: "PUT",
-    body: file,
-    headers: {
-      "Content-Type": file.type || "application/octet-stream",
-      // IMPORTANT: do NOT add Authorization headers here
-    },
+    body,
+    headers: contentType ? { "Content-Type": contentType } : undefined,
   });
+  if (!res.ok) {
+    const text = await res.text().catch(() => "");
+    throw new Error(`R2 upload failed (${res.status}). ${text}`);
+  }
+  return res;
+}
 
-  if (!putRes.ok) {
-    const text = await putRes.text().catch(() => "");
-    throw new Error(`R2 upload failed (${putRes.status}). ${text}`);
+async function uploadOne(file: File, upload: BatchUpload) {
+  const contentType = file.type || "application/octet-stream";
+
+  if (upload.upload_url) {
+    await putToR2(upload.upload_url, file, contentType);
+    return upload.public_url;
+  }
+
+  // multipart: PUT each chunk to its presigned URL, then hand the ETags back
+  const partSize = upload.part_size!;
+  let parts;
+  try {
+    parts = await Promise.all(
+      (upload.part_urls ?? []).map(async (url, i) => {
+        const res = await putToR2(url, file.slice(i * partSize, (i + 1) * partSize));
+        return { part_number: i + 1, etag: res.headers.get("ETag") ?? "" };
+      })
+    );
+  } catch (e) {
+    // release the parts already stored
+    await api
+      .post(ENDPOINTS.multipartComplete, { key: upload.key, upload_id: upload.upload_id, abort: true })
+      .catch(() => undefined);
+    throw e;
   }
+  const done = await completeR2Multipart({ key: upload.key, upload_id: upload.upload_id!, parts });
+  return done.public_url;
+}
+
+// Upload several files with a single presign round trip; returns public URLs in order.
+export async function uploadImagesToR2(files: File[], folder: string) {
+  if (files.length === 0) return [];
+
+  const uploads = await presignR2UploadBatch(
+    files.map((file) => ({
+      folder,
+      filename: file.name,
+      content_type: file.type || "application/octet-stream",
+      size: file.size,
+    }))
+  );
 
-  // 3) return the permanent public URL to store in Django
-  return public_url;
+  return Promise.all(files.map((file, i) => uploadOne(file, uploads[i])));
 }
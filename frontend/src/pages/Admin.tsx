@@ -2,6 +2,7 @@
 import React, { useEffect, useMemo, useState } from "react";
 import AdminLayout from "../layouts/AdminLayout";
 import api from "../api";
+import { listAll } from "../api/catalog";
 import { Drawer } from "../components/ui/Drawer";
 import { Input } from "../components/ui/Input";
 import { Thumb } from "../components/ui/Tumb";
@@ -136,8 +137,9 @@ function hasAccessToken() {
  */
 async function safeApiGet<T>(url: string): Promise<{ ok: true; data: T } | { ok: false; errorText: string }> {
   try {
-    const res = await api.get(url);
-    return { ok: true, data: res.data as T };
+    // List endpoints are cursor-paginated; search and the part dropdown need every row.
+    const data = await listAll(url);
+    return { ok: true, data: data as T };
   } catch (e: any) {
     const status = e?.response?.status;
     const body = e?.response?.data;
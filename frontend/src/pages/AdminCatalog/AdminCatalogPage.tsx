@@ -2,7 +2,7 @@ import { useMemo, useState } from "react";
 import AdminLayout from "../../layouts/AdminLayout";
 import { Drawer } from "../../components/ui/Drawer";
 import { Input } from "../../components/ui/Input";
-import { PrimaryButton } from "../../components/ui/Button";
+import { PrimaryButton, SecondaryButton } from "../../components/ui/Button";
 import { Tabs } from "../../components/ui/Tabs";
 import type { CatalogTabKey } from "../../api/endpoints";
 import { useAdminCatalog } from "../../hooks/useAdminCatalog";
@@ -26,7 +26,7 @@ export default function AdminCatalogPage() {
   const [mode, setMode] = useState<"create" | "edit">("create");
   const [selected, setSelected] = useState<any>(null);
 
-  const { filtered, loading, error, refresh } = useAdminCatalog(tab, search);
+  const { filtered, loading, error, refresh, hasMore, loadMore } = useAdminCatalog(tab, search);
 
   const drawerTitle = useMemo(() => {
     const label =
@@ -89,7 +89,11 @@ export default function AdminCatalogPage() {
                 }}
               />
               <div className="sm:ml-auto text-sm text-neutral-500">
-                {loading ? "Loading…" : error ? `Error: ${error}` : `Showing ${filtered.length}`}
+                {loading
+                  ? "Loading…"
+                  : error
+                  ? `Error: ${error}`
+                  : `Showing ${filtered.length}${hasMore ? " (more available)" : ""}`}
               </div>
             </div>
           </div>
@@ -98,6 +102,15 @@ export default function AdminCatalogPage() {
           {tab === "partColors" && <PartColorsTab rows={filtered} onEdit={openEdit} onRefresh={refresh} />}
           {tab === "sets" && <SetsTab rows={filtered} onEdit={openEdit} onRefresh={refresh} />}
           {tab === "themes" && <ThemesTab rows={filtered} onEdit={openEdit} onRefresh={refresh} />}
+
+          {/* lists come one cursor page at a time */}
+          {hasMore && (
+            <div className="flex justify-center">
+              <SecondaryButton onClick={() => void loadMore()} disabled={loading}>
+                {loading ? "Loading…" : "Load more"}
+              </SecondaryButton>
+            </div>
+          )}
         </div>
       </div>
 
@@ -1,19 +1,102 @@
+from django.db import transaction
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from core.conditional import ConditionalGetMixin
+from core.images import row_derivative
+from core.representations import CompactListMixin, FieldSelectionMixin
+from sets.models import SetPart
+from sets.rollups import delete_set_parts
 from .models import Part, PartColor, Color
-from .serializers import PartSerializer, PartColorSerializer, ColorSerializer
+from .serializers import ColorMatchSerializer, PartSerializer, PartColorSerializer, ColorSerializer
 
-class PartAdminViewSet(viewsets.ModelViewSet):
-    queryset = Part.objects.all().order_by("part_id")
+class PartAdminViewSet(ConditionalGetMixin, FieldSelectionMixin, viewsets.ModelViewSet):
+    queryset = Part.objects.all()
     serializer_class = PartSerializer
     permission_classes = [IsAdminUser]
+    version_names = ["part"]
+    cache_responses = True
+    search_fields = ["part_id", "name"]
+    filter_fields = {
+        "category": "general_category",
+        "specific_category": "specific_category",
+    }
+    ordering_fields = ["id", "part_id", "name", "total_quantity"]
+    ordering = "part_id"
 
-class PartColorAdminViewSet(viewsets.ModelViewSet):
-    queryset = PartColor.objects.select_related("part").all()
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # the cascade through the part's colors would refresh the rollups per inventory line
+        delete_set_parts(SetPart.objects.filter(part_color__part=instance))
+        instance.delete()
+
+class PartColorAdminViewSet(ConditionalGetMixin, CompactListMixin, viewsets.ModelViewSet):
+    queryset = PartColor.objects.select_related("part", "color")
     serializer_class = PartColorSerializer
     permission_classes = [IsAdminUser]
+    version_names = ["partcolor", "part", "color"]
+    # the admin tables and edit form read the colour and both image URLs off these rows
+    compact_fields = ["id", "part", "color_id", "color_name", "variant", "image_url_1", "image_url_2", "thumb_url"]
+    compact_values = [
+        "id", "part_number", "variant", "part_id", "part__part_id", "part__name", "color_id", "color__name",
+        "image_url_1", "image_url_2", "image_derivatives",
+    ]
+    search_fields = ["part__part_id", "part__name", "part_number", "color__name"]
+    filter_fields = {
+        "part": "part_id",
+        "color": "color_id",
+        "lego_id": "color__lego_id",
+        "category": "part__general_category",
+    }
+    ordering_fields = ["id", "part_number"]
+    ordering = "id"
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # the cascade would refresh the rollups once per inventory line
+        delete_set_parts(SetPart.objects.filter(part_color=instance))
+        instance.delete()
 
-class ColorAdminViewSet(viewsets.ModelViewSet):
-    queryset = Color.objects.all().order_by("lego_id", "name")
+    def compact_row(self, row):
+        return {
+            "id": row["id"],
+            "part": {"id": row["part_id"], "part_id": row["part__part_id"], "name": row["part__name"]},
+            "color_id": row["color_id"],
+            "color_name": row["color__name"],
+            "variant": row["variant"],
+            "image_url_1": row["image_url_1"],
+            "image_url_2": row["image_url_2"],
+            "thumb_url": row_derivative("parts.PartColor", row) or row["image_url_1"] or row["image_url_2"] or None,
+        }
+
+class ColorAdminViewSet(ConditionalGetMixin, FieldSelectionMixin, viewsets.ModelViewSet):
+    queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = [IsAdminUser]
+    version_names = ["color"]
+    cache_responses = True
+    search_fields = ["name", "hex"]
+    filter_fields = {
+        "lego_id": "lego_id",
+        "is_transparent": "is_transparent",
+        "is_metallic": "is_metallic",
+    }
+    ordering_fields = ["id", "lego_id", "name"]
+    ordering = "lego_id"
+
+    @action(detail=False, methods=["post"], url_path="match")
+    def match(self, request):
+        """
+        Nearest catalog color (CIEDE2000) for each of up to 10000 hex codes.
+
+        Body: {"hex": ["#C91A09", "f00", ...], "max_delta_e": 10}
+        -> {"results": [{"hex", "color": {id, lego_id, name, hex} | null, "delta_e"}]}
+        """
+        from . import colormatch  # numpy; kept off the worker boot path
+
+        body = ColorMatchSerializer(data=request.data)
+        body.is_valid(raise_exception=True)
+        results = colormatch.get_index().match(body.validated_data["hex"], body.validated_data.get("max_delta_e"))
+        return Response({"results": results})
+
@@ -0,0 +1,165 @@
+"""
+Nearest catalog Color for arbitrary hex codes.
+
+Every Color with a usable hex is held in numpy arrays with its CIELAB (D65)
+coordinates, so matching a batch of hex codes is one vectorized CIEDE2000
+(ΔE00) computation against the whole palette instead of a scan per code.
+Repeated codes are only matched once.
+
+The index is built lazily and rebuilt when the "color" catalog version moves
+(see core.versions), so color edits in any worker invalidate it.
+"""
+import re
+import threading
+
+import numpy as np
+
+from core import versions
+from .models import Color
+
+VERSION_NAME = "color"
+
+# queries matched against the palette at once (rows of the ΔE matrix)
+BATCH = 2048
+
+HEX_RE = re.compile(r"^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+# sRGB (D65) -> XYZ, and the D65 reference white
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+
+
+def normalize_hex(value):
+    """"#RRGGBB" for "#rgb", "rrggbb", ... or None if `value` isn't a hex color."""
+    match = HEX_RE.match((value or "").strip())
+    if match is None:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = "".join(ch * 2 for ch in digits)
+    return "#" + digits.upper()
+
+
+def hex_to_lab(hexes):
+    """(N, 3) CIELAB coordinates of normalized "#RRGGBB" codes."""
+    rgb = np.array([[int(h[i:i + 2], 16) for i in (1, 3, 5)] for h in hexes], dtype=np.float64).reshape(-1, 3)
+    c = rgb / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ SRGB_TO_XYZ.T / WHITE_D65
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def delta_e_2000(lab1, lab2):
+    """CIEDE2000 between broadcastable (..., 3) arrays of CIELAB coordinates."""
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_bar ** 7 / (c_bar ** 7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    chroma = c1p * c2p
+
+    dl = L2 - L1
+    dc = c2p - c1p
+    dh = h2p - h1p
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(chroma == 0, 0, dh)
+    dh_big = 2 * np.sqrt(chroma) * np.sin(np.radians(dh / 2))
+
+    l_bar = (L1 + L2) / 2
+    c_bar_p = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(
+        chroma == 0, h_sum,
+        np.where(np.abs(h1p - h2p) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)),
+    )
+    t = (
+        1
+        - 0.17 * np.cos(np.radians(h_bar - 30))
+        + 0.24 * np.cos(np.radians(2 * h_bar))
+        + 0.32 * np.cos(np.radians(3 * h_bar + 6))
+        - 0.20 * np.cos(np.radians(4 * h_bar - 63))
+    )
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    r_c = 2 * np.sqrt(c_bar_p ** 7 / (c_bar_p ** 7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (l_bar - 50) ** 2 / np.sqrt(20 + (l_bar - 50) ** 2)
+    s_c = 1 + 0.045 * c_bar_p
+    s_h = 1 + 0.015 * c_bar_p * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+    return np.sqrt(
+        (dl / s_l) ** 2 + (dc / s_c) ** 2 + (dh_big / s_h) ** 2 + r_t * (dc / s_c) * (dh_big / s_h)
+    )
+
+
+class ColorIndex:
+    def __init__(self, colors, version=0):
+        self.colors = colors                                    # [{id, lego_id, name, hex}]
+        self.labs = hex_to_lab([c["hex"] for c in colors])      # (N, 3)
+        self.version = version
+
+    @classmethod
+    def load(cls, version=0):
+        colors = []
+        for row in Color.objects.order_by("pk").values("id", "lego_id", "name", "hex"):
+            hex_ = normalize_hex(row["hex"])
+            if hex_ is not None:
+                colors.append({**row, "hex": hex_})
+        return cls(colors, version=version)
+
+    def nearest(self, hexes):
+        """{normalized hex: (color, ΔE00)} for the distinct valid codes in `hexes`."""
+        codes = sorted({h for h in map(normalize_hex, hexes) if h is not None})
+        if not codes or not self.colors:
+            return {}
+        found = {}
+        for start in range(0, len(codes), BATCH):
+            chunk = codes[start:start + BATCH]
+            distances = delta_e_2000(hex_to_lab(chunk)[:, None, :], self.labs[None, :, :])
+            best = distances.argmin(axis=1)
+            for code, i, distance in zip(chunk, best, distances[np.arange(len(chunk)), best]):
+                found[code] = (self.colors[i], round(float(distance), 3))
+        return found
+
+    def match(self, hexes, max_delta_e=None):
+        """
+        [{hex, color, delta_e}] in the order of `hexes`; color and delta_e
+        are None for invalid codes and for matches further than max_delta_e.
+        """
+        found = self.nearest(hexes)
+        results = []
+        for value in hexes:
+            color, distance = found.get(normalize_hex(value), (None, None))
+            if distance is not None and max_delta_e is not None and distance > max_delta_e:
+                color, distance = None, None
+            results.append({"hex": value, "color": color, "delta_e": distance})
+        return results
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_index():
+    """The current ColorIndex, rebuilt if the palette changed since it was built."""
+    global _index
+    version = versions.get(VERSION_NAME)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = ColorIndex.load(version=version)
+        return _index
+
+
+def invalidate():
+    global _index
+    _index = None
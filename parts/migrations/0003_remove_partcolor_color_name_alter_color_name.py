@@ -15,9 +15,15 @@ class Migration(migrations.Migration):
             name='name',
             field=models.CharField(blank=True, max_length=50, null=True, unique=True),
         ),
-        migrations.AddField(
-            model_name="part",
-            name="image_url_1",
-            field=models.URLField(blank=True, null=True),
+        # 0002 already adds this column; keep the state change but don't
+        # issue a second ALTER TABLE, which fails on a fresh database.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name="part",
+                    name="image_url_1",
+                    field=models.URLField(blank=True, null=True),
+                ),
+            ],
         ),
     ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def drop_color_name(apps, schema_editor):
+    # Older deployments already dropped this column by hand, so only remove
+    # it when it is actually there.
+    PartColor = apps.get_model("parts", "PartColor")
+    table = PartColor._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        columns = {
+            c.name for c in schema_editor.connection.introspection.get_table_description(cursor, table)
+        }
+    if "color_name" in columns:
+        schema_editor.remove_field(PartColor, PartColor._meta.get_field("color_name"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0003_remove_partcolor_color_name_alter_color_name'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='partcolor',
+                    name='color_name',
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(drop_color_name, migrations.RunPython.noop),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0004_remove_partcolor_color_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['name'], name='part_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['general_category'], name='part_general_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['specific_category'], name='part_specific_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partcolor',
+            index=models.Index(fields=['part_number'], name='partcolor_part_number_idx'),
+        ),
+    ]
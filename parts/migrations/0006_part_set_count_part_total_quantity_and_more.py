@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0005_part_part_name_idx_part_part_general_category_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='set_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='total_quantity',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(fields=['total_quantity'], name='part_total_quantity_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_part_set_count_part_total_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='part',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='partcolor',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0007_part_image_derivatives_partcolor_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='color',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='part',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='partcolor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
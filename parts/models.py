@@ -11,16 +11,34 @@ class Color(models.Model):
     is_transparent = models.BooleanField(default=False)
     is_metallic = models.BooleanField(default=False)
 
+    # Bumped on every save; bulk writers set it explicitly (see core.versions)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return f"{self.name}{f' ({self.lego_id})' if self.lego_id is not None else ''}"
 
 class Part(models.Model):
     image_url_1 = models.URLField(blank=True, null=True)
+    # Resized WebP/AVIF copies of the image, filled in by core.images
+    image_derivatives = models.JSONField(default=dict, blank=True)
     part_id = models.CharField(max_length=50, unique=True)   # shape id (e.g., "3001")
     name = models.CharField(max_length=120)
     general_category = models.CharField(max_length=80, blank=True)
     specific_category = models.CharField(max_length=80, blank=True)
 
+    # Usage rollup across every color of this shape, maintained by sets.rollups
+    set_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], name="part_name_idx"),
+            models.Index(fields=["total_quantity"], name="part_total_quantity_idx"),
+            models.Index(fields=["general_category"], name="part_general_category_idx"),
+            models.Index(fields=["specific_category"], name="part_specific_category_idx"),
+        ]
+
     def __str__(self):
         return f"{self.part_id} - {self.name}"
 
@@ -34,6 +52,8 @@ class PartColor(models.Model):
 
     image_url_1 = models.URLField(blank=True, null=True)
     image_url_2 = models.URLField(blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -42,7 +62,10 @@ class PartColor(models.Model):
                 name="uniq_part_color_variant"
             )
         ]
+        indexes = [
+            models.Index(fields=["part_number"], name="partcolor_part_number_idx"),
+        ]
 
     def __str__(self):
         v = f" ({self.variant})" if self.variant else ""
-        return f"{self.part.part_id} - {self.color_name}{v}"
+        return f"{self.part.part_id} - {self.color}{v}"
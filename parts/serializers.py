@@ -1,12 +1,17 @@
 from rest_framework import serializers
+from core.images import current_derivatives, derivative
+from core.representations import SelectableFieldsMixin
 from .models import Part, PartColor, Color
 
-class ColorSerializer(serializers.ModelSerializer):
+class ColorSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Color
         fields = ["id", "lego_id", "name", "hex", "is_transparent", "is_metallic"]
 
-class PartSerializer(serializers.ModelSerializer):
+class PartSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
+    thumb_url = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Part
         fields = [
@@ -16,17 +21,42 @@ class PartSerializer(serializers.ModelSerializer):
             "general_category",
             "specific_category",
             "image_url_1", 
+            "set_count",
+            "total_quantity",
+            "thumb_url",
+            "images",
         ]
+        read_only_fields = ["set_count", "total_quantity"]
+
+    def get_thumb_url(self, obj: Part):
+        return derivative(obj, "thumb") or obj.image_url_1 or None
+
+    def get_images(self, obj: Part):
+        return current_derivatives(obj)
 
-class PartColorSerializer(serializers.ModelSerializer):
+class PartColorSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     part = PartSerializer(read_only=True)
     part_id = serializers.PrimaryKeyRelatedField(queryset=Part.objects.all(), source="part", write_only=True)
+    color_id = serializers.IntegerField(read_only=True)
+    color_name = serializers.CharField(source="color.name", read_only=True, default=None)
 
     thumb_url = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = PartColor
-        fields = ["id", "part", "part_id", "variant", "image_url_1", "image_url_2", "thumb_url"]
+        fields = [
+            "id", "part", "part_id", "color_id", "color_name", "variant", "image_url_1", "image_url_2",
+            "thumb_url", "images",
+        ]
 
     def get_thumb_url(self, obj: PartColor):
-        return obj.image_url_1 or obj.image_url_2 or None
+        return derivative(obj, "thumb") or obj.image_url_1 or obj.image_url_2 or None
+
+    def get_images(self, obj: PartColor):
+        return current_derivatives(obj)
+
+class ColorMatchSerializer(serializers.Serializer):
+    """Body of a bulk hex -> Color match."""
+    hex = serializers.ListField(child=serializers.CharField(max_length=16, allow_blank=True), min_length=1, max_length=10000)
+    max_delta_e = serializers.FloatField(min_value=0, required=False)
@@ -1,3 +1,191 @@
+import io
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from . import colormatch
+from .models import Color, Part, PartColor
+
+
+class CatalogListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+
+        self.red = Color.objects.create(lego_id=4, name="Red", hex="#C91A09")
+        self.blue = Color.objects.create(lego_id=1, name="Blue", hex="#0055BF")
+        for i in range(7):
+            part = Part.objects.create(
+                part_id=f"{3001 + i}",
+                name=f"Brick 2 x {i + 1}",
+                general_category="Bricks" if i % 2 else "Plates",
+            )
+            PartColor.objects.create(part=part, color=self.red if i % 2 else self.blue)
+
+    def test_cursor_pagination_walks_every_row(self):
+        seen = []
+        url = "/api/admin/parts/?page_size=3"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertLessEqual(len(res.data["results"]), 3)
+            seen += [row["part_id"] for row in res.data["results"]]
+            url = res.data["next"]
+        self.assertEqual(seen, sorted(Part.objects.values_list("part_id", flat=True)))
+
+    def test_ordering_by_total_quantity_pages_through_ties(self):
+        # parts no set uses all have total_quantity 0, far more of them than offset_cutoff
+        Part.objects.bulk_create(Part(part_id=f"x{i}", name="Unused") for i in range(1100))
+        seen, url = [], "/api/admin/parts/?ordering=total_quantity&page_size=200"
+        while url:
+            res = self.client.get(url)
+            seen += [row["id"] for row in res.data["results"]]
+            url = res.data["next"]
+            self.assertLessEqual(len(seen), Part.objects.count())
+        self.assertEqual(sorted(seen), sorted(Part.objects.values_list("id", flat=True)))
+
+    def test_part_color_ordering_by_part_number_pages_through_ties(self):
+        # part_number is blank unless a source provides one
+        part = Part.objects.get(part_id="3001")
+        PartColor.objects.bulk_create(PartColor(part=part, variant=f"print {i}") for i in range(1100))
+        seen, url = [], "/api/admin/part-colors/?ordering=-part_number&page_size=300"
+        while url:
+            res = self.client.get(url)
+            seen += [row["id"] for row in res.data["results"]]
+            url = res.data["next"]
+            self.assertLessEqual(len(seen), PartColor.objects.count())
+        self.assertEqual(sorted(seen), sorted(PartColor.objects.values_list("id", flat=True)))
+
+    def test_search_filter_and_ordering(self):
+        res = self.client.get("/api/admin/parts/?search=3003")
+        self.assertEqual([r["part_id"] for r in res.data["results"]], ["3003"])
+
+        res = self.client.get("/api/admin/parts/?category=Bricks&ordering=-part_id")
+        self.assertEqual([r["part_id"] for r in res.data["results"]], ["3006", "3004", "3002"])
+
+        res = self.client.get("/api/admin/part-colors/?lego_id=4")
+        self.assertEqual(len(res.data["results"]), 3)
+
+        res = self.client.get("/api/admin/part-colors/?search=blue")
+        self.assertEqual(len(res.data["results"]), 4)
+
+    def test_part_color_rows_carry_what_the_edit_form_sends_back(self):
+        pc = PartColor.objects.select_related("part").first()
+        PartColor.objects.filter(pk=pc.pk).update(
+            image_url_1="https://assets.example.com/a.png", image_url_2="https://assets.example.com/b.png",
+        )
+        row = next(r for r in self.client.get("/api/admin/part-colors/").data["results"] if r["id"] == pc.pk)
+        self.assertEqual((row["color_id"], row["color_name"]), (pc.color_id, pc.color.name))
+        detail = self.client.get(f"/api/admin/part-colors/{pc.pk}/").data
+        flat = [key for key in row if key != "part"]  # the detail nests the whole part
+        self.assertEqual({key: row[key] for key in flat}, {key: detail[key] for key in flat})
+
+        # PartColorForm builds its PATCH body from the list row
+        form = {key: row[key] for key in ["color_id", "color_name", "variant", "image_url_1", "image_url_2"]}
+        form["part_id"] = row["part"]["id"]
+        res = self.client.patch(f"/api/admin/part-colors/{pc.pk}/", form, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        pc.refresh_from_db()
+        self.assertEqual(
+            (pc.image_url_1, pc.image_url_2), ("https://assets.example.com/a.png", "https://assets.example.com/b.png"),
+        )
+
+    def test_invalid_filter_value_is_a_400(self):
+        res = self.client.get("/api/admin/part-colors/?color=abc")
+        self.assertEqual(res.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.part = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+
+    def test_unchanged_list_is_a_304(self):
+        res = self.client.get("/api/admin/parts/")
+        self.assertEqual(res.status_code, 200)
+        etag = res["ETag"]
+        self.assertIn("Last-Modified", res)
+
+        with self.assertNumQueries(1):  # the version lookup only
+            res = self.client.get("/api/admin/parts/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+
+        # other query parameters are a different representation
+        res = self.client.get("/api/admin/parts/?ordering=-id", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+    def test_writes_change_the_validators(self):
+        etag = self.client.get(f"/api/admin/parts/{self.part.pk}/")["ETag"]
+
+        self.part.name = "Brick 2 x 4 (new)"
+        self.part.save()
+        res = self.client.get(f"/api/admin/parts/{self.part.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["name"], "Brick 2 x 4 (new)")
+
+        # part-colors embed their part, so a part change invalidates them too
+        etag = self.client.get("/api/admin/part-colors/")["ETag"]
+        Part.objects.filter(pk=self.part.pk).update(name="x")  # no signal: stays cached
+        res = self.client.get("/api/admin/part-colors/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.part.save()
+        res = self.client.get("/api/admin/part-colors/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+
+class ColorMatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.red = Color.objects.create(lego_id=4, name="Red", hex="#C91A09")
+        self.blue = Color.objects.create(lego_id=1, name="Blue", hex="#0055BF")
+        self.white = Color.objects.create(lego_id=15, name="White", hex="#FFFFFF")
+        Color.objects.create(lego_id=9999, name="No Color", hex="")
+        colormatch.invalidate()
+
+    def test_delta_e_matches_reference_values(self):
+        # Sharma, Wu & Dalal (2005) CIEDE2000 test data
+        lab1 = np.array([[50, 2.6772, -79.7751], [50, 2.5, 0], [50, 2.49, -0.001]])
+        lab2 = np.array([[50, 0, -82.7485], [73, 25, -18], [50, -2.49, 0.0011]])
+        np.testing.assert_allclose(colormatch.delta_e_2000(lab1, lab2), [2.0425, 27.1492, 7.2195], atol=1e-4)
+
+    def test_endpoint_resolves_hex_codes(self):
+        res = self.client.post(
+            "/api/admin/colors/match/",
+            {"hex": ["#c91a09", "d00", "0055bf", "fefefe", "nope", "#00FF00"], "max_delta_e": 30},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        names = [r["color"]["name"] if r["color"] else None for r in res.data["results"]]
+        self.assertEqual(names, ["Red", "Red", "Blue", "White", None, None])
+        self.assertEqual(res.data["results"][0]["delta_e"], 0.0)
+        self.assertEqual(self.client.post("/api/admin/colors/match/", {"hex": []}, format="json").status_code, 400)
+
+    def test_index_follows_color_changes(self):
+        self.assertEqual(colormatch.get_index().match(["#2A7A45"])[0]["color"]["name"], "Blue")
+        Color.objects.create(lego_id=2, name="Green", hex="#237841")
+        self.assertEqual(colormatch.get_index().match(["#2A7A45"])[0]["color"]["name"], "Green")
 
-# Create your tests here.
+    def test_backfill_fills_missing_colors(self):
+        brick = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+        plate = Part.objects.create(part_id="3020", name="Plate 2 x 4")
+        PartColor.objects.create(part=brick, color=self.red)
+        legacy = [
+            PartColor.objects.create(part=brick, color_hex="#CC1100"),            # would duplicate red brick
+            PartColor.objects.create(part=brick, color_hex="#0050C0"),
+            PartColor.objects.create(part=plate, color_hex="#C91A09"),
+            PartColor.objects.create(part=plate, color_hex="garbage"),
+        ]
+        out = io.StringIO()
+        call_command("match_colors", "--backfill", "--batch-size", "2", stdout=out)
+        self.assertIn("filled 2 part-colors; 1 unmatched, 1 skipped", out.getvalue())
+        colors = [PartColor.objects.get(pk=pc.pk).color_id for pc in legacy]
+        self.assertEqual(colors, [None, self.blue.pk, self.red.pk, None])
@@ -1,14 +1,370 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAdminUser
-from .models import Set, Theme
-from .serializers import SetSerializer, ThemeSerializer
+from adrf import generics as async_generics
+from adrf.shortcuts import aget_object_or_404
+from django.db import transaction
+from django.db.models import Count, Prefetch, Sum
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from accounts.models import OwnedPart
+from core import versions
+from core.conditional import ConditionalGetMixin
+from core.images import row_derivative
+from core.representations import CompactListMixin, FieldSelectionMixin
+from parts.models import Part, PartColor
+from .models import Set, SetPart, Theme
+from .rollups import delete_set_parts, refresh_part_usage, refresh_set_aggregates
+from .serializers import (
+    BuyListSerializer,
+    SetPartLineSerializer,
+    SetPartSerializer,
+    SetSerializer,
+    SetUsageSerializer,
+    ThemeSerializer,
+)
 
-class ThemeAdminViewSet(viewsets.ModelViewSet):
-    queryset = Theme.objects.all().order_by("name")
+class ThemeAdminViewSet(ConditionalGetMixin, FieldSelectionMixin, viewsets.ModelViewSet):
+    queryset = Theme.objects.all()
     serializer_class = ThemeSerializer
     permission_classes = [IsAdminUser]
+    version_names = ["theme"]
+    search_fields = ["name"]
+    ordering_fields = ["id", "name"]
+    ordering = "name"
 
-class SetAdminViewSet(viewsets.ModelViewSet):
-    queryset = Set.objects.all().order_by("number")
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # the cascade through the theme's sets would refresh the rollups per inventory line
+        delete_set_parts(SetPart.objects.filter(set__theme=instance))
+        instance.delete()
+
+class SetAdminViewSet(ConditionalGetMixin, CompactListMixin, viewsets.ModelViewSet):
+    # theme is joined in; the whole inventory (SetPart -> PartColor -> Part/Color)
+    # comes back in one extra query, no matter how many sets or line items.
+    # Lists are compact rows without it unless ?expand=parts_detail.
+    queryset = (
+        Set.objects.select_related("theme")
+        .prefetch_related(
+            Prefetch(
+                "setpart_set",
+                queryset=SetPart.objects.select_related(
+                    "part_color__part",
+                    "part_color__color",
+                ).order_by("id"),
+            )
+        )
+    )
     serializer_class = SetSerializer
     permission_classes = [IsAdminUser]
+    version_names = ["set", "theme", "setpart", "partcolor", "part", "color"]
+    cache_responses = True
+    search_fields = ["number", "set_name", "theme__name"]
+    filter_fields = {
+        "theme": "theme_id",
+        "min_pieces": "total_pieces__gte",
+        "max_pieces": "total_pieces__lte",
+        "min_unique_parts": "unique_parts__gte",
+        "max_unique_parts": "unique_parts__lte",
+        "color": "color_counts__has_key",
+    }
+    ordering_fields = ["id", "number", "set_name", "piece_count", "total_pieces", "unique_part_colors", "unique_parts"]
+    ordering = "number"
+    # the admin tables and edit form read image_url off these rows
+    compact_fields = [
+        "id", "number", "set_name", "image_url", "age", "piece_count",
+        "total_pieces", "unique_part_colors", "unique_parts", "theme", "thumb_url",
+    ]
+    compact_values = [
+        "id", "number", "set_name", "age", "piece_count",
+        "total_pieces", "unique_part_colors", "unique_parts", "theme_id", "theme__name",
+        "image_url", "image_derivatives",
+    ]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.wants("parts_detail"):
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # the cascade would refresh the rollups once per inventory line
+        delete_set_parts(SetPart.objects.filter(set=instance))
+        instance.delete()
+
+    def compact_row(self, row):
+        return {
+            "id": row["id"],
+            "number": row["number"],
+            "set_name": row["set_name"],
+            "image_url": row["image_url"],
+            "age": row["age"],
+            "piece_count": row["piece_count"],
+            "total_pieces": row["total_pieces"],
+            "unique_part_colors": row["unique_part_colors"],
+            "unique_parts": row["unique_parts"],
+            "theme": {"id": row["theme_id"], "name": row["theme__name"]},
+            "thumb_url": row_derivative("sets.Set", row) or row["image_url"] or None,
+        }
+
+    @action(detail=True, methods=["put", "patch"], url_path="parts")
+    def parts(self, request, pk=None):
+        """
+        Bulk-write a set's inventory.
+
+        Body: [{"part_color_id": 12, "quantity": 4}, ...] (or {"parts": [...]})
+
+        PUT replaces the whole inventory; PATCH only touches the listed
+        part-colors, and quantity 0 removes a line. The diff is applied with
+        bulk insert/update/delete and piece_count is recomputed in the same
+        transaction.
+        """
+        payload = request.data.get("parts") if isinstance(request.data, dict) else request.data
+        lines = SetPartLineSerializer(data=payload, many=True)
+        lines.is_valid(raise_exception=True)
+
+        wanted = {}
+        for line in lines.validated_data:
+            if line["part_color_id"] in wanted:
+                raise ValidationError({"detail": f"Duplicate part_color_id {line['part_color_id']}."})
+            wanted[line["part_color_id"]] = line["quantity"]
+
+        known = set(PartColor.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        unknown = sorted(set(wanted) - known)
+        if unknown:
+            raise ValidationError({"detail": f"Unknown part_color_id(s): {unknown}."})
+
+        replace = request.method == "PUT"
+
+        with transaction.atomic():
+            # Lock the set row (skipping the inventory prefetch) so concurrent
+            # writes to the same inventory serialize.
+            set_obj = get_object_or_404(Set.objects.select_for_update(), pk=pk)
+            self.check_object_permissions(request, set_obj)
+
+            current = {
+                row.part_color_id: row
+                for row in SetPart.objects.filter(set=set_obj).only("id", "part_color_id", "quantity")
+            }
+
+            to_create = []
+            to_update = []
+            to_delete = []
+            for part_color_id, quantity in wanted.items():
+                row = current.get(part_color_id)
+                if quantity == 0:
+                    if row is not None:
+                        to_delete.append(row.pk)
+                elif row is None:
+                    to_create.append(SetPart(set=set_obj, part_color_id=part_color_id, quantity=quantity))
+                elif row.quantity != quantity:
+                    row.quantity = quantity
+                    row.updated_at = timezone.now()
+                    to_update.append(row)
+            if replace:
+                to_delete += [row.pk for pc_id, row in current.items() if pc_id not in wanted]
+
+            # none of these fire the per-row SetPart signals; the rollups are refreshed once below
+            delete_set_parts(SetPart.objects.filter(pk__in=to_delete), refresh=False)
+            SetPart.objects.bulk_update(to_update, ["quantity", "updated_at"])
+            SetPart.objects.bulk_create(to_create)
+            versions.bump_models(SetPart)
+            refresh_part_usage(
+                PartColor.objects.filter(pk__in=set(wanted) | set(current))
+                .values_list("part_id", flat=True)
+                .distinct()
+            )
+            refresh_set_aggregates([set_obj.pk])
+
+            set_obj.piece_count = (
+                SetPart.objects.filter(set=set_obj).aggregate(total=Sum("quantity"))["total"] or 0
+            )
+            set_obj.save(update_fields=["piece_count", "updated_at"])
+
+        inventory = (
+            SetPart.objects.filter(set=set_obj)
+            .select_related("part_color__part", "part_color__color")
+            .order_by("id")
+        )
+        return Response(
+            {
+                "id": set_obj.pk,
+                "piece_count": set_obj.piece_count,
+                "created": len(to_create),
+                "updated": len(to_update),
+                "deleted": len(to_delete),
+                "parts_detail": SetPartSerializer(inventory, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PartSetsView(ConditionalGetMixin, async_generics.ListAPIView):
+    """
+    GET /api/parts/{id}/sets/
+
+    Sets using this shape in any color, with the summed quantity, plus the
+    part's maintained usage rollup.
+    """
+    serializer_class = SetUsageSerializer
+    search_fields = ["number", "set_name"]
+    ordering_fields = ["quantity", "number", "id"]
+    ordering = ("-quantity", "id")
+    version_names = ["part", "set", "setpart"]
+
+    async def get(self, request, *args, **kwargs):
+        self.part = await aget_object_or_404(Part, pk=kwargs["pk"])
+        return await self.alist(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return (
+            Set.objects.filter(setpart__part_color__part_id=self.kwargs["pk"])
+            .annotate(quantity=Sum("setpart__quantity"))
+        )
+
+    async def get_apaginated_response(self, data):
+        response = await super().get_apaginated_response(data)
+        response.data["usage"] = {
+            "part": self.part.pk,
+            "set_count": self.part.set_count,
+            "total_quantity": self.part.total_quantity,
+        }
+        return response
+
+
+class PartColorSetsView(ConditionalGetMixin, async_generics.ListAPIView):
+    """
+    GET /api/part-colors/{id}/sets/
+
+    Sets using this exact part-color, with quantities and total usage.
+    """
+    serializer_class = SetUsageSerializer
+    search_fields = ["number", "set_name"]
+    ordering_fields = ["quantity", "number", "id"]
+    ordering = ("-quantity", "id")
+    version_names = ["partcolor", "set", "setpart"]
+
+    async def get(self, request, *args, **kwargs):
+        self.part_color = await aget_object_or_404(PartColor, pk=kwargs["pk"])
+        return await self.alist(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return (
+            Set.objects.filter(setpart__part_color_id=self.kwargs["pk"])
+            .annotate(quantity=Sum("setpart__quantity"))
+        )
+
+    async def get_apaginated_response(self, data):
+        response = await super().get_apaginated_response(data)
+        usage = await SetPart.objects.filter(part_color_id=self.part_color.pk).aaggregate(
+            set_count=Count("set_id"),
+            total_quantity=Sum("quantity"),
+        )
+        response.data["usage"] = {
+            "part_color": self.part_color.pk,
+            "set_count": usage["set_count"],
+            "total_quantity": usage["total_quantity"] or 0,
+        }
+        return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def buy_list(request):
+    """
+    POST /api/sets/buy-list/
+
+    Body: {"sets": [12, 40, ...], "owned": [{"part_color_id", "quantity"}, ...]}
+          (or "use_collection": true for the user's own collection)
+
+    One combined parts list for building all the sets: per part-color the
+    summed requirement, each set's share, how many sets share it, what is
+    owned and what is left to buy; plus per-set totals and what each set
+    needs that none of the others do.
+    """
+    body = BuyListSerializer(data=request.data)
+    body.is_valid(raise_exception=True)
+    set_ids = body.validated_data["sets"]
+
+    sets = Set.objects.only("id", "number", "set_name", "total_pieces", "unique_part_colors").in_bulk(set_ids)
+    unknown = sorted(set(set_ids) - set(sets))
+    if unknown:
+        raise ValidationError({"sets": f"Unknown set id(s): {unknown}."})
+
+    # One grouped aggregate for the combined list, and the (narrow) set lines
+    # themselves for the per-set breakdown.
+    lines_of_sets = SetPart.objects.filter(set_id__in=set_ids, quantity__gt=0)
+    rows = (
+        lines_of_sets.values(
+            "part_color_id",
+            "part_color__part__part_id",
+            "part_color__part__name",
+            "part_color__variant",
+            "part_color__color_id",
+            "part_color__color__name",
+            "part_color__color__hex",
+        )
+        .annotate(required=Sum("quantity"), shared_by=Count("set_id"))
+        .order_by("part_color__part__part_id", "part_color__color__name", "part_color_id")
+    )
+    breakdowns = {}
+    for part_color_id, set_id, quantity in lines_of_sets.values_list("part_color_id", "set_id", "quantity"):
+        breakdowns.setdefault(part_color_id, {})[set_id] = quantity
+
+    if body.validated_data["use_collection"]:
+        owned = dict(OwnedPart.objects.filter(user_id=request.user.id).values_list("part_color_id", "quantity"))
+    else:
+        owned = {line["part_color_id"]: line["quantity"] for line in body.validated_data.get("owned") or []}
+
+    lines = []
+    totals = {"lines": 0, "required": 0, "owned": 0, "to_buy": 0}
+    exclusive = {set_id: {"lines": 0, "pieces": 0} for set_id in set_ids}
+    for row in rows:
+        have = min(owned.get(row["part_color_id"], 0), row["required"])
+        breakdown = breakdowns[row["part_color_id"]]
+        if row["shared_by"] == 1:
+            (only,) = breakdown
+            exclusive[only]["lines"] += 1
+            exclusive[only]["pieces"] += breakdown[only]
+        lines.append({
+            "part_color_id": row["part_color_id"],
+            "part_id": row["part_color__part__part_id"],
+            "part_name": row["part_color__part__name"],
+            "variant": row["part_color__variant"],
+            "color": {
+                "id": row["part_color__color_id"],
+                "name": row["part_color__color__name"],
+                "hex": row["part_color__color__hex"],
+            } if row["part_color__color_id"] is not None else None,
+            "required": row["required"],
+            "per_set": breakdown,
+            "shared_by": row["shared_by"],
+            "owned": have,
+            "to_buy": row["required"] - have,
+        })
+        totals["lines"] += 1
+        totals["required"] += row["required"]
+        totals["owned"] += have
+        totals["to_buy"] += row["required"] - have
+
+    return Response({
+        "sets": [
+            {
+                "id": set_id,
+                "number": sets[set_id].number,
+                "set_name": sets[set_id].set_name,
+                "total_pieces": sets[set_id].total_pieces,
+                "unique_part_colors": sets[set_id].unique_part_colors,
+                "exclusive_lines": exclusive[set_id]["lines"],
+                "exclusive_pieces": exclusive[set_id]["pieces"],
+            }
+            for set_id in set_ids
+        ],
+        "shared_lines": sum(1 for line in lines if line["shared_by"] == len(set_ids)),
+        "totals": totals,
+        "lines": lines,
+    })
+
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class SetsConfig(AppConfig):
     name = 'sets'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,130 @@
+"""
+Compact, in-process copy of every set inventory for collection matching.
+
+All SetPart rows are held as one CSR-style sparse matrix (one row per set,
+columns keyed by part_color_id) in numpy arrays, so scoring a user's whole
+collection against every set is a handful of vectorized operations instead
+of one query per set.
+
+The matrix is loaded lazily and rebuilt when the "setpart" catalog version
+moves (see core.versions), so writes in any worker invalidate it.
+"""
+import threading
+
+import numpy as np
+
+from core import versions
+from .models import SetPart
+
+VERSION_NAME = "setpart"
+
+
+class InventoryMatrix:
+    def __init__(self, set_ids, indptr, part_color_ids, quantities, version=0):
+        self.set_ids = set_ids                # (S,) Set pks, one per row
+        self.indptr = indptr                  # (S + 1,) row i is [indptr[i], indptr[i + 1])
+        self.part_color_ids = part_color_ids  # (nnz,) column keys
+        self.quantities = quantities          # (nnz,) required quantity
+        self.totals = np.add.reduceat(quantities, indptr[:-1]) if len(set_ids) else np.zeros(0, np.int64)
+        self.version = version
+
+    @classmethod
+    def load(cls, version=0):
+        set_ids, counts, part_color_ids, quantities = [], [], [], []
+        rows = (
+            SetPart.objects.filter(quantity__gt=0)
+            .order_by("set_id")
+            .values_list("set_id", "part_color_id", "quantity")
+            .iterator(chunk_size=20000)
+        )
+        for set_id, part_color_id, quantity in rows:
+            if not set_ids or set_ids[-1] != set_id:
+                set_ids.append(set_id)
+                counts.append(0)
+            counts[-1] += 1
+            part_color_ids.append(part_color_id)
+            quantities.append(quantity)
+
+        indptr = np.zeros(len(set_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(
+            np.asarray(set_ids, dtype=np.int64),
+            indptr,
+            np.asarray(part_color_ids, dtype=np.int64),
+            np.asarray(quantities, dtype=np.int64),
+            version=version,
+        )
+
+    def covered(self, owned):
+        """
+        Per line item, how many of the required pieces `owned`
+        ({part_color_id: quantity}) covers.
+        """
+        if not owned or not len(self.part_color_ids):
+            return np.zeros_like(self.quantities)
+
+        owned_ids = np.fromiter(owned.keys(), dtype=np.int64, count=len(owned))
+        owned_qty = np.fromiter(owned.values(), dtype=np.int64, count=len(owned))
+        order = np.argsort(owned_ids)
+        owned_ids, owned_qty = owned_ids[order], owned_qty[order]
+
+        idx = np.searchsorted(owned_ids, self.part_color_ids)
+        idx = np.minimum(idx, len(owned_ids) - 1)
+        have = np.where(owned_ids[idx] == self.part_color_ids, owned_qty[idx], 0)
+        return np.minimum(have, self.quantities)
+
+    def rank(self, owned, limit=20, min_percent=0.0):
+        """
+        Rank every set by the share of its pieces covered by `owned`.
+
+        Returns [{set_id, percent, have, total, missing: [{part_color_id, quantity}]}],
+        best first (ties go to the bigger set).
+        """
+        if not len(self.set_ids):
+            return []
+
+        covered = self.covered(owned)
+        have = np.add.reduceat(covered, self.indptr[:-1])
+        percent = have / self.totals * 100.0
+
+        order = np.lexsort((-self.totals, -percent))
+        order = order[percent[order] >= min_percent][:limit]
+
+        results = []
+        for i in order:
+            start, end = self.indptr[i], self.indptr[i + 1]
+            short = self.quantities[start:end] - covered[start:end]
+            missing = np.nonzero(short)[0]
+            results.append({
+                "set_id": int(self.set_ids[i]),
+                "percent": round(float(percent[i]), 2),
+                "have": int(have[i]),
+                "total": int(self.totals[i]),
+                "missing": [
+                    {"part_color_id": int(self.part_color_ids[start + j]), "quantity": int(short[j])}
+                    for j in missing
+                ],
+            })
+        return results
+
+
+_lock = threading.Lock()
+_matrix = None
+
+
+def get_matrix():
+    """The current InventoryMatrix, reloaded if the catalog changed since it was built."""
+    global _matrix
+    version = versions.get(VERSION_NAME)
+    matrix = _matrix
+    if matrix is not None and matrix.version == version:
+        return matrix
+    with _lock:
+        if _matrix is None or _matrix.version != version:
+            _matrix = InventoryMatrix.load(version=version)
+        return _matrix
+
+
+def invalidate():
+    global _matrix
+    _matrix = None
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0005_part_part_name_idx_part_part_general_category_idx_and_more'),
+        ('sets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='set',
+            index=models.Index(fields=['set_name'], name='set_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='set',
+            index=models.Index(fields=['piece_count'], name='set_piece_count_idx'),
+        ),
+    ]
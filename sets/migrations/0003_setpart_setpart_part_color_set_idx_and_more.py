@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:48
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_part_usage(apps, schema_editor):
+    Part = apps.get_model("parts", "Part")
+    SetPart = apps.get_model("sets", "SetPart")
+    usage = SetPart.objects.values("part_color__part_id").annotate(
+        sets=Count("set_id", distinct=True),
+        total=Sum("quantity"),
+    )
+    for row in usage.iterator():
+        Part.objects.filter(pk=row["part_color__part_id"]).update(
+            set_count=row["sets"], total_quantity=row["total"] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0006_part_set_count_part_total_quantity_and_more'),
+        ('sets', '0002_set_set_name_idx_set_set_piece_count_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='setpart',
+            index=models.Index(fields=['part_color', 'set'], name='setpart_part_color_set_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='setpart',
+            index=models.Index(fields=['part_color', 'quantity'], name='setpart_part_color_qty_idx'),
+        ),
+        migrations.RunPython(backfill_part_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sets', '0003_setpart_setpart_part_color_set_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='set',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sets', '0004_set_image_derivatives_theme_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='set',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='setpart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:12
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_set_aggregates(apps, schema_editor):
+    Set = apps.get_model("sets", "Set")
+    SetPart = apps.get_model("sets", "SetPart")
+    lines = SetPart.objects.filter(quantity__gt=0)
+    aggregates = {}
+    by_color = lines.values("set_id", "part_color__color_id").annotate(pieces=Sum("quantity"), rows=Count("id"))
+    for row in by_color.iterator():
+        entry = aggregates.setdefault(row["set_id"], {"total_pieces": 0, "unique_part_colors": 0, "color_counts": {}})
+        entry["total_pieces"] += row["pieces"]
+        entry["unique_part_colors"] += row["rows"]
+        if row["part_color__color_id"] is not None:
+            entry["color_counts"][str(row["part_color__color_id"])] = row["pieces"]
+    shapes = lines.values("set_id").annotate(shapes=Count("part_color__part_id", distinct=True))
+    for row in shapes.iterator():
+        Set.objects.filter(pk=row["set_id"]).update(unique_parts=row["shapes"], **aggregates[row["set_id"]])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parts', '0008_color_updated_at_part_updated_at_and_more'),
+        ('sets', '0005_set_updated_at_setpart_updated_at_theme_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='set',
+            name='color_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='set',
+            name='total_pieces',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='set',
+            name='unique_part_colors',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='set',
+            name='unique_parts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='set',
+            index=models.Index(fields=['total_pieces'], name='set_total_pieces_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='set',
+            index=models.Index(fields=['unique_parts'], name='set_unique_parts_idx'),
+        ),
+        migrations.RunPython(backfill_set_aggregates, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 class Theme(models.Model):
     name = models.CharField(max_length=50, unique=True)
     image_url = models.URLField(blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -12,9 +14,17 @@ class Set(models.Model):
     number = models.CharField(max_length=50, unique=True)    # set number like "75218"
     set_name = models.CharField(max_length=120)
     image_url = models.URLField(blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
     age = models.CharField(max_length=50, blank=True)
     theme = models.ForeignKey(Theme, on_delete=models.CASCADE, related_name="sets")
     piece_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Inventory aggregates over the SetPart rows, maintained by sets.rollups
+    total_pieces = models.PositiveIntegerField(default=0)
+    unique_part_colors = models.PositiveIntegerField(default=0)
+    unique_parts = models.PositiveIntegerField(default=0)
+    color_counts = models.JSONField(default=dict, blank=True)  # {"<color id>": pieces}
 
     # Many-to-many to PartColor THROUGH a line-item model (qty, etc.)
     parts = models.ManyToManyField(
@@ -23,6 +33,14 @@ class Set(models.Model):
         related_name="sets",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["set_name"], name="set_name_idx"),
+            models.Index(fields=["piece_count"], name="set_piece_count_idx"),
+            models.Index(fields=["total_pieces"], name="set_total_pieces_idx"),
+            models.Index(fields=["unique_parts"], name="set_unique_parts_idx"),
+        ]
+
     def __str__(self):
         return f"{self.number} - {self.set_name}"
 
@@ -34,6 +52,12 @@ class SetPart(models.Model):
     set = models.ForeignKey(Set, on_delete=models.CASCADE)
     part_color = models.ForeignKey("parts.PartColor", on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("set", "part_color")
+        indexes = [
+            # reverse lookups: which sets use a part-color, and by how much
+            models.Index(fields=["part_color", "set"], name="setpart_part_color_set_idx"),
+            models.Index(fields=["part_color", "quantity"], name="setpart_part_color_qty_idx"),
+        ]
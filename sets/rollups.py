@@ -0,0 +1,125 @@
+"""
+Denormalized figures derived from SetPart rows.
+
+Part.set_count / Part.total_quantity say how many sets use a shape (in any
+color) and how many pieces of it they need in total, so popular bricks can
+be sorted and summarized without aggregating their whole reverse index.
+
+Set.total_pieces / unique_part_colors / unique_parts / color_counts
+summarize a set's inventory, so lists can sort and filter on them and
+clients get the color breakdown without pulling every line.
+
+Both are recomputed for just the rows a write touched: single-row saves and
+deletes through sets.signals, bulk writes by calling the refresh functions
+once with every affected id. Deleting inventory lines in bulk (including
+before deleting sets, themes, parts or part-colors, whose cascade would fire
+the signals per line) goes through delete_set_parts().
+"""
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core import versions
+from parts.models import Part
+from .models import Set, SetPart
+
+SET_AGGREGATES = ["total_pieces", "unique_part_colors", "unique_parts", "color_counts"]
+
+
+def refresh_part_usage(part_ids=None, batch_size=2000):
+    """Recompute the usage rollup for `part_ids` (or every part when None)."""
+    usage = SetPart.objects.values("part_color__part_id").annotate(
+        sets=Count("set_id", distinct=True),
+        total=Sum("quantity"),
+    )
+    parts = Part.objects.only("id", "set_count", "total_quantity").order_by("pk")
+    if part_ids is not None:
+        part_ids = list(part_ids)
+        if not part_ids:
+            return
+        usage = usage.filter(part_color__part_id__in=part_ids)
+        parts = parts.filter(pk__in=part_ids)
+
+    stats = {row["part_color__part_id"]: (row["sets"], row["total"] or 0) for row in usage}
+
+    now = timezone.now()
+    fields = ["set_count", "total_quantity", "updated_at"]
+    changed = []
+    touched = False
+    for part in parts.iterator(chunk_size=batch_size):
+        set_count, total = stats.get(part.pk, (0, 0))
+        if (part.set_count, part.total_quantity) != (set_count, total):
+            part.set_count, part.total_quantity, part.updated_at = set_count, total, now
+            changed.append(part)
+            touched = True
+        if len(changed) >= batch_size:
+            Part.objects.bulk_update(changed, fields)
+            changed = []
+    Part.objects.bulk_update(changed, fields)
+    if touched:
+        versions.bump_models(Part)
+
+
+def set_aggregates(set_ids):
+    """{set id: {field: value}} for SET_AGGREGATES, computed from the inventory."""
+    lines = SetPart.objects.filter(set_id__in=set_ids, quantity__gt=0)
+    aggregates = {
+        set_id: {"total_pieces": 0, "unique_part_colors": 0, "unique_parts": 0, "color_counts": {}}
+        for set_id in set_ids
+    }
+    by_color = lines.values("set_id", "part_color__color_id").annotate(pieces=Sum("quantity"), rows=Count("id"))
+    for row in by_color:
+        entry = aggregates[row["set_id"]]
+        entry["total_pieces"] += row["pieces"]
+        entry["unique_part_colors"] += row["rows"]
+        if row["part_color__color_id"] is not None:  # colorless part-colors only count in the totals
+            entry["color_counts"][str(row["part_color__color_id"])] = row["pieces"]
+    shapes = lines.values("set_id").annotate(shapes=Count("part_color__part_id", distinct=True))
+    for row in shapes:
+        aggregates[row["set_id"]]["unique_parts"] = row["shapes"]
+    return aggregates
+
+
+def refresh_set_aggregates(set_ids=None, batch_size=500):
+    """Recompute the inventory aggregates of `set_ids` (or every set when None)."""
+    if set_ids is None:
+        set_ids = Set.objects.order_by("pk").values_list("pk", flat=True)
+    set_ids = list(set_ids)
+
+    now = timezone.now()
+    touched = False
+    for start in range(0, len(set_ids), batch_size):
+        chunk = set_ids[start:start + batch_size]
+        aggregates = set_aggregates(chunk)
+        changed = []
+        for set_obj in Set.objects.filter(pk__in=chunk).only("id", *SET_AGGREGATES):
+            fresh = aggregates[set_obj.pk]
+            if any(getattr(set_obj, field) != value for field, value in fresh.items()):
+                for field, value in fresh.items():
+                    setattr(set_obj, field, value)
+                set_obj.updated_at = now
+                changed.append(set_obj)
+        Set.objects.bulk_update(changed, SET_AGGREGATES + ["updated_at"])
+        touched = touched or bool(changed)
+    if touched:
+        versions.bump_models(Set)
+
+
+def delete_set_parts(lines, refresh=True):
+    """
+    Delete the SetPart queryset `lines` without per-row signals, then
+    refresh the part usage and set aggregates it fed once (unless the caller,
+    with `refresh=False`, refreshes them itself). Returns the number of rows
+    deleted.
+    """
+    lines = lines.order_by()
+    if refresh:
+        affected = set(lines.values_list("set_id", "part_color__part_id").distinct())
+        if not affected:
+            return 0
+    deleted = lines._raw_delete(lines.db)
+    if deleted:
+        versions.bump_models(SetPart)
+    if refresh:
+        refresh_part_usage({part_id for _, part_id in affected})
+        refresh_set_aggregates({set_id for set_id, _ in affected})
+    return deleted
@@ -1,13 +1,24 @@
 from rest_framework import serializers
 from .models import Theme, Set, SetPart
+from core.images import current_derivatives, derivative
+from core.representations import SelectableFieldsMixin
 from parts.serializers import PartColorSerializer
 from parts.models import PartColor
 
 
-class ThemeSerializer(serializers.ModelSerializer):
+class ThemeSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
+    thumb_url = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Theme
-        fields = ["id", "name", "image_url"]
+        fields = ["id", "name", "image_url", "thumb_url", "images"]
+
+    def get_thumb_url(self, obj: Theme):
+        return derivative(obj, "thumb") or obj.image_url or None
+
+    def get_images(self, obj: Theme):
+        return current_derivatives(obj)
 
 
 class SetPartSerializer(serializers.ModelSerializer):
@@ -26,7 +37,30 @@ class SetPartSerializer(serializers.ModelSerializer):
         fields = ["id", "part_color", "part_color_id", "quantity"]
 
 
-class SetSerializer(serializers.ModelSerializer):
+class SetPartLineSerializer(serializers.Serializer):
+    """One `{part_color_id, quantity}` entry of a bulk inventory write."""
+    part_color_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class BuyListSerializer(serializers.Serializer):
+    """Body of a multi-set buy list; owned quantities come inline or from the user's collection."""
+    sets = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=200)
+    owned = SetPartLineSerializer(many=True, required=False)
+    use_collection = serializers.BooleanField(default=False)
+
+    def validate_sets(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Duplicate set ids.")
+        return value
+
+    def validate(self, data):
+        if data.get("owned") is not None and data["use_collection"]:
+            raise serializers.ValidationError("Pass owned or use_collection, not both.")
+        return data
+
+
+class SetSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     theme = ThemeSerializer(read_only=True)
     theme_id = serializers.PrimaryKeyRelatedField(
         queryset=Theme.objects.all(),
@@ -37,6 +71,9 @@ class SetSerializer(serializers.ModelSerializer):
     # This will serialize the through-model rows
     parts_detail = SetPartSerializer(source="setpart_set", many=True, read_only=True)
 
+    thumb_url = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Set
         fields = [
@@ -46,7 +83,32 @@ class SetSerializer(serializers.ModelSerializer):
             "image_url",
             "age",
             "piece_count",
+            "total_pieces",
+            "unique_part_colors",
+            "unique_parts",
+            "color_counts",
             "theme",        # read
             "theme_id",     # write
             "parts_detail", # read the parts+qty list
+            "thumb_url",
+            "images",
         ]
+
+    def get_thumb_url(self, obj: Set):
+        return derivative(obj, "thumb") or obj.image_url or None
+
+    def get_images(self, obj: Set):
+        return current_derivatives(obj)
+
+
+class SetUsageSerializer(serializers.ModelSerializer):
+    """A set in a part's reverse index, with how many of the part it needs."""
+    quantity = serializers.IntegerField(read_only=True)
+    thumb_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Set
+        fields = ["id", "number", "set_name", "image_url", "thumb_url", "quantity"]
+
+    def get_thumb_url(self, obj: Set):
+        return derivative(obj, "thumb") or obj.image_url or None
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from parts.models import PartColor
+from .models import SetPart
+from .rollups import refresh_part_usage, refresh_set_aggregates
+
+
+@receiver(post_save, sender=SetPart)
+@receiver(post_delete, sender=SetPart)
+def setpart_changed(sender, instance, **kwargs):
+    # per row: bulk paths call the rollups themselves (see rollups.delete_set_parts)
+    refresh_part_usage(PartColor.objects.filter(pk=instance.part_color_id).values_list("part_id", flat=True))
+    refresh_set_aggregates([instance.set_id])
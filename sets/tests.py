@@ -1,3 +1,445 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import OwnedPart
+from core import response_cache
+from parts.models import Color, Part, PartColor
+from .models import Set, SetPart, Theme
+
+
+class SetQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.theme = Theme.objects.create(name="City")
+        self.red = Color.objects.create(lego_id=4, name="Red", hex="#C91A09")
+
+    def make_sets(self, n_sets, n_lines):
+        start = Set.objects.count()
+        for i in range(start, start + n_sets):
+            s = Set.objects.create(number=f"{1000 + i}", set_name=f"Set {i}", theme=self.theme)
+            for j in range(n_lines):
+                part, _ = Part.objects.get_or_create(part_id=f"{3000 + j}", defaults={"name": f"Brick {j}"})
+                pc, _ = PartColor.objects.get_or_create(part=part, color=self.red)
+                SetPart.objects.create(set=s, part_color=pc, quantity=j + 1)
+        return s
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.make_sets(1, 1)
+        small = self.count_queries("/api/admin/sets/")
+
+        self.make_sets(10, 8)
+        large = self.count_queries("/api/admin/sets/")
+
+        self.assertEqual(small, large)
+
+    def test_detail_query_count_is_constant(self):
+        small_set = self.make_sets(1, 1)
+        small = self.count_queries(f"/api/admin/sets/{small_set.pk}/")
+
+        large_set = self.make_sets(1, 25)
+        large = self.count_queries(f"/api/admin/sets/{large_set.pk}/")
+
+        self.assertEqual(small, large)
+        res = self.client.get(f"/api/admin/sets/{large_set.pk}/")
+        self.assertEqual(len(res.data["parts_detail"]), 25)
+
+    def test_list_rows_are_compact_and_selectable(self):
+        self.make_sets(2, 3)
+        res = self.client.get("/api/admin/sets/")
+        row = res.data["results"][0]
+        self.assertNotIn("parts_detail", row)
+        self.assertEqual(row["theme"], {"id": self.theme.pk, "name": "City"})
+        self.assertEqual(row["total_pieces"], 6)
+
+        res = self.client.get("/api/admin/sets/?fields=id,number")
+        self.assertEqual(set(res.data["results"][0]), {"id", "number"})
+
+        res = self.client.get(f"/api/admin/sets/{res.data['results'][0]['id']}/?fields=id,parts_detail")
+        self.assertEqual(set(res.data), {"id", "parts_detail"})
+
+    def test_list_orderings_page_through_ties(self):
+        # imported sets share names and mostly have piece_count 0; more ties than offset_cutoff
+        Set.objects.bulk_create(Set(number=f"t{i}", set_name="Tied", theme=self.theme) for i in range(1100))
+        expected = sorted(Set.objects.values_list("id", flat=True))
+        for ordering in ("set_name", "-piece_count", "set_name,-piece_count"):
+            seen, url = [], f"/api/admin/sets/?ordering={ordering}&page_size=500"
+            while url:
+                res = self.client.get(url)
+                seen += [row["id"] for row in res.data["results"]]
+                url = res.data["next"]
+                self.assertLessEqual(len(seen), len(expected))
+            self.assertEqual(sorted(seen), expected, ordering)
+
+    def test_list_rows_carry_what_the_edit_form_sends_back(self):
+        s = self.make_sets(1, 1)
+        Set.objects.filter(pk=s.pk).update(image_url="https://assets.example.com/sets/a.png", age="8+")
+        row = self.client.get("/api/admin/sets/").data["results"][0]
+        # SetForm builds its PATCH body from the list row
+        form = {key: row[key] for key in ["number", "set_name", "image_url", "age", "piece_count"]}
+        form["theme_id"] = row["theme"]["id"]
+
+        res = self.client.patch(f"/api/admin/sets/{s.pk}/", form, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        s.refresh_from_db()
+        self.assertEqual((s.image_url, s.age, s.theme_id), ("https://assets.example.com/sets/a.png", "8+", self.theme.pk))
+
+    def test_expanded_list_query_count_is_constant(self):
+        self.make_sets(1, 1)
+        small = self.count_queries("/api/admin/sets/?expand=parts_detail")
+
+        self.make_sets(10, 8)
+        large = self.count_queries("/api/admin/sets/?expand=parts_detail")
+
+        self.assertEqual(small, large)
+        res = self.client.get("/api/admin/sets/?expand=parts_detail&ordering=-total_pieces")
+        row = res.data["results"][0]
+        self.assertEqual(len(row["parts_detail"]), 8)
+        self.assertIn("total_pieces", row)
+        self.assertNotIn("images", row)
+
+
+class SetInventoryWriteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        theme = Theme.objects.create(name="City")
+        red = Color.objects.create(lego_id=4, name="Red")
+        self.set = Set.objects.create(number="60000", set_name="Fire Motorcycle", theme=theme)
+        self.pcs = [
+            PartColor.objects.create(part=Part.objects.create(part_id=f"{3001 + i}", name=f"Brick {i}"), color=red)
+            for i in range(4)
+        ]
+        SetPart.objects.create(set=self.set, part_color=self.pcs[0], quantity=2)
+        SetPart.objects.create(set=self.set, part_color=self.pcs[1], quantity=3)
+        self.url = f"/api/admin/sets/{self.set.pk}/parts/"
+
+    def inventory(self):
+        return dict(SetPart.objects.filter(set=self.set).values_list("part_color_id", "quantity"))
+
+    def test_put_replaces_inventory(self):
+        res = self.client.put(
+            self.url,
+            [{"part_color_id": self.pcs[1].pk, "quantity": 5}, {"part_color_id": self.pcs[2].pk, "quantity": 1}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.inventory(), {self.pcs[1].pk: 5, self.pcs[2].pk: 1})
+        self.assertEqual(res.data["piece_count"], 6)
+        self.assertEqual(len(res.data["parts_detail"]), 2)
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.piece_count, 6)
+
+    def test_patch_merges_and_zero_deletes(self):
+        res = self.client.patch(
+            self.url,
+            {"parts": [{"part_color_id": self.pcs[0].pk, "quantity": 0}, {"part_color_id": self.pcs[3].pk, "quantity": 7}]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.inventory(), {self.pcs[1].pk: 3, self.pcs[3].pk: 7})
+        self.assertEqual((res.data["created"], res.data["updated"], res.data["deleted"]), (1, 0, 1))
+
+    def test_bulk_deletes_refresh_rollups_once(self):
+        def delete_lines(n_lines):
+            lines = [{"part_color_id": pc.pk, "quantity": i + 1} for i, pc in enumerate(self.pcs[:n_lines])]
+            self.client.put(self.url, lines, format="json")
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.put(self.url, [], format="json")
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.data["deleted"], n_lines)
+            return len(ctx.captured_queries)
+
+        self.pcs += [
+            PartColor.objects.create(part=Part.objects.create(part_id=f"{4001 + i}", name=f"Plate {i}"))
+            for i in range(36)
+        ]
+        self.assertEqual(delete_lines(2), delete_lines(40))
+        self.set.refresh_from_db()
+        self.assertEqual((self.set.piece_count, self.set.total_pieces), (0, 0))
+        self.assertEqual(Part.objects.filter(set_count__gt=0).count(), 0)
+
+    def test_set_delete_refreshes_rollups_once(self):
+        def delete_set(number, n_lines):
+            s = Set.objects.create(number=number, set_name=number, theme=self.set.theme)
+            SetPart.objects.bulk_create([SetPart(set=s, part_color=pc, quantity=1) for pc in self.pcs[:n_lines]])
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.delete(f"/api/admin/sets/{s.pk}/")
+            self.assertEqual(res.status_code, 204)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(delete_set("1", 1), delete_set("2", 4))
+        self.assertEqual(Part.objects.get(pk=self.pcs[3].part_id).set_count, 0)
+        self.assertEqual(Part.objects.get(pk=self.pcs[0].part_id).set_count, 1)  # still in self.set
+
+    def test_part_and_part_color_deletes_refresh_rollups_once(self):
+        theme = self.set.theme
+
+        def delete(url, pc, n_sets):
+            sets = Set.objects.bulk_create(
+                Set(number=f"{url}{n_sets}-{i}", set_name="Uses it", theme=theme) for i in range(n_sets)
+            )
+            SetPart.objects.bulk_create([SetPart(set=s, part_color=pc, quantity=2) for s in sets])
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.delete(f"/api/admin/{url}/")
+            self.assertEqual(res.status_code, 204)
+            return len(ctx.captured_queries)
+
+        red = self.pcs[0].color
+        part = Part.objects.get(pk=self.pcs[2].part_id)
+        few = delete(f"part-colors/{self.pcs[2].pk}", self.pcs[2], 5)
+        many = delete(f"part-colors/{self.pcs[3].pk}", self.pcs[3], 40)
+        self.assertEqual(few, many)
+        self.assertEqual(Part.objects.get(pk=part.pk).set_count, 0)
+        self.assertEqual(Set.objects.filter(total_pieces__gt=0).get(), self.set)
+
+        def part_with_color(part_id):
+            return PartColor.objects.create(part=Part.objects.create(part_id=part_id, name=part_id), color=red)
+
+        few, many = part_with_color("9001"), part_with_color("9002")
+        self.assertEqual(
+            delete(f"parts/{few.part_id}", few, 5),
+            delete(f"parts/{many.part_id}", many, 40),
+        )
+        self.assertEqual(Set.objects.filter(total_pieces__gt=0).get(), self.set)
+
+    def test_bad_payload_changes_nothing(self):
+        before = self.inventory()
+        for body in (
+            [{"part_color_id": 999999, "quantity": 1}],
+            [{"part_color_id": self.pcs[2].pk, "quantity": 1}, {"part_color_id": self.pcs[2].pk, "quantity": 2}],
+            [{"part_color_id": self.pcs[2].pk, "quantity": -1}],
+        ):
+            self.assertEqual(self.client.put(self.url, body, format="json").status_code, 400)
+        self.assertEqual(self.inventory(), before)
+
+
+class SetAggregateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        theme = Theme.objects.create(name="City")
+        self.red = Color.objects.create(lego_id=4, name="Red")
+        self.blue = Color.objects.create(lego_id=1, name="Blue")
+        brick = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+        plate = Part.objects.create(part_id="3020", name="Plate 2 x 4")
+        self.red_brick = PartColor.objects.create(part=brick, color=self.red)
+        self.blue_brick = PartColor.objects.create(part=brick, color=self.blue)
+        self.red_plate = PartColor.objects.create(part=plate, color=self.red)
+        self.big = Set.objects.create(number="10000", set_name="Big", theme=theme)
+        self.small = Set.objects.create(number="10001", set_name="Small", theme=theme)
+        SetPart.objects.create(set=self.big, part_color=self.red_brick, quantity=10)
+        SetPart.objects.create(set=self.big, part_color=self.blue_brick, quantity=4)
+        SetPart.objects.create(set=self.big, part_color=self.red_plate, quantity=6)
+        SetPart.objects.create(set=self.small, part_color=self.blue_brick, quantity=2)
+
+    def aggregates(self, set_obj):
+        set_obj.refresh_from_db()
+        return set_obj.total_pieces, set_obj.unique_part_colors, set_obj.unique_parts, set_obj.color_counts
+
+    def test_single_row_writes_keep_aggregates(self):
+        self.assertEqual(
+            self.aggregates(self.big), (20, 3, 2, {str(self.red.pk): 16, str(self.blue.pk): 4})
+        )
+        SetPart.objects.filter(set=self.big, part_color=self.red_plate).get().delete()
+        self.assertEqual(self.aggregates(self.big), (14, 2, 1, {str(self.red.pk): 10, str(self.blue.pk): 4}))
+
+    def test_bulk_inventory_write_keeps_aggregates(self):
+        res = self.client.put(
+            f"/api/admin/sets/{self.small.pk}/parts/",
+            [{"part_color_id": self.red_plate.pk, "quantity": 3}, {"part_color_id": self.blue_brick.pk, "quantity": 5}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.aggregates(self.small), (8, 2, 2, {str(self.red.pk): 3, str(self.blue.pk): 5}))
+
+    def test_list_sorts_and_filters_on_aggregates(self):
+        res = self.client.get("/api/admin/sets/?ordering=-total_pieces")
+        self.assertEqual([row["number"] for row in res.data["results"]], ["10000", "10001"])
+        self.assertEqual(res.data["results"][0]["unique_parts"], 2)
+        res = self.client.get("/api/admin/sets/?min_pieces=5")
+        self.assertEqual([row["number"] for row in res.data["results"]], ["10000"])
+        res = self.client.get(f"/api/admin/sets/?color={self.red.pk}")
+        self.assertEqual([row["number"] for row in res.data["results"]], ["10000"])
+
+    def test_aggregate_orderings_page_through_empty_sets(self):
+        # sets without an inventory all tie at 0, more of them than offset_cutoff
+        theme = self.big.theme
+        Set.objects.bulk_create(Set(number=f"e{i}", set_name="Empty", theme=theme) for i in range(1100))
+        expected = sorted(Set.objects.values_list("id", flat=True))
+        for ordering in ("-total_pieces", "unique_part_colors", "-unique_parts"):
+            seen, url = [], f"/api/admin/sets/?ordering={ordering}&page_size=500"
+            while url:
+                res = self.client.get(url)
+                seen += [row["id"] for row in res.data["results"]]
+                url = res.data["next"]
+                self.assertLessEqual(len(seen), len(expected))
+            self.assertEqual(sorted(seen), expected, ordering)
+
+    def test_recompute_command_repairs_drift(self):
+        Set.objects.update(total_pieces=0, unique_part_colors=0, unique_parts=0, color_counts={})
+        call_command("recompute_set_aggregates", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual(self.aggregates(self.big)[:3], (20, 3, 2))
+        self.assertEqual(self.aggregates(self.small), (2, 1, 1, {str(self.blue.pk): 2}))
+
+
+class BuyListTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("builder", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        theme = Theme.objects.create(name="City")
+        red = Color.objects.create(lego_id=4, name="Red", hex="#C91A09")
+        self.pcs = [
+            PartColor.objects.create(part=Part.objects.create(part_id=f"{3001 + i}", name=f"Brick {i}"), color=red)
+            for i in range(3)
+        ]
+        self.a = Set.objects.create(number="60001", set_name="A", theme=theme)
+        self.b = Set.objects.create(number="60002", set_name="B", theme=theme)
+        SetPart.objects.create(set=self.a, part_color=self.pcs[0], quantity=4)
+        SetPart.objects.create(set=self.a, part_color=self.pcs[1], quantity=2)
+        SetPart.objects.create(set=self.b, part_color=self.pcs[1], quantity=3)
+        SetPart.objects.create(set=self.b, part_color=self.pcs[2], quantity=1)
+
+    def post(self, body):
+        return self.client.post("/api/sets/buy-list/", body, format="json")
+
+    def test_combines_sets_in_one_aggregate(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.post({"sets": [self.a.pk, self.b.pk], "owned": [{"part_color_id": self.pcs[1].pk, "quantity": 9}]})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(queries), 3)  # the sets, the grouped aggregate, the per-set lines
+        lines = {line["part_color_id"]: line for line in res.data["lines"]}
+        shared = lines[self.pcs[1].pk]
+        self.assertEqual((shared["required"], shared["owned"], shared["to_buy"]), (5, 5, 0))
+        self.assertEqual(shared["per_set"], {self.a.pk: 2, self.b.pk: 3})
+        self.assertEqual(res.data["totals"], {"lines": 3, "required": 10, "owned": 5, "to_buy": 5})
+        self.assertEqual(res.data["shared_lines"], 1)
+        a, b = res.data["sets"]
+        self.assertEqual((a["exclusive_lines"], a["exclusive_pieces"]), (1, 4))
+        self.assertEqual((b["exclusive_lines"], b["exclusive_pieces"]), (1, 1))
+
+    def test_uses_the_collection_and_validates(self):
+        OwnedPart.objects.create(user=self.user, part_color=self.pcs[0], quantity=1)
+        res = self.post({"sets": [self.a.pk], "use_collection": True})
+        self.assertEqual(res.data["totals"]["to_buy"], 5)
+
+        self.assertEqual(self.post({"sets": [self.a.pk, self.a.pk]}).status_code, 400)
+        self.assertEqual(self.post({"sets": [999999]}).status_code, 400)
+        self.assertEqual(self.post({"sets": [self.a.pk], "owned": [], "use_collection": True}).status_code, 400)
+        self.assertEqual(APIClient().post("/api/sets/buy-list/", {"sets": [self.a.pk]}, format="json").status_code, 401)
+
+
+class ReverseIndexTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        theme = Theme.objects.create(name="City")
+        red = Color.objects.create(lego_id=4, name="Red")
+        blue = Color.objects.create(lego_id=1, name="Blue")
+        self.brick = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+        self.red_brick = PartColor.objects.create(part=self.brick, color=red)
+        self.blue_brick = PartColor.objects.create(part=self.brick, color=blue)
+        self.sets = [Set.objects.create(number=f"{100 + i}", set_name=f"Set {i}", theme=theme) for i in range(3)]
+        SetPart.objects.create(set=self.sets[0], part_color=self.red_brick, quantity=2)
+        SetPart.objects.create(set=self.sets[0], part_color=self.blue_brick, quantity=10)
+        SetPart.objects.create(set=self.sets[1], part_color=self.red_brick, quantity=5)
+        SetPart.objects.create(set=self.sets[2], part_color=self.blue_brick, quantity=1)
+
+    def test_part_sets_sums_colors_and_sorts_by_quantity(self):
+        res = self.client.get(f"/api/parts/{self.brick.pk}/sets/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([(r["number"], r["quantity"]) for r in res.data["results"]], [("100", 12), ("101", 5), ("102", 1)])
+        self.assertEqual(res.data["usage"], {"part": self.brick.pk, "set_count": 3, "total_quantity": 18})
+
+        res = self.client.get(f"/api/parts/{self.brick.pk}/sets/?ordering=quantity&page_size=2")
+        self.assertEqual([r["quantity"] for r in res.data["results"]], [1, 5])
+        self.assertIsNotNone(res.data["next"])
+
+    def test_part_color_sets(self):
+        res = self.client.get(f"/api/part-colors/{self.red_brick.pk}/sets/")
+        self.assertEqual([(r["number"], r["quantity"]) for r in res.data["results"]], [("101", 5), ("100", 2)])
+        self.assertEqual(res.data["usage"]["total_quantity"], 7)
+
+    def test_paging_through_tied_quantities_returns_each_set_once(self):
+        # more sets at the same quantity than DRF's cursor can step over (offset_cutoff)
+        theme = Theme.objects.get()
+        tied = Set.objects.bulk_create(
+            Set(number=f"{1000 + i}", set_name=f"Tied {i}", theme=theme) for i in range(1200)
+        )
+        SetPart.objects.bulk_create(SetPart(set=s, part_color=self.red_brick, quantity=2) for s in tied)
+        expected = sorted(s.pk for s in self.sets[:2] + tied)
+
+        for query in ("page_size=100", "page_size=100&ordering=quantity", "page_size=100&ordering=-quantity,-id"):
+            seen, url = [], f"/api/part-colors/{self.red_brick.pk}/sets/?{query}"
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, 200)
+                seen += [r["id"] for r in res.data["results"]]
+                url = res.data["next"]
+                self.assertLessEqual(len(seen), len(expected))
+            self.assertEqual(sorted(seen), expected)
+
+        # and back again from the last page
+        seen = [r["id"] for r in res.data["results"]]
+        while res.data["previous"]:
+            res = self.client.get(res.data["previous"])
+            seen += [r["id"] for r in res.data["results"]]
+        self.assertEqual(sorted(seen), expected)
+
+    def test_rollup_follows_inventory_writes(self):
+        SetPart.objects.filter(set=self.sets[2]).delete()
+        self.brick.refresh_from_db()
+        self.assertEqual((self.brick.set_count, self.brick.total_quantity), (2, 17))
+
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.client.put(
+            f"/api/admin/sets/{self.sets[1].pk}/parts/",
+            [{"part_color_id": self.blue_brick.pk, "quantity": 3}],
+            format="json",
+        )
+        self.brick.refresh_from_db()
+        self.assertEqual((self.brick.set_count, self.brick.total_quantity), (2, 15))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.cache().clear()
+        response_cache.reset_stats()
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        theme = Theme.objects.create(name="City")
+        part = Part.objects.create(part_id="3001", name="Brick 2 x 4")
+        self.pc = PartColor.objects.create(part=part, color=Color.objects.create(lego_id=4, name="Red"))
+        self.set = Set.objects.create(number="6000", set_name="Police Station", theme=theme)
+        SetPart.objects.create(set=self.set, part_color=self.pc, quantity=4)
+
+    def test_detail_is_served_from_cache_until_a_write(self):
+        url = f"/api/admin/sets/{self.set.pk}/"
+        first = self.client.get(url)
+        with self.assertNumQueries(1):  # version lookup; no set, inventory or serialization
+            second = self.client.get(url)
+        self.assertEqual(second.data, first.data)
+
+        self.client.put(f"{url}parts/", {"parts": [{"part_color_id": self.pc.pk, "quantity": 9}]}, format="json")
+        res = self.client.get(url)
+        self.assertEqual(res.data["parts_detail"][0]["quantity"], 9)
 
-# Create your tests here.
+        stats = self.client.get("/api/admin/cache-stats/").data
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 2, 2))